@@ -0,0 +1,564 @@
+import os
+import tempfile
+from functools import reduce
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from cohortes import _indices_mois, _periode
+from evenements import FICHIER_EVENEMENTS, appliquer_evenements, journal_existe, lire_evenements
+from instrumentation import instrumenter
+from modele import masque_actifs
+from stockage import FICHIER_CSV, TAILLE_LOT, lire_csv_par_lots, lire_parquet_par_lots
+
+# Découpages possibles des clients entre processus
+PARTITIONS = ('plage', 'plan', 'ville')
+
+# Colonnes numériques écrites en fichiers .npy, mappés en mémoire par les processus
+COLONNES_PARTAGEES = ['statut', 'plan', 'prix', 'mois', 'score', 'actif']
+
+COLONNES_PLAN = ['nombre_clients', 'revenu_total', 'clients_actifs', 'revenu_actifs']
+
+COLONNES_RISQUE = ['id', 'nom', 'email', 'plan', 'score_risque']
+
+# Colonnes lues en mode flux
+COLONNES_FLUX = ['id', 'nom', 'email', 'plan', 'prix_mensuel', 'date_debut', 'statut', 'score_risque']
+
+def _additionner(gauche, droite):
+    """
+    Somme exacte de deux comptages alignés sur leurs libellés
+    """
+    if len(gauche) == 0:
+        return droite
+    if len(droite) == 0:
+        return gauche
+    return gauche.add(droite, fill_value=0).astype(np.int64)
+
+class AgregatsPartiels:
+    """
+    Agrégats d'une partie des clients, fusionnables exactement (a + b) :
+    comptages et sommes entières indexés par libellé, distribution exacte
+    des scores de risque des actifs, positions des clients au-dessus du seuil
+
+    Les résultats sont reconstruits au format des fonctions de calculs.py
+    et de visualisations.py
+    """
+
+    def __init__(self, total, actifs, mrr, statuts, plans, cohortes, scores, risque, seuil=0.7):
+        self.total = total
+        self.actifs = actifs
+        self.mrr = mrr
+        self.statuts = statuts      # statut -> nombre de clients
+        self.plans = plans          # plan -> COLONNES_PLAN
+        self.cohortes = cohortes    # indice de mois -> total, actifs
+        self.scores = scores        # score des clients actifs -> nombre
+        self.risque = risque        # positions des actifs dont le score est >= seuil
+        self.seuil = seuil
+
+    @classmethod
+    def vide(cls, seuil=0.7):
+        return cls(
+            0, 0, 0,
+            statuts=pd.Series(dtype=np.int64),
+            plans=pd.DataFrame(columns=COLONNES_PLAN, dtype=np.int64),
+            cohortes=pd.DataFrame(columns=['total', 'actifs'], dtype=np.int64),
+            scores=pd.Series(dtype=np.int64),
+            risque=np.empty(0, dtype=np.int64),
+            seuil=seuil
+        )
+
+    def fusionner(self, autre):
+        if self.seuil != autre.seuil:
+            raise ValueError(f"Seuils de risque différents : {self.seuil} et {autre.seuil}")
+        return AgregatsPartiels(
+            self.total + autre.total,
+            self.actifs + autre.actifs,
+            self.mrr + autre.mrr,
+            statuts=_additionner(self.statuts, autre.statuts),
+            plans=_additionner(self.plans, autre.plans),
+            cohortes=_additionner(self.cohortes, autre.cohortes),
+            scores=_additionner(self.scores, autre.scores),
+            risque=np.concatenate([self.risque, autre.risque]),
+            seuil=self.seuil
+        )
+
+    __add__ = fusionner
+
+    # ---------- Résultats (formats de calculs.py) ----------
+
+    def metriques(self):
+        """
+        Format de calculer_metriques
+        """
+        annules = int(self.statuts.get('annulé', 0))
+        arpu = round(self.mrr / self.actifs, 2) if self.actifs else np.nan
+        return {
+            'total_clients': self.total,
+            'clients_actifs': self.actifs,
+            'clients_annules': annules,
+            'taux_churn': round((annules / self.total) * 100, 2),
+            'taux_retention': round((self.actifs / self.total) * 100, 2),
+            'mrr': np.int64(self.mrr),
+            'arpu': arpu,
+            'ltv_moyen': round(arpu * 12, 2)
+        }
+
+    def par_plan(self):
+        """
+        Format de analyser_par_plan (plans présents uniquement)
+        """
+        plans = self.plans[self.plans['nombre_clients'] > 0]
+        return plans[['nombre_clients', 'revenu_total', 'clients_actifs']].rename_axis('plan')
+
+    def analyse_cohortes(self):
+        """
+        Format de analyser_cohortes
+        """
+        cohortes = self.cohortes.sort_index()
+        cohortes = cohortes[cohortes['total'] > 0].copy()
+        cohortes.index = pd.PeriodIndex([_periode(int(i)) for i in cohortes.index], name='mois_cohorte')
+        cohortes['taux_retention'] = round(
+            (cohortes['actifs'] / cohortes['total']) * 100, 2
+        )
+        return cohortes
+
+    def clients_risque(self, df):
+        """
+        Format de identifier_clients_risque ; df est le DataFrame agrégé
+        """
+        lignes = df.iloc[np.sort(self.risque)]
+        return lignes.sort_values('score_risque', ascending=False)[COLONNES_RISQUE]
+
+    def tableau_de_bord(self, df):
+        """
+        Format de calculer_tableau_de_bord
+        """
+        from calculs import TableauDeBord
+
+        return TableauDeBord(
+            self.metriques(), self.par_plan(), self.analyse_cohortes(), self.clients_risque(df)
+        )
+
+    # ---------- Données des graphiques (formats de visualisations.py) ----------
+
+    def evolution_mensuelle(self):
+        cohortes = self.analyse_cohortes()
+        return pd.DataFrame({
+            'mois': cohortes.index.astype(str),
+            'nombre_clients': cohortes['total'].to_numpy()
+        })
+
+    def repartition_plans(self):
+        return self._repartition(self.plans['nombre_clients'], 'plan')
+
+    def repartition_statuts(self):
+        return self._repartition(self.statuts, 'statut')
+
+    @staticmethod
+    def _repartition(nombres, nom):
+        nombres = nombres.sort_values(ascending=False, kind='stable')
+        return pd.DataFrame({nom: nombres.index, 'nombre': nombres.to_numpy()})
+
+    def revenu_par_plan(self):
+        plans = self.plans[self.plans['clients_actifs'] > 0]
+        return pd.DataFrame({'plan': plans.index, 'revenu': plans['revenu_actifs'].to_numpy()})
+
+    def histogramme_risque(self, nb_classes=20):
+        # Scores distincts pondérés par leur nombre : mêmes classes que sur les clients
+        scores = self.scores.index.to_numpy(dtype=self.scores.index.dtype)
+        borne_min = min(0.0, float(scores.min(initial=0.0)))
+        borne_max = max(1.0, float(scores.max(initial=1.0)))
+
+        nombres, bornes = np.histogram(
+            scores, bins=nb_classes, range=(borne_min, borne_max), weights=self.scores.to_numpy()
+        )
+        return pd.DataFrame({
+            'debut': bornes[:-1],
+            'fin': bornes[1:],
+            'nombre': nombres.astype(np.int64)
+        })
+
+# ---------- Calcul des agrégats ----------
+
+def _codes(serie):
+    """
+    Codes entiers (-1 si manquant) et libellés d'une colonne catégorielle ou texte
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), list(serie.cat.categories)
+    codes, libelles = pd.factorize(serie, sort=True)
+    return codes, list(libelles)
+
+def colonnes_numeriques(df):
+    """
+    Colonnes utilisées par les agrégats, converties en tableaux numériques,
+    et libellés des codes de statut et de plan
+    """
+    statuts, libelles_statuts = _codes(df['statut'])
+    plans, libelles_plans = _codes(df['plan'])
+    colonnes = {
+        'statut': statuts,
+        'plan': plans,
+        'prix': df['prix_mensuel'].to_numpy(),
+        'mois': _indices_mois(df['date_debut']),
+        'score': df['score_risque'].to_numpy(),
+        'actif': masque_actifs(df).to_numpy(dtype=bool)
+    }
+    return colonnes, {'statut': libelles_statuts, 'plan': libelles_plans}
+
+def agreger_tableaux(statut, plan, prix, mois, score, actif, positions, libelles, seuil=0.7, risque=True):
+    """
+    Agrégats partiels de clients donnés par leurs colonnes numériques
+    (positions : position de chaque client dans le DataFrame complet ;
+    risque=False : positions des clients à risque non conservées)
+    """
+    nb_statuts, nb_plans = len(libelles['statut']), len(libelles['plan'])
+    statuts = np.bincount(statut[statut >= 0], minlength=nb_statuts)
+
+    valides = plan >= 0
+    codes, prix_plan, actifs_plan = plan[valides], prix[valides], actif[valides]
+    plans = pd.DataFrame({
+        'nombre_clients': np.bincount(codes, minlength=nb_plans),
+        'revenu_total': np.bincount(codes, weights=prix_plan, minlength=nb_plans).astype(np.int64),
+        'clients_actifs': np.bincount(codes[actifs_plan], minlength=nb_plans),
+        'revenu_actifs': np.bincount(
+            codes[actifs_plan], weights=prix_plan[actifs_plan], minlength=nb_plans
+        ).astype(np.int64)
+    }, index=pd.Index(libelles['plan'], dtype=object), dtype=np.int64)
+
+    valides = mois >= 0
+    indices, codes = np.unique(mois[valides], return_inverse=True)
+    cohortes = pd.DataFrame({
+        'total': np.bincount(codes, minlength=len(indices)),
+        'actifs': np.bincount(codes[actif[valides]], minlength=len(indices))
+    }, index=indices, dtype=np.int64)
+
+    scores_actifs = score[actif]
+    valeurs, nombres = np.unique(scores_actifs[~np.isnan(scores_actifs)], return_counts=True)
+
+    return AgregatsPartiels(
+        len(statut),
+        int(actif.sum()),
+        int(prix[actif].sum(dtype=np.int64)),
+        statuts=pd.Series(statuts, index=pd.Index(libelles['statut'], dtype=object), dtype=np.int64),
+        plans=plans,
+        cohortes=cohortes,
+        scores=pd.Series(nombres, index=pd.Index(valeurs), dtype=np.int64),
+        risque=positions[actif & (score >= seuil)].astype(np.int64) if risque else np.empty(0, dtype=np.int64),
+        seuil=seuil
+    )
+
+def agreger(df, seuil=0.7, decalage=0, risque=True):
+    """
+    Agrégats partiels d'un DataFrame clients, dans le processus courant
+    (decalage : position de sa première ligne dans l'ensemble des clients)
+    """
+    colonnes, libelles = colonnes_numeriques(df)
+    positions = np.arange(decalage, decalage + len(df), dtype=np.int64)
+    return agreger_tableaux(positions=positions, libelles=libelles, seuil=seuil, risque=risque, **colonnes)
+
+# ---------- Clients les plus à risque ----------
+
+def selection_risque(positions, scores, k=None):
+    """
+    Indices des k plus grands scores, triés par score décroissant puis position
+    (sélection partielle : seuls les k retenus sont triés)
+    """
+    indices = np.arange(len(scores))
+    if k is not None and len(scores) > k:
+        # k-ième plus grand score ; à égalité, les premières positions sont gardées
+        kieme = -np.partition(-scores, k - 1)[k - 1]
+        superieurs = scores > kieme
+        egaux = np.flatnonzero(scores == kieme)
+        egaux = egaux[np.argsort(positions[egaux], kind='stable')][:k - int(superieurs.sum())]
+        superieurs[egaux] = True
+        indices = np.flatnonzero(superieurs)
+    return indices[np.lexsort((positions[indices], -scores[indices]))]
+
+class TasRisque:
+    """
+    Tas borné des k clients actifs les plus à risque (score >= seuil),
+    alimenté lot par lot et fusionnable : la mémoire ne dépend que de k
+
+    Même résultat que calculs.top_clients_risque sur l'ensemble des clients
+    (index : position du client)
+    """
+
+    def __init__(self, k=10, seuil=0.7):
+        self.k = k
+        self.seuil = seuil
+        self.lignes = None
+
+    def ajouter(self, lot, decalage=0):
+        """
+        Ajoute un lot de clients (decalage : position de sa première ligne)
+        """
+        masque = (masque_actifs(lot) & (lot['score_risque'] >= self.seuil)).to_numpy()
+        positions = np.flatnonzero(masque)
+        scores = lot['score_risque'].to_numpy()[positions]
+
+        # Seuls les k meilleurs du lot sont extraits avant la fusion
+        retenus = positions[selection_risque(positions, scores, self.k)]
+        candidats = lot.iloc[retenus][COLONNES_RISQUE]
+        candidats.index = decalage + retenus
+        self._garder(candidats)
+        return self
+
+    def fusionner(self, autre):
+        if self.seuil != autre.seuil:
+            raise ValueError(f"Seuils de risque différents : {self.seuil} et {autre.seuil}")
+        tas = TasRisque(self.k, self.seuil)
+        for lignes in (self.lignes, autre.lignes):
+            if lignes is not None:
+                tas._garder(lignes)
+        return tas
+
+    __add__ = fusionner
+
+    def _garder(self, candidats):
+        if self.lignes is not None:
+            candidats = pd.concat([
+                self.lignes.astype({'plan': object}), candidats.astype({'plan': object})
+            ])
+        ordre = selection_risque(
+            candidats.index.to_numpy(), candidats['score_risque'].to_numpy(), self.k
+        )
+        self.lignes = candidats.iloc[ordre]
+
+    def resultat(self):
+        """
+        Clients retenus, du plus risqué au moins risqué
+        """
+        if self.lignes is None:
+            return pd.DataFrame(columns=COLONNES_RISQUE)
+        return self.lignes.copy()
+
+# ---------- Exécution partitionnée ----------
+
+# Colonnes mappées en mémoire dans chaque processus de travail
+_partage = {}
+
+def _initialiser(dossier, libelles, seuil):
+    _partage.clear()
+    _partage.update(libelles=libelles, seuil=seuil, colonnes={
+        nom: np.load(os.path.join(dossier, f"{nom}.npy"), mmap_mode='r')
+        for nom in COLONNES_PARTAGEES + ['ordre']
+        if os.path.exists(os.path.join(dossier, f"{nom}.npy"))
+    })
+
+def _agreger_partition(tache):
+    """
+    Agrégats d'une partition : lignes debut:fin de l'ordre de partitionnement
+    """
+    debut, fin = tache
+    colonnes = _partage['colonnes']
+    if 'ordre' in colonnes:
+        positions = np.asarray(colonnes['ordre'][debut:fin])
+        donnees = {nom: colonnes[nom][positions] for nom in COLONNES_PARTAGEES}
+    else:
+        positions = np.arange(debut, fin, dtype=np.int64)
+        donnees = {nom: np.asarray(colonnes[nom][debut:fin]) for nom in COLONNES_PARTAGEES}
+    return agreger_tableaux(
+        positions=positions, libelles=_partage['libelles'], seuil=_partage['seuil'], **donnees
+    )
+
+def _partitionner(df, partition, nb_partitions):
+    """
+    Ordre des lignes regroupées par partition (None pour des plages contiguës)
+    et bornes de chaque partition dans cet ordre
+    """
+    if partition == 'plage':
+        # Plages de lignes contiguës : plages d'id, le fichier clients étant trié par id
+        bornes = np.linspace(0, len(df), nb_partitions + 1).astype(np.int64)
+        return None, bornes
+
+    # Hachage du libellé (stable d'une exécution à l'autre) ; valeurs manquantes en partition 0
+    codes, libelles = _codes(df[partition])
+    numeros = pd.util.hash_array(np.asarray(libelles, dtype=object)) % np.uint64(nb_partitions)
+    numeros = np.append(numeros.astype(np.int64), 0)[codes]
+
+    ordre = np.argsort(numeros, kind='stable')
+    bornes = np.searchsorted(numeros[ordre], np.arange(nb_partitions + 1))
+    return ordre, bornes
+
+@instrumenter
+def agreger_en_parallele(df, partition='plage', nb_partitions=None, processus=None, seuil=0.7):
+    """
+    Agrégats des clients calculés par partition dans un pool de processus,
+    puis fusionnés (résultat identique à agreger(df))
+
+    partition : 'plage' (plages d'id), 'plan' ou 'ville' (hachage du libellé)
+    Les colonnes sont écrites une fois en fichiers .npy temporaires que
+    chaque processus mappe en mémoire : rien n'est copié par partition
+    """
+    if partition not in PARTITIONS:
+        raise ValueError(f"Partition inconnue : {partition} (attendu : {', '.join(PARTITIONS)})")
+    if processus is None:
+        processus = os.cpu_count() or 1
+    if nb_partitions is None:
+        nb_partitions = processus
+
+    if processus <= 1 or nb_partitions <= 1 or len(df) == 0:
+        return agreger(df, seuil)
+
+    colonnes, libelles = colonnes_numeriques(df)
+    ordre, bornes = _partitionner(df, partition, nb_partitions)
+    taches = [(int(debut), int(fin)) for debut, fin in zip(bornes[:-1], bornes[1:]) if fin > debut]
+
+    with tempfile.TemporaryDirectory(prefix='agregats_') as dossier:
+        if ordre is not None:
+            colonnes['ordre'] = ordre
+        for nom, valeurs in colonnes.items():
+            np.save(os.path.join(dossier, f"{nom}.npy"), valeurs)
+
+        with Pool(min(processus, len(taches)), initializer=_initialiser,
+                  initargs=(dossier, libelles, seuil)) as pool:
+            partiels = pool.map(_agreger_partition, taches)
+
+    return reduce(AgregatsPartiels.fusionner, partiels, AgregatsPartiels.vide(seuil))
+
+# ---------- Mode flux (fichiers plus gros que la mémoire) ----------
+
+@instrumenter
+def agreger_fichier(chemin=FICHIER_CSV, seuil=0.7, k=10, taille_lot=TAILLE_LOT,
+                    evenements=True, chemin_evenements=FICHIER_EVENEMENTS):
+    """
+    Agrégats et k clients les plus à risque d'un fichier clients (CSV ou
+    Parquet) lu par lots : la mémoire dépend de la taille des lots et du
+    journal d'événements, pas du nombre de clients
+    Le journal est appliqué lot par lot ; les nouveaux clients sont ajoutés
+    après le dernier lot, comme dans charger_donnees
+    Renvoie (AgregatsPartiels, TasRisque)
+    """
+    journal = None
+    if evenements and journal_existe(chemin_evenements):
+        journal = lire_evenements(chemin_evenements)[0]
+        ids_journal = pd.Index(journal['id'].unique())
+        vus = set()
+
+    lire = lire_parquet_par_lots if chemin.endswith('.parquet') else lire_csv_par_lots
+    agregats, tas = AgregatsPartiels.vide(seuil), TasRisque(k, seuil)
+    decalage, vide = 0, None
+
+    for lot in lire(chemin, colonnes=COLONNES_FLUX, taille_lot=taille_lot):
+        if vide is None:
+            vide = lot.iloc[:0]
+        if journal is not None and len(journal):
+            ids = lot['id'][lot['id'].isin(ids_journal)].unique()
+            if len(ids):
+                lot = appliquer_evenements(lot, journal[journal['id'].isin(ids)])
+                vus.update(ids)
+        agregats = agregats + agreger(lot, seuil, decalage, risque=False)
+        tas.ajouter(lot, decalage)
+        decalage += len(lot)
+
+    # Souscriptions de clients absents du fichier
+    if journal is not None and vide is not None:
+        restants = journal[~journal['id'].isin(list(vus))]
+        if len(restants):
+            lot = appliquer_evenements(vide, restants)
+            agregats = agregats + agreger(lot, seuil, decalage, risque=False)
+            tas.ajouter(lot, decalage)
+
+    return agregats, tas
+
+def verifier_parite(df, agregats, nb_classes=20, tas=None):
+    """
+    Compare les agrégats (et le tas des clients à risque du mode flux)
+    aux fonctions de calculs.py et visualisations.py
+    Renvoie la liste des résultats divergents (vide si tout est identique)
+    """
+    from calculs import analyser_cohortes, analyser_par_plan, calculer_metriques, \
+        calculer_tableau_de_bord, identifier_clients_risque, top_clients_risque
+    from visualisations import evolution_mensuelle, histogramme_risque, repartition_plans, \
+        repartition_statuts, revenu_par_plan
+
+    def identiques(attendu, obtenu):
+        return attendu.shape == obtenu.shape and all(
+            np.array_equal(attendu[c].astype(str).to_numpy(), obtenu[c].astype(str).to_numpy())
+            for c in attendu.columns
+        )
+
+    def par_libelle(repartition, nom):
+        # Ordre des égalités non garanti par value_counts
+        return repartition.assign(**{nom: repartition[nom].astype(str)}).sort_values(nom, ignore_index=True)
+
+    ecarts = []
+    if calculer_metriques(df) != agregats.metriques():
+        ecarts.append('calculer_metriques')
+
+    attendu, obtenu = analyser_par_plan(df), agregats.par_plan()
+    if list(attendu.index.astype(str)) != list(obtenu.index) or not np.array_equal(attendu.to_numpy(), obtenu.to_numpy()):
+        ecarts.append('analyser_par_plan')
+
+    if not analyser_cohortes(df).equals(agregats.analyse_cohortes()):
+        ecarts.append('analyser_cohortes')
+
+    if tas is not None:
+        # Mode flux : les k clients les plus à risque, sans les positions de tous
+        attendu, obtenu = top_clients_risque(df, tas.k, tas.seuil), tas.resultat()
+        if list(attendu.index) != list(obtenu.index) or not identiques(attendu, obtenu):
+            ecarts.append('top_clients_risque')
+    else:
+        if not identifier_clients_risque(df, agregats.seuil).equals(agregats.clients_risque(df)):
+            ecarts.append('identifier_clients_risque')
+
+        attendu, obtenu = calculer_tableau_de_bord(df, agregats.seuil), agregats.tableau_de_bord(df)
+        if attendu['metriques'] != obtenu['metriques'] \
+                or not np.array_equal(attendu['par_plan'].to_numpy(), obtenu['par_plan'].to_numpy()) \
+                or not np.array_equal(attendu['cohortes'].to_numpy(), obtenu['cohortes'].to_numpy()) \
+                or not attendu['clients_risque'].equals(obtenu['clients_risque']):
+            ecarts.append('calculer_tableau_de_bord')
+
+    if not identiques(evolution_mensuelle(df), agregats.evolution_mensuelle()):
+        ecarts.append('evolution_mensuelle')
+    if not identiques(par_libelle(repartition_plans(df), 'plan'), par_libelle(agregats.repartition_plans(), 'plan')):
+        ecarts.append('repartition_plans')
+    if not identiques(par_libelle(repartition_statuts(df), 'statut'),
+                      par_libelle(agregats.repartition_statuts(), 'statut')):
+        ecarts.append('repartition_statuts')
+    if not identiques(revenu_par_plan(df), agregats.revenu_par_plan()):
+        ecarts.append('revenu_par_plan')
+    if not histogramme_risque(df, nb_classes).equals(agregats.histogramme_risque(nb_classes)):
+        ecarts.append('histogramme_risque')
+
+    return ecarts
+
+# Contrôle : python agregats.py [--processus N] [--flux [--taille-lot N] [--sans-controle]]
+if __name__ == "__main__":
+    import argparse
+    import time
+    import tracemalloc
+
+    from calculs import charger_donnees
+
+    parser = argparse.ArgumentParser(description="Agrégats parallèles ou en flux, comparés au calcul direct")
+    parser.add_argument('--processus', type=int)
+    parser.add_argument('--flux', action='store_true', help="lecture du fichier par lots")
+    parser.add_argument('--fichier', default=FICHIER_CSV)
+    parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT)
+    parser.add_argument('--sans-controle', action='store_true', help="ne charge pas le fichier entier")
+    arguments = parser.parse_args()
+
+    if arguments.flux:
+        tracemalloc.start()
+        debut = time.perf_counter()
+        agregats, tas = agreger_fichier(arguments.fichier, taille_lot=arguments.taille_lot)
+        duree = time.perf_counter() - debut
+        pic = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        print(f" Flux : {agregats.total} clients en {duree:.2f} s, pic mémoire {pic:.0f} Mo")
+        if not arguments.sans_controle and arguments.fichier == FICHIER_CSV:
+            ecarts = verifier_parite(charger_donnees(), agregats, tas=tas)
+            print(" Parité flux :", "OK" if not ecarts else f"écarts sur {ecarts}")
+    else:
+        df = charger_donnees()
+        if df is not None:
+            for partition in PARTITIONS:
+                debut = time.perf_counter()
+                agregats = agreger_en_parallele(df, partition, processus=arguments.processus)
+                duree = time.perf_counter() - debut
+                ecarts = verifier_parite(df, agregats)
+                print(f" Partition '{partition}' : {duree:.2f} s,",
+                      "parité OK" if not ecarts else f"écarts sur {ecarts}")
@@ -1,8 +1,20 @@
+import os
+
 import streamlit as st
 import pandas as pd
-from calculs import *
-from visualisations import *
-from emails import *
+from calculs import IndexScoreRisque
+from pagination import TAILLE_PAGE, calculer_ordres, nombre_pages, paginer
+from cohortes import matrice_retention
+from modele import dates_debut
+from chargement import ChargeurDonnees
+from rapports import FORMATS, TYPES_RAPPORT, GenerateurRapports, nom_fichier
+from instrumentation import (
+    NB_EXECUTIONS, demarrer_execution, dernieres_executions, exporter_openmetrics,
+    instrumenter, latences_par_section, mesure, terminer_execution
+)
+
+# Les modules lourds (plotly via visualisations, emails) sont importés
+# dans les pages qui les utilisent, pour accélérer le démarrage
 
 # Configuration de la page
 st.set_page_config(
@@ -15,29 +27,155 @@ st.set_page_config(
 st.title("Système de Gestion des Abonnements")
 st.markdown("### Analyse de la Rétention et Reporting")
 
-# Charger les données
-@st.cache_data
-def load_data():
-    return charger_donnees()
+# Mesure des sections de cette exécution (page Performance)
+execution = demarrer_execution()
+
+# Page Performance cachée : ?performance=1 dans l'URL ou AFFICHER_PERFORMANCE=1
+AFFICHER_PERFORMANCE = (
+    st.query_params.get('performance') == '1'
+    or os.environ.get('AFFICHER_PERFORMANCE') == '1'
+)
+
+# Charger les données : modèle en lecture seule partagé entre les reruns
+# (dates converties et colonnes dérivées calculées une seule fois).
+# Le chargeur suit la version du fichier : il recharge le CSV quand son
+# contenu change (seulement les lignes ajoutées si possible)
+@st.cache_resource
+def load_chargeur():
+    return ChargeurDonnees()
 
-df = load_data()
+# La version des données est la clé de tous les caches dérivés ci-dessous.
+# L'instantané est gardé pour tout le rerun : l'index de recherche
+# interrogé est celui du df affiché
+with mesure('app.load_data'):
+    instantane = load_chargeur().actualiser()
+    df, version_donnees = instantane.modele, instantane.version
 
 if df is None:
     st.error("Aucune donnée trouvée. Exécutez 'python generate_data.py' d'abord.")
     st.stop()
 
+# Index de recherche des clients de l'instantané : construit une fois, puis
+# dérivé par le chargeur pour les lignes modifiées ou ajoutées
+@instrumenter(section='app.load_index')
+def load_index():
+    return instantane.index_recherche()
+
+# Index des clients actifs trié par score de risque
+@instrumenter(section='app.load_index_risque')
+@st.cache_resource(max_entries=2)
+def load_index_risque(version, _df):
+    return IndexScoreRisque(_df)
+
+index_risque = load_index_risque(version_donnees, df)
+
+# Matrice de rétention des cohortes, en cache par version du fichier de données
+matrice_cohortes = matrice_retention(df, version=version_donnees)
+
+# Ordres de tri précalculés (score de risque)
+@instrumenter(section='app.load_ordres')
+@st.cache_resource(max_entries=2)
+def load_ordres(version, _df):
+    return calculer_ordres(_df)
+
+# Rapports générés en arrière-plan, en cache par (type, format, version des données)
+# et partagés entre les sessions
+@st.cache_resource
+def load_generateur():
+    # Agrégats des gros rapports sur plusieurs processus : opt-in par PROCESSUS_AGREGATS
+    return GenerateurRapports(processus=int(os.environ.get('PROCESSUS_AGREGATS', 0)) or None)
+
+def afficher_dataframe(*args, **kwargs):
+    """
+    st.dataframe mesuré (sérialisation de la table vers le navigateur)
+    """
+    with mesure('st.dataframe'):
+        st.dataframe(*args, **kwargs)
+
+def afficher_graphique(fig):
+    """
+    st.plotly_chart mesuré (sérialisation de la figure)
+    """
+    with mesure('st.plotly_chart'):
+        st.plotly_chart(fig, use_container_width=True)
+
+def afficher_export(type_rapport, format_export):
+    """
+    Progression du rapport en cours de génération, puis bouton de téléchargement
+    """
+    travail = load_generateur().demander(type_rapport, format_export, df, version_donnees)
+    # Les petits rapports sont prêts avant la fin de cette exécution
+    en_cours = not travail.attendre(0.2)
+    
+    # Pendant la génération, seul ce fragment est réexécuté
+    @st.fragment(run_every=0.5 if en_cours else None)
+    def export():
+        if not travail.termine:
+            st.progress(travail.progression, text=travail.message)
+        elif en_cours:
+            # Terminé : réexécution complète, sans rafraîchissement périodique
+            st.rerun()
+        elif travail.erreur is not None:
+            st.error(f"Échec de la génération du rapport : {travail.erreur}")
+        else:
+            _, mime, libelle = FORMATS[format_export]
+            st.download_button(
+                label=f"Télécharger en {libelle}",
+                data=travail.contenu,
+                file_name=nom_fichier(type_rapport, format_export),
+                mime=mime
+            )
+            st.success(f"Rapport généré avec succès ! ({travail.duree:.1f} s)")
+    
+    export()
+
+def afficher_table_paginee(cle, positions, colonnes, tri_defaut=None):
+    """
+    Affiche une table paginée : seule la page visible est calculée et envoyée au navigateur
+    """
+    options_tri = ['Aucun'] + colonnes
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        tri = st.selectbox(
+            "Trier par", options_tri,
+            index=options_tri.index(tri_defaut) if tri_defaut else 0,
+            key=f"{cle}_tri"
+        )
+    with col2:
+        sens = st.selectbox("Ordre", ["Décroissant", "Croissant"], key=f"{cle}_sens")
+    with col3:
+        nb_pages = nombre_pages(len(positions))
+        page = st.number_input("Page", min_value=1, max_value=nb_pages, value=1, key=f"{cle}_page")
+    
+    afficher_dataframe(
+        paginer(
+            df, positions, page,
+            tri=None if tri == 'Aucun' else tri,
+            ascendant=(sens == "Croissant"),
+            ordres=load_ordres(version_donnees, df),
+            colonnes=colonnes
+        ),
+        use_container_width=True,
+        hide_index=True
+    )
+    st.caption(f"Page {page} / {nb_pages} - {len(positions)} clients au total")
+
 # Sidebar - Menu de navigation
-menu = st.sidebar.selectbox(
-    "Menu",
-    ["Dashboard", "Clients", "Graphiques", "Emails & Alertes", "Rapports"]
-)
+pages = ["Dashboard", "Clients", "Graphiques", "Emails & Alertes", "Rapports"]
+if AFFICHER_PERFORMANCE:
+    pages.append("Performance")
+
+menu = st.sidebar.selectbox("Menu", pages)
+execution['page'] = menu
 
 # ========== PAGE 1 : DASHBOARD ==========
 if menu == "Dashboard":
     st.header("Tableau de Bord Principal")
     
-    # Calculer les métriques
-    metriques = calculer_metriques(df)
+    # Métriques et analyse par plan publiées dans l'instantané : le chargeur les
+    # tient à jour de façon incrémentale (pas de nouveau parcours des clients)
+    metriques = instantane.metriques
     
     # Afficher les KPIs en colonnes
     col1, col2, col3, col4 = st.columns(4)
@@ -72,19 +210,20 @@ if menu == "Dashboard":
     
     st.markdown("---")
     
-    # Graphiques principaux
+    # Graphiques principaux (plotly chargé après l'affichage des KPIs)
+    from visualisations import figure_en_cache
+    
     col1, col2 = st.columns(2)
     
     with col1:
-        st.plotly_chart(graphique_statuts(df), use_container_width=True)
+        afficher_graphique(figure_en_cache('statuts', df, version_donnees))
     
     with col2:
-        st.plotly_chart(graphique_repartition_plans(df), use_container_width=True)
+        afficher_graphique(figure_en_cache('repartition_plans', df, version_donnees))
     
     # Analyse par plan
     st.subheader("Analyse par Plan d'Abonnement")
-    analyse_plan = analyser_par_plan(df)
-    st.dataframe(analyse_plan, use_container_width=True)
+    afficher_dataframe(instantane.par_plan, use_container_width=True)
 
 # ========== PAGE 2 : CLIENTS ==========
 elif menu == "Clients":
@@ -110,32 +249,29 @@ elif menu == "Clients":
     with col3:
         recherche = st.text_input("Rechercher un client (nom ou email)")
     
-    # Appliquer les filtres
-    df_filtre = df[df['statut'].isin(filtre_statut) & df['plan'].isin(filtre_plan)]
-    
-    if recherche:
-        df_filtre = df_filtre[
-            df_filtre['nom'].str.contains(recherche, case=False) |
-            df_filtre['email'].str.contains(recherche, case=False)
-        ]
+    # Appliquer les filtres et la recherche via l'index
+    positions = load_index().rechercher(recherche, statuts=filtre_statut, plans=filtre_plan)
     
     # Afficher le nombre de résultats
-    st.info(f"{len(df_filtre)} clients affichés")
+    st.info(f"{len(positions)} clients affichés")
     
-    # Tableau des clients
-    st.dataframe(
-        df_filtre[['id', 'nom', 'email', 'plan', 'prix_mensuel', 'statut', 'score_risque']],
-        use_container_width=True,
-        hide_index=True
+    # Tableau des clients (paginé)
+    afficher_table_paginee(
+        'clients', positions,
+        ['id', 'nom', 'email', 'plan', 'prix_mensuel', 'statut', 'score_risque']
     )
     
     # Clients à risque
     st.subheader("Clients à Risque de Churn")
-    clients_risque = identifier_clients_risque(df, seuil=0.7)
-    
-    if len(clients_risque) > 0:
-        st.warning(f"{len(clients_risque)} clients présentent un risque élevé de churn !")
-        st.dataframe(clients_risque, use_container_width=True, hide_index=True)
+    positions_risque = index_risque.positions[:index_risque.compter(0.7)]
+    
+    if len(positions_risque) > 0:
+        st.warning(f"{len(positions_risque)} clients présentent un risque élevé de churn !")
+        afficher_table_paginee(
+            'risque', positions_risque,
+            ['id', 'nom', 'email', 'plan', 'score_risque'],
+            tri_defaut='score_risque'
+        )
     else:
         st.success("Aucun client à risque détecté")
 
@@ -143,33 +279,40 @@ elif menu == "Clients":
 elif menu == "Graphiques":
     st.header("Visualisations et Analyses")
     
+    from visualisations import figure_en_cache
+    
     # Onglets pour différents types de graphiques
     tab1, tab2, tab3, tab4 = st.tabs([
         "Évolution", "Revenus", "Cohortes", "Risque Churn"
     ])
     
     with tab1:
-        st.plotly_chart(graphique_evolution_clients(df), use_container_width=True)
+        afficher_graphique(figure_en_cache('evolution_clients', df, version_donnees))
     
     with tab2:
-        st.plotly_chart(graphique_revenu_par_plan(df), use_container_width=True)
+        afficher_graphique(figure_en_cache('revenu_par_plan', df, version_donnees))
     
     with tab3:
-        st.plotly_chart(graphique_cohorte_retention(df), use_container_width=True)
+        afficher_graphique(figure_en_cache('cohorte_retention', df, version_donnees))
         
         st.info("Une cohorte regroupe tous les clients inscrits le même mois. "
-                "Le graphique montre le taux de rétention pour chaque cohorte.")
+                "Chaque case montre la part des clients de la cohorte encore présents "
+                "N mois après leur inscription.")
     
     with tab4:
-        st.plotly_chart(graphique_risque_churn(df), use_container_width=True)
+        afficher_graphique(figure_en_cache('risque_churn', df, version_donnees, seuil=0.7))
         
-        clients_risque = len(df[(df['statut'] == 'actif') & (df['score_risque'] >= 0.7)])
+        clients_risque = index_risque.compter(0.7)
         st.warning(f"{clients_risque} clients actifs présentent un score de risque >= 0.7")
 
 # ========== PAGE 4 : EMAILS & ALERTES ==========
 elif menu == "Emails & Alertes":
     st.header("Système d'Emails Automatiques et Alertes")
     
+    from emails import (
+        charger_modeles, envoyer_emails_en_flux, generer_alertes_en_flux, lire_campagne, rendre_email
+    )
+    
     tab1, tab2 = st.tabs(["Emails de Relance", "Alertes Churn"])
     
     with tab1:
@@ -180,25 +323,35 @@ elif menu == "Emails & Alertes":
         
         if st.button("Générer les Emails de Relance"):
             with st.spinner("Génération en cours..."):
-                emails_df = simuler_envoi_emails(df)
-                st.success(f"{len(emails_df)} emails générés avec succès !")
+                # Écriture par lots : la mémoire reste bornée quel que soit le nombre de clients
+                # Seuls les paramètres de chaque email sont enregistrés (modèle et date une fois par fichier)
+                nb_emails = envoyer_emails_en_flux(df, chemin='emails_relance_params.csv', mode='modele')
+                st.success(f"{nb_emails} emails générés avec succès !")
                 
-                # Aperçu des emails
+                # Aperçu des emails (texte rendu à la demande)
                 st.subheader("Aperçu des Emails")
-                for _, email in emails_df.head(3).iterrows():
+                modeles = charger_modeles()
+                campagne = lire_campagne('emails_relance_params.csv')
+                apercu = pd.read_csv('emails_relance_params.csv', nrows=3)
+                for _, email in apercu.iterrows():
+                    sujet, corps = rendre_email(email, modeles, campagne)
                     with st.expander(f"Email pour {email['nom']}"):
                         st.write(f"**À:** {email['destinataire']}")
-                        st.write(f"**Sujet:** {email['sujet']}")
-                        st.text_area("Corps:", email['corps'], height=200, disabled=True)
+                        st.write(f"**Sujet:** {sujet}")
+                        st.text_area("Corps:", corps, height=200, disabled=True)
     
     with tab2:
         st.subheader("Alertes pour l'Équipe Marketing")
         
         seuil = st.slider("Seuil de risque", 0.0, 1.0, 0.7, 0.05)
+        st.info(f"{index_risque.compter(seuil)} clients actifs au-dessus du seuil")
         
         if st.button("Générer les Alertes"):
             with st.spinner("Génération des alertes..."):
-                alertes_df = generer_alertes_equipe(df, seuil=seuil)
+                generer_alertes_en_flux(df, chemin='alertes_churn_params.csv', seuil=seuil, mode='modele')
+                alertes_df = pd.read_csv('alertes_churn_params.csv')
+                modeles = charger_modeles()
+                campagne = lire_campagne('alertes_churn_params.csv')
                 
                 if len(alertes_df) > 0:
                     st.error(f"{len(alertes_df)} clients nécessitent une attention immédiate !")
@@ -209,7 +362,8 @@ elif menu == "Emails & Alertes":
                             st.write(f"**Client ID:** {alerte['client_id']}")
                             st.write(f"**Email:** {alerte['email']}")
                             st.write(f"**Score de risque:** {alerte['score_risque']}")
-                            st.text_area("Message d'alerte:", alerte['corps'], height=200, disabled=True)
+                            _, corps = rendre_email(alerte, modeles, campagne)
+                            st.text_area("Message d'alerte:", corps, height=200, disabled=True)
                 else:
                     st.success("Aucune alerte au seuil spécifié")
 
@@ -219,26 +373,25 @@ elif menu == "Rapports":
     
     st.subheader("Rapport Mensuel de Performance")
     
-    # Calculer les métriques
-    metriques = calculer_metriques(df)
+    # Métriques tenues à jour par le chargeur (pas de nouveau parcours des clients)
+    metriques = instantane.metriques
     
     # Options de rapport
     col1, col2 = st.columns(2)
     
     with col1:
-        type_rapport = st.selectbox(
-            "Type de rapport",
-            ["Rapport Complet", "Rapport Financier", "Rapport Clients", "Rapport Churn"]
-        )
+        type_rapport = st.selectbox("Type de rapport", TYPES_RAPPORT)
     
     with col2:
-        format_export = st.selectbox(
-            "Format d'export",
-            ["CSV", "Excel", "Texte"]
-        )
+        format_export = st.selectbox("Format d'export", list(FORMATS))
     
-    # Bouton de génération
+    # Bouton de génération : le fichier est produit en arrière-plan,
+    # le rapport reste affiché pendant les reruns qui suivent sa progression
     if st.button("Générer le Rapport"):
+        st.session_state['rapport_demande'] = (type_rapport, format_export)
+        load_generateur().demander(type_rapport, format_export, df, version_donnees, relancer=True)
+    
+    if st.session_state.get('rapport_demande') == (type_rapport, format_export):
         st.markdown("---")
         
         # ========== RAPPORT COMPLET ==========
@@ -261,19 +414,16 @@ elif menu == "Rapports":
             
             # Section 2 : Analyse par Plan
             st.markdown("### 2. Analyse par Plan d'Abonnement")
-            analyse_plan = analyser_par_plan(df)
-            st.dataframe(analyse_plan, use_container_width=True)
+            afficher_dataframe(instantane.par_plan, use_container_width=True)
             
             # Section 3 : Cohortes
             st.markdown("### 3. Analyse de Cohorte")
-            cohortes = analyser_cohortes(df)
-            st.dataframe(cohortes.tail(6), use_container_width=True)
+            afficher_dataframe(matrice_cohortes.tableau().tail(6), use_container_width=True)
             
             # Section 4 : Clients à Risque
             st.markdown("### 4. Clients à Risque")
-            clients_risque = identifier_clients_risque(df, seuil=0.7)
-            st.warning(f"{len(clients_risque)} clients à risque détectés")
-            st.dataframe(clients_risque.head(10), use_container_width=True)
+            st.warning(f"{index_risque.compter(0.7)} clients à risque détectés")
+            afficher_dataframe(index_risque.au_dessus(0.7, k=10), use_container_width=True)
         
         # ========== RAPPORT FINANCIER ==========
         elif type_rapport == "Rapport Financier":
@@ -296,7 +446,7 @@ elif menu == "Rapports":
             revenu_plan.columns = ['Plan', 'Revenu Mensuel (MAD)']
             revenu_plan['% du Total'] = (revenu_plan['Revenu Mensuel (MAD)'] / metriques['mrr'] * 100).round(2)
             
-            st.dataframe(revenu_plan, use_container_width=True, hide_index=True)
+            afficher_dataframe(revenu_plan, use_container_width=True, hide_index=True)
             
             st.markdown("### Projections")
             st.info(f"**Projection Trimestrielle:** {metriques['mrr'] * 3:,.0f} MAD")
@@ -312,19 +462,19 @@ elif menu == "Rapports":
             with col1:
                 st.metric("Total Clients", metriques['total_clients'])
             with col2:
-                st.metric("Nouveaux Clients (30j)", len(df[pd.to_datetime(df['date_debut']) >= pd.Timestamp.now() - pd.Timedelta(days=30)]))
+                st.metric("Nouveaux Clients (30j)", len(df[dates_debut(df) >= pd.Timestamp.now() - pd.Timedelta(days=30)]))
             with col3:
                 st.metric("Clients Perdus", metriques['clients_annules'])
             
             st.markdown("### Répartition par Statut")
             statut_count = df['statut'].value_counts().reset_index()
             statut_count.columns = ['Statut', 'Nombre']
-            st.dataframe(statut_count, use_container_width=True, hide_index=True)
+            afficher_dataframe(statut_count, use_container_width=True, hide_index=True)
             
             st.markdown("### Répartition Géographique (Top 10 Villes)")
             villes = df['ville'].value_counts().head(10).reset_index()
             villes.columns = ['Ville', 'Nombre de Clients']
-            st.dataframe(villes, use_container_width=True, hide_index=True)
+            afficher_dataframe(villes, use_container_width=True, hide_index=True)
         
         # ========== RAPPORT CHURN ==========
         elif type_rapport == "Rapport Churn":
@@ -338,15 +488,16 @@ elif menu == "Rapports":
             with col2:
                 st.metric("Clients Annulés", metriques['clients_annules'])
             with col3:
-                clients_risque_count = len(df[(df['statut'] == 'actif') & (df['score_risque'] >= 0.7)])
+                clients_risque_count = index_risque.compter(0.7)
                 st.metric("Clients à Risque", clients_risque_count)
             
             st.markdown("### Clients à Haut Risque")
-            clients_risque = identifier_clients_risque(df, seuil=0.7)
-            
-            if len(clients_risque) > 0:
-                st.error(f"{len(clients_risque)} clients nécessitent une intervention immédiate")
-                st.dataframe(clients_risque, use_container_width=True, hide_index=True)
+            # Seuls les clients affichés sont extraits de l'index trié par score
+            if clients_risque_count > 0:
+                st.error(f"{clients_risque_count} clients nécessitent une intervention immédiate")
+                afficher_dataframe(index_risque.au_dessus(0.7, k=TAILLE_PAGE), use_container_width=True, hide_index=True)
+                if clients_risque_count > TAILLE_PAGE:
+                    st.caption(f"{TAILLE_PAGE} premiers clients affichés - liste complète dans l'export")
                 
                 # Recommandations
                 st.markdown("### Recommandations")
@@ -363,74 +514,41 @@ elif menu == "Rapports":
             st.markdown("### Analyse du Churn par Plan")
             churn_plan = df[df['statut'] == 'annulé'].groupby('plan').size().reset_index()
             churn_plan.columns = ['Plan', 'Clients Annulés']
-            st.dataframe(churn_plan, use_container_width=True, hide_index=True)
+            afficher_dataframe(churn_plan, use_container_width=True, hide_index=True)
         
         # Export des données
         st.markdown("---")
         st.subheader("Export du Rapport")
         
-        if format_export == "CSV":
-            csv = df.to_csv(index=False, encoding='utf-8')
-            st.download_button(
-                label="Télécharger en CSV",
-                data=csv,
-                file_name=f"rapport_{type_rapport.replace(' ', '_').lower()}.csv",
-                mime="text/csv"
-            )
-        
-        elif format_export == "Excel":
-            # Note : Nécessite openpyxl
-            from io import BytesIO
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Données', index=False)
-                analyser_par_plan(df).to_excel(writer, sheet_name='Par Plan')
-                identifier_clients_risque(df).to_excel(writer, sheet_name='Clients à Risque', index=False)
-            
-            st.download_button(
-                label="Télécharger en Excel",
-                data=output.getvalue(),
-                file_name=f"rapport_{type_rapport.replace(' ', '_').lower()}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-        
-        else:  # Texte
-            rapport_texte = f"""
-===========================================
-RAPPORT DE GESTION DES ABONNEMENTS
-===========================================
-
-Date de génération : {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}
-
-MÉTRIQUES PRINCIPALES
----------------------
-Total Clients : {metriques['total_clients']}
-Clients Actifs : {metriques['clients_actifs']}
-Clients Annulés : {metriques['clients_annules']}
-Taux de Churn : {metriques['taux_churn']}%
-Taux de Rétention : {metriques['taux_retention']}%
+        afficher_export(type_rapport, format_export)
 
-FINANCES
---------
-MRR : {metriques['mrr']:,.0f} MAD
-ARPU : {metriques['arpu']:.0f} MAD
-LTV Moyen : {metriques['ltv_moyen']:,.0f} MAD
-
-CLIENTS À RISQUE
-----------------
-Nombre : {len(identifier_clients_risque(df, seuil=0.7))}
-
-===========================================
-            """
-            
-            st.download_button(
-                label="Télécharger en TXT",
-                data=rapport_texte,
-                file_name=f"rapport_{type_rapport.replace(' ', '_').lower()}.txt",
-                mime="text/plain"
-            )
+# ========== PAGE 6 : PERFORMANCE (cachée) ==========
+elif menu == "Performance":
+    st.header("Performance des Dernières Exécutions")
+    
+    nombre = st.slider("Nombre d'exécutions", min_value=1, max_value=NB_EXECUTIONS, value=10)
+    executions = dernieres_executions(nombre)
+    
+    if not executions:
+        st.info("Aucune exécution terminée pour l'instant : naviguez dans l'application puis revenez ici.")
+    else:
+        latences = latences_par_section(executions)
+        sections = [c for c in latences.columns if c not in ('date', 'page', 'total_ms')]
         
-        st.success("Rapport généré avec succès !")
+        # Résumé par section : durée médiane et maximale (ms)
+        resume = latences[sections + ['total_ms']].agg(['median', 'max']).T
+        resume.columns = ['Médiane (ms)', 'Max (ms)']
+        afficher_dataframe(resume.sort_values('Médiane (ms)', ascending=False).round(2), use_container_width=True)
+        
+        st.subheader("Détail par exécution (ms)")
+        afficher_dataframe(latences.iloc[::-1].round(2), use_container_width=True, hide_index=True)
+    
+    st.download_button(
+        label="Exporter (OpenMetrics)",
+        data=exporter_openmetrics(),
+        file_name="performance.prom",
+        mime="text/plain"
+    )
 
 # ========== FOOTER ==========
 st.markdown("---")
@@ -439,4 +557,6 @@ st.markdown("""
     Système de Gestion des Abonnements | Développé avec Streamlit & Python<br>
     Version 1.0 | 2026
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+terminer_execution()
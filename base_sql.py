@@ -0,0 +1,320 @@
+import os
+import sqlite3
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from evenements import FICHIER_EVENEMENTS, lire_evenements
+from metriques_incrementales import SOUSCRIPTION, ANNULATION, EXPIRATION, CHANGEMENT_PLAN
+from stockage import FICHIER_CSV, signature_fichier
+
+FICHIER_SQLITE = 'clients_data.sqlite'
+
+# Nombre de lignes du CSV insérées par lot lors de la construction
+TAILLE_LOT = 100_000
+
+# Actualisations de la base (reconstruction et application du journal) une à une
+_verrou = threading.Lock()
+
+TABLE = """
+CREATE TABLE clients (
+    id TEXT NOT NULL,
+    nom TEXT,
+    email TEXT,
+    telephone TEXT,
+    plan TEXT,
+    prix_mensuel INTEGER,
+    date_debut TEXT,
+    date_fin TEXT,
+    statut TEXT,
+    ville TEXT,
+    score_risque REAL
+)
+"""
+
+# Index utilisés par les agrégations et les filtres
+INDEX = [
+    "CREATE UNIQUE INDEX idx_clients_id ON clients (id)",
+    "CREATE INDEX idx_clients_statut ON clients (statut)",
+    "CREATE INDEX idx_clients_plan ON clients (plan, statut, prix_mensuel)",
+    "CREATE INDEX idx_clients_date_debut ON clients (date_debut, statut)",
+    "CREATE INDEX idx_clients_score ON clients (statut, score_risque)"
+]
+
+COLONNES = [
+    'id', 'nom', 'email', 'telephone', 'plan', 'prix_mensuel',
+    'date_debut', 'date_fin', 'statut', 'ville', 'score_risque'
+]
+
+def construire_base(chemin_csv=FICHIER_CSV, chemin_base=FICHIER_SQLITE, taille_lot=TAILLE_LOT):
+    """
+    Construit la base SQLite à partir du CSV, lu par lots (sans tout charger en mémoire)
+    """
+    # Nom unique dans le dossier de la base : des constructions simultanées
+    # (autres processus) n'écrivent pas dans le même fichier temporaire
+    descripteur, temporaire = tempfile.mkstemp(
+        prefix=f"{os.path.basename(chemin_base)}.", suffix='.tmp',
+        dir=os.path.dirname(os.path.abspath(chemin_base))
+    )
+    os.close(descripteur)
+
+    connexion = sqlite3.connect(temporaire)
+    try:
+        connexion.execute("PRAGMA journal_mode = OFF")
+        connexion.execute("PRAGMA synchronous = OFF")
+        connexion.execute(TABLE)
+        connexion.execute("CREATE TABLE meta (cle TEXT PRIMARY KEY, valeur TEXT)")
+
+        insertion = f"INSERT INTO clients VALUES ({', '.join('?' * len(COLONNES))})"
+        lots = pd.read_csv(
+            chemin_csv, chunksize=taille_lot, dtype={'date_debut': str, 'date_fin': str}
+        )
+        for lot in lots:
+            lot = lot[COLONNES].astype(object).where(lot[COLONNES].notna(), None)
+            connexion.executemany(insertion, lot.itertuples(index=False, name=None))
+
+        for requete in INDEX:
+            connexion.execute(requete)
+        connexion.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [('signature_csv', signature_fichier(chemin_csv)), ('journal', '')]
+        )
+        connexion.commit()
+    except BaseException:
+        connexion.close()
+        os.remove(temporaire)
+        raise
+    connexion.close()
+
+    os.replace(temporaire, chemin_base)
+
+def _date_sql(date):
+    return None if pd.isna(date) else pd.Timestamp(date).strftime('%Y-%m-%d')
+
+def appliquer_evenements_sql(connexion, evenements):
+    """
+    Répercute des événements d'abonnement dans la base (mêmes règles que
+    evenements.appliquer_evenements)
+    """
+    for evenement in evenements.itertuples(index=False):
+        date = _date_sql(evenement.date)
+        if evenement.type == SOUSCRIPTION:
+            champs = [None if pd.isna(v) else v for v in (
+                evenement.nom, evenement.email, evenement.telephone,
+                evenement.ville, evenement.score_risque
+            )]
+            connexion.execute(
+                """
+                INSERT INTO clients (id, nom, email, telephone, ville, score_risque,
+                                     plan, prix_mensuel, date_debut, date_fin, statut)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, 'actif')
+                ON CONFLICT (id) DO UPDATE SET
+                    nom = COALESCE(excluded.nom, nom),
+                    email = COALESCE(excluded.email, email),
+                    telephone = COALESCE(excluded.telephone, telephone),
+                    ville = COALESCE(excluded.ville, ville),
+                    score_risque = COALESCE(excluded.score_risque, score_risque),
+                    plan = excluded.plan,
+                    prix_mensuel = excluded.prix_mensuel,
+                    date_debut = excluded.date_debut,
+                    date_fin = NULL,
+                    statut = 'actif'
+                """,
+                [evenement.id, *champs, evenement.plan, int(evenement.prix_mensuel), date]
+            )
+        elif evenement.type in (ANNULATION, EXPIRATION):
+            statut = 'annulé' if evenement.type == ANNULATION else 'expiré'
+            connexion.execute(
+                "UPDATE clients SET statut = ?, date_fin = ? WHERE id = ?",
+                [statut, date, evenement.id]
+            )
+        elif evenement.type == CHANGEMENT_PLAN:
+            connexion.execute(
+                "UPDATE clients SET plan = ?, prix_mensuel = ? WHERE id = ?",
+                [evenement.plan, int(evenement.prix_mensuel), evenement.id]
+            )
+        else:
+            raise ValueError(f"Type d'événement inconnu : {evenement.type}")
+
+class BaseClients:
+    """
+    Données clients dans une base SQLite locale : les agrégations et les
+    filtres sont exécutés en SQL, seuls les résultats sont chargés en mémoire
+
+    Les fonctions de calculs (calculer_metriques, analyser_par_plan,
+    analyser_cohortes, identifier_clients_risque) acceptent une BaseClients
+    à la place du DataFrame
+    """
+
+    def __init__(self, chemin_base=FICHIER_SQLITE, chemin_csv=FICHIER_CSV,
+                 chemin_evenements=FICHIER_EVENEMENTS):
+        self.chemin_base = chemin_base
+        self.chemin_csv = chemin_csv
+        self.chemin_evenements = chemin_evenements
+
+    def _connexion(self):
+        # Une connexion par requête : utilisable depuis plusieurs fils (sessions Streamlit)
+        return sqlite3.connect(self.chemin_base)
+
+    def actualiser(self):
+        """
+        Reconstruit la base si le CSV a changé, puis applique les nouveaux
+        événements du journal
+        """
+        with _verrou:
+            return self._actualiser()
+
+    def _actualiser(self):
+        signature = signature_fichier(self.chemin_csv)
+        meta = {}
+        if os.path.exists(self.chemin_base):
+            connexion = self._connexion()
+            try:
+                meta = dict(connexion.execute("SELECT cle, valeur FROM meta"))
+            finally:
+                connexion.close()
+        if meta.get('signature_csv') != signature:
+            construire_base(self.chemin_csv, self.chemin_base)
+            meta = {'journal': ''}
+
+        # Position lue dans le journal : "inode:octets"
+        inode, position = (meta.get('journal') or ':0').split(':')
+        try:
+            infos = os.stat(self.chemin_evenements)
+        except FileNotFoundError:
+            return self
+        if str(infos.st_ino) != inode:
+            if inode:
+                # Journal compacté : le CSV a aussi changé, on repart de zéro
+                construire_base(self.chemin_csv, self.chemin_base)
+            position = 0
+
+        evenements, position = lire_evenements(self.chemin_evenements, depuis=int(position))
+        connexion = self._connexion()
+        try:
+            appliquer_evenements_sql(connexion, evenements)
+            connexion.execute(
+                "UPDATE meta SET valeur = ? WHERE cle = 'journal'",
+                [f"{infos.st_ino}:{position}"]
+            )
+            connexion.commit()
+        finally:
+            connexion.close()
+        return self
+
+    def requete(self, sql, parametres=()):
+        """
+        Exécute une requête et renvoie le résultat sous forme de DataFrame
+        """
+        connexion = self._connexion()
+        try:
+            return pd.read_sql_query(sql, connexion, params=parametres)
+        finally:
+            connexion.close()
+
+    # ---------- Équivalents SQL des fonctions de calculs ----------
+
+    def calculer_metriques(self):
+        ligne = self.requete("""
+            SELECT COUNT(*) AS total,
+                   SUM(statut = 'actif') AS actifs,
+                   SUM(statut = 'annulé') AS annules,
+                   SUM(CASE WHEN statut = 'actif' THEN prix_mensuel END) AS mrr,
+                   AVG(CASE WHEN statut = 'actif' THEN prix_mensuel END) AS arpu
+            FROM clients
+        """).iloc[0]
+
+        total, actifs, annules = int(ligne['total']), int(ligne['actifs'] or 0), int(ligne['annules'] or 0)
+        arpu = round(float(ligne['arpu']), 2) if actifs else np.nan
+
+        return {
+            'total_clients': total,
+            'clients_actifs': actifs,
+            'clients_annules': annules,
+            'taux_churn': round((annules / total) * 100, 2),
+            'taux_retention': round((actifs / total) * 100, 2),
+            'mrr': int(ligne['mrr'] or 0),
+            'arpu': arpu,
+            'ltv_moyen': round(arpu * 12, 2)
+        }
+
+    def analyser_par_plan(self):
+        return self.requete("""
+            SELECT plan,
+                   COUNT(id) AS nombre_clients,
+                   SUM(prix_mensuel) AS revenu_total,
+                   SUM(statut = 'actif') AS clients_actifs
+            FROM clients
+            WHERE plan IS NOT NULL
+            GROUP BY plan
+            ORDER BY plan
+        """).set_index('plan')
+
+    def analyser_cohortes(self):
+        cohortes = self.requete("""
+            SELECT substr(date_debut, 1, 7) AS mois_cohorte,
+                   COUNT(*) AS total,
+                   SUM(statut = 'actif') AS actifs
+            FROM clients
+            WHERE date_debut IS NOT NULL
+            GROUP BY mois_cohorte
+            ORDER BY mois_cohorte
+        """)
+        cohortes.index = pd.PeriodIndex(cohortes.pop('mois_cohorte'), freq='M', name='mois_cohorte')
+
+        cohortes['taux_retention'] = round(
+            (cohortes['actifs'] / cohortes['total']) * 100, 2
+        )
+        return cohortes
+
+    def identifier_clients_risque(self, seuil=0.7):
+        return self.requete("""
+            SELECT id, nom, email, plan, score_risque
+            FROM clients
+            WHERE statut = 'actif' AND score_risque >= ?
+            ORDER BY score_risque DESC, rowid
+        """, (seuil,))
+
+def verifier_parite(df, base, seuils=(0.0, 0.5, 0.7, 0.9)):
+    """
+    Compare les résultats SQL à l'implémentation pandas
+    Renvoie la liste des fonctions divergentes (vide si tout est identique)
+    """
+    from calculs import calculer_metriques, analyser_par_plan, analyser_cohortes, identifier_clients_risque
+
+    ecarts = []
+
+    attendu, obtenu = calculer_metriques(df), base.calculer_metriques()
+    if any(not np.isclose(valeur, obtenu[cle], equal_nan=True) for cle, valeur in attendu.items()):
+        ecarts.append('calculer_metriques')
+
+    attendu, obtenu = analyser_par_plan(df), base.analyser_par_plan()
+    attendu = attendu[attendu['nombre_clients'] > 0]
+    if list(attendu.index.astype(str)) != list(obtenu.index) \
+            or not np.array_equal(attendu.to_numpy(), obtenu.to_numpy()):
+        ecarts.append('analyser_par_plan')
+
+    attendu, obtenu = analyser_cohortes(df), base.analyser_cohortes()
+    if not attendu.index.equals(obtenu.index) or not np.allclose(attendu.to_numpy(), obtenu.to_numpy()):
+        ecarts.append('analyser_cohortes')
+
+    for seuil in seuils:
+        attendu, obtenu = identifier_clients_risque(df, seuil), base.identifier_clients_risque(seuil)
+        # Ordre des scores égaux non garanti côté pandas : comparaison par ensemble
+        if sorted(attendu['id']) != sorted(obtenu['id']) \
+                or not np.allclose(attendu['score_risque'].to_numpy(), obtenu['score_risque'].to_numpy()):
+            ecarts.append(f'identifier_clients_risque({seuil})')
+
+    return ecarts
+
+# Construction et contrôle : python base_sql.py
+if __name__ == "__main__":
+    from calculs import charger_donnees
+
+    base = BaseClients().actualiser()
+    df = charger_donnees()
+    if df is not None:
+        ecarts = verifier_parite(df, base)
+        print("\n Parité SQLite / pandas :", "OK" if not ecarts else f"écarts sur {ecarts}")
@@ -0,0 +1,78 @@
+import argparse
+import os
+import subprocess
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules importés au démarrage de app.py, puis par les pages qui en ont besoin
+SOCLE = [
+    'streamlit', 'pandas', 'calculs', 'metriques_incrementales', 'recherche',
+    'pagination', 'cohortes', 'stockage', 'modele', 'instrumentation',
+    'chargement', 'rapports'
+]
+PAGES = {
+    'Dashboard / Graphiques': ['visualisations'],
+    'Emails & Alertes': ['emails']
+}
+
+def temps_import(modules):
+    """
+    Importe les modules dans un interpréteur neuf avec -X importtime
+    Renvoie le temps total (ms) et le temps cumulé de chaque module de premier niveau
+    """
+    resultat = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+        capture_output=True, text=True, cwd=RACINE, check=True
+    )
+
+    cumuls = {}
+    for ligne in resultat.stderr.splitlines():
+        if not ligne.startswith('import time:') or 'cumulative' in ligne:
+            continue
+        _, cumul, module = ligne[len('import time:'):].split('|')
+        # Les sous-imports sont indentés : seul le premier niveau est additionné
+        module = module[1:]
+        if not module.startswith(' '):
+            cumuls[module] = int(cumul) / 1000
+
+    return sum(cumuls.values()), cumuls
+
+def mesurer(repetitions=3):
+    """
+    Meilleur temps d'import du socle et de chaque page (ms)
+    """
+    mesures = {}
+    socle = min(temps_import(SOCLE)[0] for _ in range(repetitions))
+    mesures['Démarrage (socle)'] = socle
+
+    for page, modules in PAGES.items():
+        total = min(temps_import(SOCLE + modules)[0] for _ in range(repetitions))
+        mesures[page] = total - socle
+
+    tout = [m for modules in PAGES.values() for m in modules]
+    mesures['Tout importer au démarrage'] = min(
+        temps_import(SOCLE + tout)[0] for _ in range(repetitions)
+    )
+    return mesures
+
+# Lancement : python -m benchmarks.bench_demarrage [--budget ms]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Temps d'import au démarrage de l'application")
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--budget', type=float, help="budget (ms) du démarrage")
+    parser.add_argument('--detail', action='store_true', help="modules les plus lents du socle")
+    arguments = parser.parse_args()
+
+    mesures = mesurer(arguments.repetitions)
+    for nom, duree in mesures.items():
+        print(f" {nom:<30} | {duree:8.1f} ms")
+
+    if arguments.detail:
+        _, cumuls = temps_import(SOCLE)
+        for module, duree in sorted(cumuls.items(), key=lambda m: -m[1])[:10]:
+            print(f"   {module:<28} | {duree:8.1f} ms")
+
+    if arguments.budget is not None and mesures['Démarrage (socle)'] > arguments.budget:
+        print(f" Budget dépassé : {mesures['Démarrage (socle)']:.1f} ms > {arguments.budget:.1f} ms")
+        sys.exit(1)
@@ -0,0 +1,183 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import emails
+from benchmarks.donnees import generer_donnees_synthetiques
+
+# ---------- Implémentation de référence (boucle iterrows) ----------
+
+def reference_email_relance(client):
+    """
+    Génère le contenu d'un email de relance
+    """
+    
+    sujet = f" {client['nom']}, votre abonnement nécessite votre attention"
+    
+    corps = f"""
+    Bonjour {client['nom']},
+    
+    Nous avons remarqué que votre abonnement {client['plan']} est actuellement inactif.
+    
+    Nous serions ravis de vous revoir parmi nos clients actifs !
+    
+     Offre spéciale : 20% de réduction sur votre prochain renouvellement
+    
+    Pour réactiver votre compte, cliquez ici : [LIEN]
+    
+    Cordialement,
+    L'équipe Gestion Abonnements
+    
+    ---
+    Prix mensuel : {client['prix_mensuel']} MAD
+    """
+    
+    return sujet, corps
+
+def reference_envoi_emails(df):
+    """
+    Simule l'envoi d'emails aux clients inactifs
+    """
+    
+    # Clients à relancer (annulés ou expirés)
+    clients_relancer = df[df['statut'].isin(['annulé', 'expiré'])]
+    
+    emails_generes = []
+    
+    for _, client in clients_relancer.iterrows():
+        sujet, corps = reference_email_relance(client)
+        
+        email_info = {
+            'destinataire': client['email'],
+            'nom': client['nom'],
+            'sujet': sujet,
+            'corps': corps,
+            'date_envoi': datetime.now().strftime('%Y-%m-%d %H:%M')
+        }
+        
+        emails_generes.append(email_info)
+    
+    # Sauvegarder les emails générés
+    df_emails = pd.DataFrame(emails_generes)
+    df_emails.to_csv('emails_relance.csv', index=False, encoding='utf-8')
+    
+    print(f" {len(emails_generes)} emails de relance générés et sauvegardés")
+    return df_emails
+
+def reference_email_alerte_churn(client):
+    """
+    Email d'alerte pour client à risque
+    """
+    
+    sujet = f" ALERTE : {client['nom']} présente un risque de churn élevé"
+    
+    corps = f"""
+    ALERTE ÉQUIPE MARKETING
+    
+    Client à risque détecté :
+    
+    Nom : {client['nom']}
+    Email : {client['email']}
+    Plan : {client['plan']}
+    Score de risque : {round(float(client['score_risque']), 2)}/1.0
+    
+    Actions recommandées :
+    - Contacter le client sous 48h
+    - Proposer une offre personnalisée
+    - Demander un feedback
+    
+    Ce message est généré automatiquement par le système.
+    """
+    
+    return sujet, corps
+
+def reference_alertes_equipe(df, seuil=0.7):
+    """
+    Génère des alertes pour l'équipe marketing
+    """
+    
+    clients_risque = df[
+        (df['statut'] == 'actif') & 
+        (df['score_risque'] >= seuil)
+    ]
+    
+    alertes = []
+    
+    for _, client in clients_risque.iterrows():
+        sujet, corps = reference_email_alerte_churn(client)
+        
+        alerte = {
+            'client_id': client['id'],
+            'nom': client['nom'],
+            'email': client['email'],
+            'score_risque': round(float(client['score_risque']), 2),
+            'sujet': sujet,
+            'corps': corps,
+            'date_alerte': datetime.now().strftime('%Y-%m-%d %H:%M')
+        }
+        
+        alertes.append(alerte)
+    
+    df_alertes = pd.DataFrame(alertes)
+    df_alertes.to_csv('alertes_churn.csv', index=False, encoding='utf-8')
+    
+    print(f" {len(alertes)} alertes générées pour l'équipe")
+    return df_alertes
+
+# ---------- Comparaison ----------
+
+class _DateFigee(datetime):
+    """
+    Horodatage figé pour comparer les fichiers octet par octet
+    """
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 1, 1, 12, 0)
+
+def comparer(df, reference, vectorisee, fichier):
+    """
+    Exécute les deux implémentations, renvoie les durées et vérifie les fichiers
+    """
+    emails.datetime = _DateFigee
+    globals()['datetime'] = _DateFigee
+    
+    debut = time.perf_counter()
+    reference(df)
+    duree_reference = time.perf_counter() - debut
+    with open(fichier, 'rb') as f:
+        octets_reference = f.read()
+    
+    debut = time.perf_counter()
+    vectorisee(df)
+    duree_vectorisee = time.perf_counter() - debut
+    with open(fichier, 'rb') as f:
+        octets_vectorises = f.read()
+    
+    return duree_reference, duree_vectorisee, octets_reference == octets_vectorises
+
+# Lancement : python -m benchmarks.bench_emails [tailles...]
+if __name__ == "__main__":
+    tailles = [int(t) for t in sys.argv[1:]] or [10_000, 100_000]
+    
+    # Les fichiers sont écrits dans un dossier temporaire, supprimé à la fin
+    repertoire = os.getcwd()
+    with tempfile.TemporaryDirectory() as dossier:
+        os.chdir(dossier)
+        try:
+            for taille in tailles:
+                df = generer_donnees_synthetiques(taille)
+
+                for nom, reference, vectorisee, fichier in [
+                    ('relance', reference_envoi_emails, emails.simuler_envoi_emails, 'emails_relance.csv'),
+                    ('alertes', reference_alertes_equipe, emails.generer_alertes_equipe, 'alertes_churn.csv'),
+                ]:
+                    avant, apres, identiques = comparer(df, reference, vectorisee, fichier)
+                    print(f" {taille:>10,} clients | {nom} | iterrows : {avant:.2f} s | "
+                          f"vectorisé : {apres:.2f} s | gain x{avant / apres:.0f} | "
+                          f"fichiers identiques : {identiques}")
+        finally:
+            os.chdir(repertoire)
@@ -0,0 +1,30 @@
+import argparse
+
+from benchmarks.bench_suite import mesurer
+from benchmarks.donnees import generer_donnees_synthetiques
+from modele import preparer_modele
+from rapports import rapport_excel
+from stockage import appliquer_schema
+
+MOTEURS = ['openpyxl', 'flux']
+
+# Au-delà, l'export openpyxl prend plusieurs minutes : il n'est pas mesuré par défaut
+TAILLE_MAX_OPENPYXL = 100_000
+
+# Lancement : python -m benchmarks.bench_excel [--tailles N ...] [--max-openpyxl N]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export Excel du rapport : openpyxl contre écriture en flux")
+    parser.add_argument('--tailles', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--max-openpyxl', type=int, default=TAILLE_MAX_OPENPYXL)
+    parser.add_argument('--repetitions', type=int, default=1)
+    arguments = parser.parse_args()
+
+    for taille in arguments.tailles:
+        df = preparer_modele(appliquer_schema(generer_donnees_synthetiques(taille)))
+        for moteur in MOTEURS:
+            if moteur == 'openpyxl' and taille > arguments.max_openpyxl:
+                continue
+            duree, pic = mesurer(rapport_excel, df, moteur=moteur, repetitions=arguments.repetitions)
+            taille_fichier = len(rapport_excel(df, moteur=moteur)) / 1e6
+            print(f" {taille:>12,} lignes | {moteur:<8} | {duree:8.2f} s | "
+                  f"pic {pic:8.1f} Mo | fichier {taille_fichier:6.1f} Mo")
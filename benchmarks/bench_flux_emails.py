@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import emails
+from benchmarks.donnees import generer_donnees_synthetiques
+
+def mesurer_pic(fonction, *args, **kwargs):
+    """
+    Renvoie la durée (s) et le pic de mémoire Python (Mo) d'un appel
+    """
+    tracemalloc.start()
+    debut = time.perf_counter()
+    fonction(*args, **kwargs)
+    duree = time.perf_counter() - debut
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duree, pic / 1e6
+
+def chemin_en_memoire(fichier_clients):
+    """
+    Chemin actuel : tout le fichier en mémoire puis un seul to_csv
+    """
+    emails.simuler_envoi_emails(pd.read_csv(fichier_clients))
+
+# Lancement : python -m benchmarks.bench_flux_emails [tailles...]
+if __name__ == "__main__":
+    tailles = [int(t) for t in sys.argv[1:]] or [100_000, 500_000]
+    
+    # Les fichiers sont écrits dans un dossier temporaire, supprimé à la fin
+    repertoire = os.getcwd()
+    with tempfile.TemporaryDirectory() as dossier:
+        os.chdir(dossier)
+        try:
+            for taille in tailles:
+                generer_donnees_synthetiques(taille).to_csv('clients_data.csv', index=False)
+
+                duree_memoire, pic_memoire = mesurer_pic(chemin_en_memoire, 'clients_data.csv')
+                duree_flux, pic_flux = mesurer_pic(emails.envoyer_emails_en_flux)
+                duree_gzip, pic_gzip = mesurer_pic(
+                    emails.envoyer_emails_en_flux, chemin='emails_relance.csv.gz', compression='gzip'
+                )
+
+                print(f" {taille:>10,} clients | en mémoire : {duree_memoire:.2f} s, {pic_memoire:.0f} Mo | "
+                      f"en flux : {duree_flux:.2f} s, {pic_flux:.0f} Mo | "
+                      f"gzip : {duree_gzip:.2f} s, {pic_gzip:.0f} Mo, "
+                      f"{os.path.getsize('emails_relance.csv.gz') / 1e6:.1f} Mo sur disque")
+        finally:
+            os.chdir(repertoire)
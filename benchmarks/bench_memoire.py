@@ -0,0 +1,43 @@
+import argparse
+import io
+
+import pandas as pd
+
+from benchmarks.donnees import generer_donnees_synthetiques
+from modele import COLONNES_TEXTE, modele_compact, octets_par_client, preparer_modele
+from stockage import lire_csv
+
+def dispositions(nombre):
+    """
+    La même table clients dans chaque disposition mémoire
+    """
+    contenu = io.BytesIO(generer_donnees_synthetiques(nombre).to_csv(index=False).encode('utf-8'))
+
+    brut = pd.read_csv(contenu)
+    contenu.seek(0)
+    modele = preparer_modele(lire_csv(contenu))
+    compact = modele_compact(modele)
+    textes = compact.assign(**{colonne: modele[colonne] for colonne in COLONNES_TEXTE})
+
+    return {
+        'CSV brut (types par défaut)': brut,
+        'Modèle typé': modele,
+        'Modèle compact': compact,
+        'Modèle compact + textes': textes
+    }
+
+# Lancement : python -m benchmarks.bench_memoire [--taille N] [--detail]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mémoire occupée par client selon la disposition")
+    parser.add_argument('--taille', type=int, default=1_000_000)
+    parser.add_argument('--detail', action='store_true', help="octets par client de chaque colonne")
+    arguments = parser.parse_args()
+
+    tables = dispositions(arguments.taille)
+    for nom, df in tables.items():
+        total, _ = octets_par_client(df)
+        print(f" {nom:<30} | {total:8.1f} octets/client | {total * len(df) / 1e6:8.1f} Mo")
+
+    if arguments.detail:
+        detail = pd.DataFrame({nom: octets_par_client(df)[1] for nom, df in tables.items()})
+        print(detail.fillna('-').to_string())
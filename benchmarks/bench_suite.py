@@ -0,0 +1,169 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import calculs
+import emails
+import visualisations
+from generate_data import generer_donnees_rapide
+from stockage import FICHIER_CSV, FICHIER_PARQUET, convertir_csv_en_parquet, pyarrow_disponible
+
+TAILLES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+# Fonctions mesurées sur le DataFrame chargé
+FONCTIONS = {
+    'calculer_metriques': calculs.calculer_metriques,
+    'analyser_par_plan': calculs.analyser_par_plan,
+    'analyser_cohortes': calculs.analyser_cohortes,
+    'identifier_clients_risque': calculs.identifier_clients_risque,
+    'simuler_envoi_emails': emails.simuler_envoi_emails,
+    'generer_alertes_equipe': emails.generer_alertes_equipe,
+    'graphique_evolution_clients': visualisations.graphique_evolution_clients,
+    'graphique_repartition_plans': visualisations.graphique_repartition_plans,
+    'graphique_statuts': visualisations.graphique_statuts,
+    'graphique_revenu_par_plan': visualisations.graphique_revenu_par_plan,
+    'graphique_cohorte_retention': visualisations.graphique_cohorte_retention,
+    'graphique_risque_churn': visualisations.graphique_risque_churn
+}
+
+def mesurer(fonction, *args, repetitions=3, **kwargs):
+    """
+    Renvoie le meilleur temps (s) sur plusieurs répétitions et le pic de
+    mémoire Python (Mo) d'un appel supplémentaire suivi par tracemalloc
+    """
+    meilleur = float('inf')
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction(*args, **kwargs)
+        meilleur = min(meilleur, time.perf_counter() - debut)
+
+    tracemalloc.start()
+    fonction(*args, **kwargs)
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return meilleur, pic / 1e6
+
+def version_code():
+    """
+    Commit courant du dépôt (None hors d'un dépôt git)
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def executer(tailles=TAILLES, repetitions=3, dossier=None):
+    """
+    Génère les jeux de données et mesure chaque fonction pour chaque taille
+    """
+    repertoire = os.getcwd()
+    resultats = []
+
+    # Les fonctions lisent et écrivent dans le répertoire courant ; sans dossier
+    # donné, les jeux de données sont écrits dans un dossier temporaire supprimé à la fin
+    with (contextlib.nullcontext(dossier) if dossier else tempfile.TemporaryDirectory()) as dossier:
+        os.chdir(dossier)
+        try:
+            for taille in tailles:
+                generer_donnees_rapide(taille, chemin=FICHIER_CSV)
+                if os.path.exists(FICHIER_PARQUET):
+                    os.remove(FICHIER_PARQUET)
+
+                mesures = {}
+                mesures['charger_donnees[csv]'] = mesurer(
+                    calculs.charger_donnees, format='csv', repetitions=repetitions
+                )
+                if pyarrow_disponible():
+                    convertir_csv_en_parquet()
+                    mesures['charger_donnees[parquet]'] = mesurer(
+                        calculs.charger_donnees, format='parquet', repetitions=repetitions
+                    )
+
+                df = calculs.charger_donnees()
+                for nom, fonction in FONCTIONS.items():
+                    mesures[nom] = mesurer(fonction, df, repetitions=repetitions)
+
+                for nom, (duree, pic) in mesures.items():
+                    resultats.append({
+                        'taille': taille,
+                        'fonction': nom,
+                        'duree_s': round(duree, 6),
+                        'pic_memoire_mo': round(pic, 3)
+                    })
+                    print(f" {taille:>12,} lignes | {nom:<30} | {duree:8.3f} s | {pic:9.1f} Mo")
+        finally:
+            os.chdir(repertoire)
+
+    return {
+        'version': version_code(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'repetitions': repetitions,
+        'resultats': resultats
+    }
+
+def comparer(ancien, nouveau, tolerance=0.2):
+    """
+    Liste les mesures plus lentes ou plus gourmandes en mémoire
+    que la référence, au-delà de la tolérance (20 % par défaut)
+    """
+    reference = {(r['taille'], r['fonction']): r for r in ancien['resultats']}
+    regressions = []
+
+    for resultat in nouveau['resultats']:
+        avant = reference.get((resultat['taille'], resultat['fonction']))
+        if avant is None:
+            continue
+        for mesure in ('duree_s', 'pic_memoire_mo'):
+            if avant[mesure] > 0 and resultat[mesure] > avant[mesure] * (1 + tolerance):
+                regressions.append({
+                    'taille': resultat['taille'],
+                    'fonction': resultat['fonction'],
+                    'mesure': mesure,
+                    'avant': avant[mesure],
+                    'apres': resultat[mesure]
+                })
+
+    return regressions
+
+# Lancement : python -m benchmarks.bench_suite [tailles...] [--sortie f.json] [--comparer ref.json]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesure du temps et de la mémoire des fonctions")
+    parser.add_argument('tailles', type=int, nargs='*', default=TAILLES)
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--sortie', default='resultats_benchmarks.json')
+    parser.add_argument('--comparer', help="fichier JSON de référence")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    arguments = parser.parse_args()
+
+    rapport = executer(arguments.tailles, arguments.repetitions)
+
+    with open(arguments.sortie, 'w', encoding='utf-8') as sortie:
+        json.dump(rapport, sortie, indent=2, ensure_ascii=False)
+    print(f" Résultats enregistrés dans '{arguments.sortie}'")
+
+    if arguments.comparer:
+        with open(arguments.comparer, encoding='utf-8') as fichier:
+            regressions = comparer(json.load(fichier), rapport, arguments.tolerance)
+
+        for r in regressions:
+            print(f" RÉGRESSION {r['taille']:>12,} lignes | {r['fonction']:<30} | "
+                  f"{r['mesure']} : {r['avant']} -> {r['apres']}")
+        sys.exit(1 if regressions else 0)
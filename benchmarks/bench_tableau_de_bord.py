@@ -0,0 +1,41 @@
+import sys
+import time
+
+from calculs import (
+    calculer_metriques, analyser_par_plan, analyser_cohortes,
+    identifier_clients_risque, calculer_tableau_de_bord
+)
+from benchmarks.donnees import generer_donnees_synthetiques
+
+def chemin_quatre_fonctions(df):
+    """
+    Chemin actuel : quatre fonctions appelées l'une après l'autre
+    """
+    calculer_metriques(df)
+    analyser_par_plan(df)
+    analyser_cohortes(df.copy())
+    identifier_clients_risque(df)
+
+def mesurer(fonction, df, repetitions=3):
+    """
+    Renvoie le meilleur temps (en secondes) sur plusieurs répétitions
+    """
+    meilleur = float('inf')
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction(df)
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur
+
+# Lancement : python -m benchmarks.bench_tableau_de_bord [tailles...]
+if __name__ == "__main__":
+    tailles = [int(t) for t in sys.argv[1:]] or [1_000_000, 10_000_000]
+    
+    for taille in tailles:
+        df = generer_donnees_synthetiques(taille)
+        
+        avant = mesurer(chemin_quatre_fonctions, df)
+        apres = mesurer(calculer_tableau_de_bord, df)
+        
+        print(f" {taille:>12,} lignes | 4 fonctions : {avant:.3f} s | "
+              f"une passe : {apres:.3f} s | gain x{avant / apres:.1f}")
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+def generer_donnees_synthetiques(nombre, graine=42):
+    """
+    Génère rapidement un DataFrame au schéma de clients_data.csv pour les benchmarks
+    """
+    rng = np.random.default_rng(graine)
+    
+    plans = np.array(['Basic', 'Pro', 'Premium'])
+    prix = np.array([99, 199, 299])
+    statuts = np.array(['actif', 'annulé', 'expiré'])
+    
+    code_plan = rng.integers(0, 3, nombre)
+    statut = statuts[rng.choice(3, nombre, p=[0.7, 0.2, 0.1])]
+    
+    aujourd_hui = pd.Timestamp.now().normalize()
+    date_debut = aujourd_hui - pd.to_timedelta(rng.integers(30, 731, nombre), unit='D')
+    date_fin = date_debut + pd.to_timedelta(rng.integers(30, 366, nombre), unit='D')
+    date_fin = date_fin.where(statut != 'actif')
+    
+    ids = np.arange(1, nombre + 1)
+    
+    return pd.DataFrame({
+        'id': pd.Series(ids).astype(str).str.zfill(4).radd('CLI'),
+        'nom': pd.Series(ids).astype(str).radd('Client '),
+        'email': pd.Series(ids).astype(str).radd('client').add('@example.net'),
+        'telephone': '01 23 45 67 89',
+        'plan': plans[code_plan],
+        'prix_mensuel': prix[code_plan],
+        'date_debut': date_debut.strftime('%Y-%m-%d'),
+        'date_fin': date_fin.strftime('%Y-%m-%d'),
+        'statut': statut,
+        'ville': 'Ville ' + pd.Series(rng.integers(0, 500, nombre)).astype(str),
+        'score_risque': rng.uniform(0, 1, nombre).round(2)
+    })
@@ -1,30 +1,82 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import os
+import sys
+from cohortes import MatriceCohortes
+from modele import masque_actifs, mois_cohorte
+from instrumentation import instrumenter
+from stockage import (
+    FICHIER_CSV, convertir_csv_en_parquet, lire_csv, lire_parquet,
+    parquet_a_jour, pyarrow_disponible
+)
 
-def charger_donnees():
+def _base_sql(df):
     """
-    Charge les données depuis le fichier CSV
+    Indique si df est une base SQLite (BaseClients) plutôt qu'un DataFrame
+    base_sql n'est pas importé ici : une BaseClients n'existe que s'il l'a déjà été
     """
+    base_sql = sys.modules.get('base_sql')
+    return base_sql is not None and isinstance(df, base_sql.BaseClients)
+
+@instrumenter
+def charger_donnees(format='auto', colonnes=None, evenements=True):
+    """
+    Charge les données clients
+
+    format : 'auto' (Parquet typé si disponible, sinon CSV), 'parquet' ou 'csv'
+    colonnes : liste des colonnes à charger (toutes par défaut)
+    evenements : applique le journal d'événements au fichier clients (instantané + journal)
+    """
+    from evenements import appliquer_evenements, journal_existe, lire_evenements
+
+    avec_journal = evenements and journal_existe()
+    retirer_id = avec_journal and colonnes is not None and 'id' not in colonnes
+    if retirer_id:
+        colonnes = ['id'] + list(colonnes)
+
+    if format == 'auto':
+        if pyarrow_disponible() and (parquet_a_jour() or os.path.exists(FICHIER_CSV)):
+            format = 'parquet'
+        else:
+            format = 'csv'
+
     try:
-        df = pd.read_csv('clients_data.csv')
-        return df
+        if format == 'parquet':
+            # Conversion unique du CSV vers Parquet
+            if not parquet_a_jour():
+                convertir_csv_en_parquet()
+            df = lire_parquet(colonnes=colonnes)
+        else:
+            df = lire_csv(colonnes=colonnes)
     except FileNotFoundError:
         print(" Fichier clients_data.csv non trouvé. Exécutez generate_data.py d'abord.")
         return None
 
+    # Seuls les événements du journal sont lus en plus de l'instantané
+    if avec_journal:
+        df = appliquer_evenements(df, lire_evenements()[0])
+        if retirer_id:
+            df = df.drop(columns='id')
+
+    return df
+
+@instrumenter
 def calculer_metriques(df):
     """
     Calcule toutes les métriques importantes
     """
     
+    if _base_sql(df):
+        return df.calculer_metriques()
+    
     metriques = {}
     
     # Nombre total de clients
     metriques['total_clients'] = len(df)
     
     # Clients actifs
-    clients_actifs = df[df['statut'] == 'actif']
+    clients_actifs = df[masque_actifs(df)]
     metriques['clients_actifs'] = len(clients_actifs)
     
     # Clients annulés
@@ -54,54 +106,237 @@ def calculer_metriques(df):
     
     return metriques
 
+@instrumenter
 def analyser_par_plan(df):
     """
     Analyse des clients par type d'abonnement
     """
-    analyse = df.groupby('plan').agg({
-        'id': 'count',
-        'prix_mensuel': 'sum',
-        'statut': lambda x: (x == 'actif').sum()
-    }).rename(columns={
-        'id': 'nombre_clients',
-        'prix_mensuel': 'revenu_total',
-        'statut': 'clients_actifs'
-    })
+    if _base_sql(df):
+        return df.analyser_par_plan()
+    
+    # Clients actifs : somme d'un masque booléen (pas de fonction Python par groupe)
+    analyse = df[['id', 'prix_mensuel']].assign(
+        clients_actifs=(df['statut'] == 'actif').to_numpy()
+    ).groupby(df['plan']).agg(
+        nombre_clients=('id', 'count'),
+        revenu_total=('prix_mensuel', 'sum'),
+        clients_actifs=('clients_actifs', 'sum')
+    )
     
     return analyse
 
+@instrumenter
 def analyser_cohortes(df):
     """
-    Analyse de cohorte par mois d'inscription
+    Analyse de cohorte par mois d'inscription (lue depuis la matrice de rétention)
     """
-    df['date_debut'] = pd.to_datetime(df['date_debut'])
-    df['mois_cohorte'] = df['date_debut'].dt.to_period('M')
-    
-    cohortes = df.groupby('mois_cohorte').agg({
-        'id': 'count',
-        'statut': lambda x: (x == 'actif').sum()
-    }).rename(columns={
-        'id': 'total',
-        'statut': 'actifs'
-    })
-    
-    cohortes['taux_retention'] = round(
-        (cohortes['actifs'] / cohortes['total']) * 100, 2
-    )
-    
-    return cohortes
+    if _base_sql(df):
+        return df.analyser_cohortes()
+    return MatriceCohortes(df).tableau()
 
+@instrumenter
 def identifier_clients_risque(df, seuil=0.7):
     """
     Identifie les clients à risque de churn
     """
+    if _base_sql(df):
+        return df.identifier_clients_risque(seuil)
+    
     clients_risque = df[
-        (df['statut'] == 'actif') & 
+        masque_actifs(df) & 
         (df['score_risque'] >= seuil)
     ].sort_values('score_risque', ascending=False)
     
     return clients_risque[['id', 'nom', 'email', 'plan', 'score_risque']]
 
+def compter_clients_risque(df, seuil=0.7):
+    """
+    Nombre de clients à risque, sans construire ni trier le DataFrame filtré
+    """
+    return int((masque_actifs(df) & (df['score_risque'] >= seuil)).sum())
+
+@instrumenter
+def top_clients_risque(df, k=10, seuil=0.7):
+    """
+    Les k clients actifs les plus à risque, par sélection partielle (argpartition)
+    """
+    positions = np.flatnonzero(
+        (masque_actifs(df) & (df['score_risque'] >= seuil)).to_numpy()
+    )
+    scores = df['score_risque'].to_numpy()[positions]
+    
+    # Seuls les k clients retenus sont triés (score décroissant, puis ordre d'origine)
+    from agregats import selection_risque
+    ordre = selection_risque(positions, scores, k)
+    return df.iloc[positions[ordre]][['id', 'nom', 'email', 'plan', 'score_risque']]
+
+class IndexScoreRisque:
+    """
+    Index des clients actifs trié par score de risque décroissant :
+    le comptage au-dessus d'un seuil devient une recherche dichotomique
+    """
+    
+    def __init__(self, df):
+        actifs = np.flatnonzero(masque_actifs(df).to_numpy())
+        scores = df['score_risque'].to_numpy()[actifs]
+        
+        ordre = np.lexsort((actifs, -scores))
+        self.df = df
+        self.positions = actifs[ordre]
+        # Scores négatifs triés par ordre croissant (pour searchsorted)
+        self._scores_negatifs = -scores[ordre]
+    
+    def compter(self, seuil=0.7):
+        """
+        Nombre de clients actifs dont le score est >= seuil
+        """
+        seuil = np.asarray(-seuil, dtype=self._scores_negatifs.dtype)
+        return int(np.searchsorted(self._scores_negatifs, seuil, side='right'))
+    
+    def au_dessus(self, seuil=0.7, k=None):
+        """
+        Clients actifs dont le score est >= seuil, du plus risqué au moins risqué
+        """
+        nombre = self.compter(seuil)
+        if k is not None:
+            nombre = min(nombre, k)
+        return self.df.iloc[self.positions[:nombre]][['id', 'nom', 'email', 'plan', 'score_risque']]
+
+def _codes_mois_cohorte(df):
+    """
+    Renvoie le code de cohorte de chaque client et les mois de cohorte triés
+    """
+    date_debut = df['date_debut']
+    if 'mois_cohorte' in df.columns or pd.api.types.is_datetime64_any_dtype(date_debut):
+        codes, mois = pd.factorize(mois_cohorte(df), sort=True)
+        return codes, pd.PeriodIndex(mois, freq='M')
+    
+    # Dates texte 'AAAA-MM-JJ' : seul le préfixe 'AAAA-MM' est nécessaire,
+    # on ne convertit que les mois distincts
+    codes, mois = pd.factorize(date_debut.str.slice(0, 7), sort=True)
+    return codes, pd.PeriodIndex(pd.to_datetime(mois), freq='M')
+
+class TableauDeBord:
+    """
+    Résultat de calculer_tableau_de_bord : métriques, analyse par plan,
+    analyse de cohorte et clients à risque
+    Les champs se lisent aussi par clé (tableau['metriques']), comme l'ancien dictionnaire
+    """
+
+    CHAMPS = ('metriques', 'par_plan', 'cohortes', 'clients_risque')
+
+    def __init__(self, metriques, par_plan, cohortes, clients_risque):
+        self.metriques = metriques
+        self.par_plan = par_plan
+        self.cohortes = cohortes
+        self.clients_risque = clients_risque
+
+    def __getitem__(self, cle):
+        if cle not in self.CHAMPS:
+            raise KeyError(cle)
+        return getattr(self, cle)
+
+    def keys(self):
+        return self.CHAMPS
+
+@instrumenter
+def calculer_tableau_de_bord(df, seuil=0.7, processus=None):
+    """
+    Calcule en une seule passe les métriques, l'analyse par plan,
+    l'analyse de cohorte et les clients à risque
+
+    processus : au-delà de 1, les agrégats sont calculés par plages d'id dans
+    ce nombre de processus (agregats.agreger_en_parallele), puis fusionnés
+    """
+    if _base_sql(df):
+        return TableauDeBord(
+            df.calculer_metriques(), df.analyser_par_plan(),
+            df.analyser_cohortes(), df.identifier_clients_risque(seuil)
+        )
+    
+    if processus is not None and processus > 1:
+        from agregats import agreger_en_parallele
+        
+        return agreger_en_parallele(df, processus=processus, seuil=seuil).tableau_de_bord(df)
+    
+    # Masques de statut construits une seule fois
+    actifs = masque_actifs(df).to_numpy()
+    annules = (df['statut'] == 'annulé').to_numpy()
+    prix = df['prix_mensuel'].to_numpy()
+    
+    # Métriques principales
+    total = len(df)
+    nb_actifs = int(actifs.sum())
+    nb_annules = int(annules.sum())
+    mrr = prix[actifs].sum()
+    arpu = round(mrr / nb_actifs, 2) if nb_actifs else np.nan
+    
+    metriques = {
+        'total_clients': total,
+        'clients_actifs': nb_actifs,
+        'clients_annules': nb_annules,
+        'taux_churn': round((nb_annules / total) * 100, 2),
+        'taux_retention': round((nb_actifs / total) * 100, 2),
+        'mrr': mrr,
+        'arpu': arpu,
+        'ltv_moyen': round(arpu * 12, 2)
+    }
+    
+    # Analyse par plan (comptages vectorisés par code de plan)
+    codes_plan, plans = pd.factorize(df['plan'], sort=True)
+    valides = codes_plan >= 0
+    codes_plan = codes_plan[valides]
+    nb_plans = len(plans)
+    
+    par_plan = pd.DataFrame({
+        'nombre_clients': np.bincount(codes_plan, minlength=nb_plans),
+        'revenu_total': np.bincount(
+            codes_plan, weights=prix[valides], minlength=nb_plans
+        ).astype(np.int64),
+        'clients_actifs': np.bincount(
+            codes_plan, weights=actifs[valides], minlength=nb_plans
+        ).astype(np.int64)
+    }, index=pd.Index(plans, name='plan'))
+    
+    # Analyse de cohorte (sans modifier le DataFrame d'origine)
+    codes_cohorte, mois = _codes_mois_cohorte(df)
+    valides = codes_cohorte >= 0
+    codes_cohorte = codes_cohorte[valides]
+    nb_cohortes = len(mois)
+    
+    cohortes = pd.DataFrame({
+        'total': np.bincount(codes_cohorte, minlength=nb_cohortes),
+        'actifs': np.bincount(
+            codes_cohorte, weights=actifs[valides], minlength=nb_cohortes
+        ).astype(np.int64)
+    }, index=pd.Index(mois, name='mois_cohorte'))
+    
+    cohortes['taux_retention'] = round(
+        (cohortes['actifs'] / cohortes['total']) * 100, 2
+    )
+    
+    # Clients à risque (réutilise le masque des actifs)
+    clients_risque = df.loc[
+        actifs & (df['score_risque'] >= seuil).to_numpy(),
+        ['id', 'nom', 'email', 'plan', 'score_risque']
+    ].sort_values('score_risque', ascending=False)
+    
+    return TableauDeBord(metriques, par_plan, cohortes, clients_risque)
+
+@instrumenter
+def calculer_en_flux(chemin=FICHIER_CSV, seuil=0.7, k=10, evenements=True):
+    """
+    Mode flux pour les fichiers plus gros que la mémoire : le fichier est lu
+    par lots et résumé au fur et à mesure (format de calculer_tableau_de_bord,
+    limité aux k clients les plus à risque)
+    """
+    from agregats import agreger_fichier
+
+    agregats, tas = agreger_fichier(chemin, seuil=seuil, k=k, evenements=evenements)
+    return TableauDeBord(
+        agregats.metriques(), agregats.par_plan(), agregats.analyse_cohortes(), tas.resultat()
+    )
+
 # Test des fonctions
 if __name__ == "__main__":
     df = charger_donnees()
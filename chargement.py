@@ -0,0 +1,242 @@
+import hashlib
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from evenements import FICHIER_EVENEMENTS, appliquer_evenements, lire_evenements
+from metriques_incrementales import MetriquesIncrementales
+from recherche import IndexRecherche
+from modele import ajouter_lignes, preparer_modele
+from stockage import (
+    FICHIER_CSV, FICHIER_PARQUET, lire_csv, lire_parquet, parquet_a_jour, pyarrow_disponible
+)
+
+# Taille des blocs lus pour calculer l'empreinte du fichier
+TAILLE_BLOC = 1 << 20
+
+# Un instantané des métriques incrémentales tous les N événements
+INTERVALLE_INSTANTANES = 100
+
+def _hacher(fichier, hacheur, taille=None):
+    """
+    Ajoute au hacheur les `taille` prochains octets du fichier (tout le reste par défaut)
+    """
+    restant = taille
+    while restant is None or restant > 0:
+        bloc = fichier.read(TAILLE_BLOC if restant is None else min(TAILLE_BLOC, restant))
+        if not bloc:
+            break
+        hacheur.update(bloc)
+        if restant is not None:
+            restant -= len(bloc)
+
+class Instantane:
+    """
+    État des données publié par ChargeurDonnees.actualiser : le modèle, sa
+    version et les structures dérivées de ce modèle (métriques, analyse par
+    plan, index de recherche). Rien n'y est modifié après publication : une
+    session lit les métriques et interroge l'index du modèle qu'elle affiche,
+    même si le chargeur a avancé depuis
+    """
+
+    def __init__(self, modele=None, version=None, metriques=None, par_plan=None, index_recherche=None):
+        self.modele = modele
+        self.version = version
+        self.metriques = metriques
+        self.par_plan = par_plan
+        self._index_recherche = index_recherche
+        self._verrou = threading.Lock()
+
+    def index_recherche(self):
+        """
+        Index de recherche des clients du modèle : dérivé de celui de
+        l'instantané précédent s'il existait, construit au premier appel sinon
+        """
+        with self._verrou:
+            if self._index_recherche is None and self.modele is not None:
+                self._index_recherche = IndexRecherche(self.modele)
+            return self._index_recherche
+
+class ChargeurDonnees:
+    """
+    Garde le modèle clients chargé et sa version (empreinte du contenu du CSV
+    et position dans le journal d'événements)
+
+    À chaque actualisation, un simple os.stat suffit si le fichier n'a pas
+    bougé. Sinon le contenu est haché : s'il n'a pas changé, rien n'est
+    rechargé ; si des lignes ont seulement été ajoutées à la fin, seules
+    ces lignes sont lues ; sinon le fichier est rechargé entièrement.
+    Les nouveaux événements du journal sont ensuite appliqués au modèle,
+    ainsi qu'aux métriques incrémentales (O(1) par événement, reconstruites
+    seulement après un rechargement complet), dont les valeurs sont publiées
+    dans l'instantané ; l'index de recherche du nouvel instantané est dérivé
+    de celui du précédent (voir Instantane)
+    """
+
+    def __init__(self, chemin=FICHIER_CSV, chemin_evenements=FICHIER_EVENEMENTS):
+        self.chemin = chemin
+        self.chemin_evenements = chemin_evenements
+        self.modele = None
+        self.version = None
+        self.manifeste = None
+        self.journal = None  # (inode, position lue) du journal d'événements
+        self.dernier_chargement = None  # 'complet', 'ajout', 'evenements' ou None
+        self._index_ids = None
+        self._suivi = None
+        self._instantane = Instantane()
+        self._modifiees = None  # lignes existantes modifiées depuis l'instantané publié (None : tout)
+        self._verrou = threading.Lock()
+
+    def actualiser(self):
+        """
+        Renvoie l'instantané à jour : modèle, version, métriques et index de
+        recherche (modèle et version à None si le fichier n'existe pas)
+        """
+        with self._verrou:
+            try:
+                infos = os.stat(self.chemin)
+            except FileNotFoundError:
+                self.modele = self.version = self.manifeste = self.journal = None
+                self._suivi = None
+                self._instantane = Instantane()
+                return self._instantane
+
+            modele = self.modele
+            self._modifiees = []
+            manifeste = self.manifeste
+            if not manifeste or (infos.st_mtime_ns, infos.st_size) != (manifeste['mtime_ns'], manifeste['taille']):
+                self._actualiser_instantane(infos)
+
+            self._actualiser_journal()
+
+            self.version = f"{self.manifeste['empreinte']}-{self.manifeste['taille']}+{self.journal[1]}"
+            if self.modele is not modele or self.version != self._instantane.version:
+                self._publier()
+            return self._instantane
+
+    def _publier(self):
+        """
+        Publie un nouvel instantané : copie des métriques incrémentales, et index
+        de recherche dérivé de celui du précédent (lignes modifiées et ajoutées
+        seules), qui reste inchangé
+        """
+        index = self._instantane._index_recherche
+        if index is not None and self._modifiees is not None:
+            index = index.mis_a_jour(self.modele, np.concatenate([np.empty(0, dtype=np.int64), *self._modifiees]))
+        else:
+            index = None
+        if self._suivi is None:
+            self._suivi = MetriquesIncrementales.depuis_dataframe(
+                self.modele, intervalle_instantanes=INTERVALLE_INSTANTANES
+            )
+        self._instantane = Instantane(
+            self.modele, self.version, self._suivi.metriques(), self._suivi.par_plan(), index
+        )
+
+    def _actualiser_instantane(self, infos):
+        """
+        Recharge le fichier clients (ou seulement ses lignes ajoutées) si son contenu a changé
+        """
+        manifeste = self.manifeste
+        hacheur = hashlib.blake2b(digest_size=16)
+        with open(self.chemin, 'rb') as fichier:
+            entete = fichier.readline()
+            fichier.seek(0)
+
+            # Le début du fichier est-il l'ancien contenu, inchangé ?
+            prefixe_identique = False
+            if manifeste and manifeste['fin_de_ligne'] and infos.st_size >= manifeste['taille']:
+                _hacher(fichier, hacheur, manifeste['taille'])
+                prefixe_identique = hacheur.hexdigest() == manifeste['empreinte']
+
+            if prefixe_identique:
+                ajout = fichier.read()
+                hacheur.update(ajout)
+            else:
+                ajout = None
+                fichier.seek(0)
+                hacheur = hashlib.blake2b(digest_size=16)
+                _hacher(fichier, hacheur)
+
+            taille = fichier.tell()
+            fichier.seek(max(taille - 1, 0))
+            fin_de_ligne = fichier.read(1) in (b'\n', b'')
+
+        if ajout is not None:
+            if ajout.strip():
+                lignes = preparer_modele(lire_csv(io.BytesIO(entete + ajout)))
+                self.modele = ajouter_lignes(self.modele, lignes)
+                self._index_ids = None
+                if self._suivi is not None:
+                    self._suivi.ajouter_clients(lignes)
+                self.dernier_chargement = 'ajout'
+        else:
+            # Instantané seul : le journal est réappliqué depuis le début. Le Parquet
+            # n'est lu que s'il a été converti depuis le contenu haché
+            if self.chemin == FICHIER_CSV and pyarrow_disponible() \
+                    and parquet_a_jour(self.chemin, FICHIER_PARQUET, empreinte=hacheur.hexdigest()):
+                df = lire_parquet()
+            else:
+                # CSV relu d'un bloc : le modèle et le manifeste portent sur les mêmes octets,
+                # même si le fichier a changé depuis le calcul de l'empreinte
+                with open(self.chemin, 'rb') as fichier:
+                    contenu = fichier.read()
+                hacheur = hashlib.blake2b(contenu, digest_size=16)
+                taille, fin_de_ligne = len(contenu), contenu[-1:] in (b'\n', b'')
+                df = lire_csv(io.BytesIO(contenu))
+                del contenu
+            self.modele = preparer_modele(df)
+            self._index_ids = None
+            self._suivi = None
+            self._modifiees = None
+            self.journal = None
+            self.dernier_chargement = 'complet'
+
+        self.manifeste = {
+            'mtime_ns': infos.st_mtime_ns,
+            'taille': taille,
+            'empreinte': hacheur.hexdigest(),
+            'fin_de_ligne': fin_de_ligne
+        }
+
+    def _actualiser_journal(self):
+        """
+        Applique les événements ajoutés au journal depuis la dernière lecture
+        """
+        try:
+            infos = os.stat(self.chemin_evenements)
+        except FileNotFoundError:
+            self.journal = (None, 0)
+            return
+
+        inode, position = self.journal or (None, 0)
+        if inode != infos.st_ino or infos.st_size < position:
+            # Journal remplacé (compaction) : l'instantané a changé aussi
+            if self.journal is not None and inode is not None:
+                self.manifeste = None
+                self._actualiser_instantane(os.stat(self.chemin))
+            position = 0
+        elif infos.st_size == position:
+            return
+
+        evenements, position = lire_evenements(self.chemin_evenements, depuis=position)
+        if len(evenements):
+            if self._index_ids is None:
+                self._index_ids = pd.Index(self.modele['id'])
+            nombre = len(self.modele)
+            # Lignes existantes touchées par les événements (les nouveaux clients sont ajoutés à la fin)
+            modifiees = self._index_ids.get_indexer(evenements['id'].unique())
+            modifiees = modifiees[modifiees >= 0]
+            self.modele = appliquer_evenements(self.modele, evenements, index_ids=self._index_ids)
+            if len(self.modele) != nombre:
+                self._index_ids = None
+            if self._suivi is not None:
+                self._suivi.appliquer_lot(evenements)
+            if self._modifiees is not None:
+                self._modifiees.append(modifiees)
+            self.dernier_chargement = 'evenements'
+
+        self.journal = (infos.st_ino, position)
@@ -0,0 +1,202 @@
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from stockage import pyarrow_disponible
+
+# Nombre maximal de lignes d'une feuille Excel (en-tête compris)
+LIGNES_MAX = 1_048_576
+
+# Lignes converties en XML à la fois
+TAILLE_LOT = 50_000
+
+# Styles des cellules (index dans cellXfs de styles.xml)
+STYLE_DATE = 1
+STYLE_EN_TETE = 2
+
+# Caractères interdits en XML 1.0
+CARACTERES_INTERDITS = r'[\x00-\x08\x0b\x0c\x0e-\x1f' + '\ufffe\uffff]'
+
+ESPACE_NOMS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+RELATIONS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+RELATIONS_PAQUET = 'http://schemas.openxmlformats.org/package/2006/relationships'
+EN_TETE_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+STYLES = EN_TETE_XML + f"""<styleSheet xmlns="{ESPACE_NOMS}">
+<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy\\-mm\\-dd\\ hh:mm:ss"/></numFmts>
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/><xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/><xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+def _cellules_texte(valeurs):
+    """
+    Cellules texte (chaînes en ligne) d'une série de chaînes ; '<c/>' si la valeur manque
+    """
+    texte = valeurs.astype('string').str.replace(CARACTERES_INTERDITS, '', regex=True)
+    texte = texte.str.replace('&', '&amp;').str.replace('<', '&lt;').str.replace('>', '&gt;')
+    cellules = '<c t="inlineStr"><is><t xml:space="preserve">' + texte + '</t></is></c>'
+    return cellules.fillna('<c/>')
+
+def _en_texte(valeurs):
+    """
+    Valeurs numériques converties en texte (valeurs manquantes conservées)
+    La conversion de pandas passe par un objet Python par valeur ; pyarrow, s'il est installé, la fait en bloc
+    """
+    if not pyarrow_disponible():
+        return pd.Series(valeurs).astype('string')
+    import pyarrow as pa
+    return pd.Series(pd.arrays.ArrowStringArray(pa.Array.from_pandas(valeurs).cast(pa.string())))
+
+def _cellules(serie):
+    """
+    XML des cellules d'une colonne (une chaîne par ligne), selon son type
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Chaque catégorie n'est convertie qu'une fois
+        categories = _cellules_texte(pd.Series(serie.cat.categories.astype(str)))
+        cellules = pd.concat([categories, pd.Series(['<c/>'], dtype='string')], ignore_index=True)
+        codes = serie.cat.codes.to_numpy()
+        return cellules.take(np.where(codes < 0, len(categories), codes))
+
+    if pd.api.types.is_bool_dtype(serie):
+        valeurs = serie.astype('Int8').astype('string')
+        return ('<c t="b"><v>' + valeurs + '</v></c>').fillna('<c/>')
+
+    if pd.api.types.is_numeric_dtype(serie):
+        # Valeurs manquantes et infinies : cellules vides (Excel refuse <v>inf</v>)
+        valeurs = _en_texte(serie.array)
+        finies = np.isfinite(serie.to_numpy(dtype='float64', na_value=np.nan))
+        return ('<c><v>' + valeurs + '</v></c>').where(finies, '<c/>')
+
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        # Numéro de série Excel : jours depuis le 30/12/1899
+        secondes = serie.to_numpy().astype('datetime64[s]').astype(np.int64)
+        jours = _en_texte(secondes / 86400 + 25569)
+        cellules = f'<c s="{STYLE_DATE}"><v>' + jours + '</v></c>'
+        return cellules.where(serie.notna().to_numpy(), '<c/>')
+
+    return _cellules_texte(serie)
+
+def decouper(nom, df, lignes_max=LIGNES_MAX):
+    """
+    Feuilles (nom, morceau) d'une table : découpée si elle dépasse la limite
+    d'Excel ('Données', 'Données (2)'...)
+    """
+    par_feuille = lignes_max - 1
+    nombre = max(1, -(-len(df) // par_feuille))
+    for numero in range(nombre):
+        suffixe = f" ({numero + 1})" if numero else ""
+        yield nom[:31 - len(suffixe)] + suffixe, df.iloc[numero * par_feuille:(numero + 1) * par_feuille]
+
+class ClasseurFlux:
+    """
+    Écriture d'un classeur xlsx en flux : le XML des feuilles est produit
+    par lots de lignes, colonne par colonne (opérations vectorisées), et
+    écrit directement dans l'archive ; aucune cellule n'est construite en
+    mémoire, qui ne dépend que de la taille des lots
+    """
+
+    def __init__(self, sortie, taille_lot=TAILLE_LOT):
+        self.taille_lot = taille_lot
+        self.feuilles = []
+        self._archive = zipfile.ZipFile(sortie, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+
+    def ajouter(self, nom, df, index=False, progression=None, lignes_max=LIGNES_MAX):
+        """
+        Ajoute une table (découpée en plusieurs feuilles au-delà de lignes_max lignes)
+        progression(lignes écrites, lignes totales) est appelée après chaque lot
+        """
+        if index:
+            df = df.reset_index()
+        ecrites = 0
+        for nom_feuille, morceau in decouper(nom, df, lignes_max):
+            self._ecrire_feuille(nom_feuille, morceau, ecrites, len(df), progression)
+            ecrites += len(morceau)
+
+    def _ecrire_feuille(self, nom, df, deja_ecrites, total, progression):
+        numero = len(self.feuilles) + 1
+        self.feuilles.append(nom)
+
+        chemin = f"xl/worksheets/sheet{numero}.xml"
+        with self._archive.open(chemin, 'w', force_zip64=True) as feuille:
+            feuille.write((EN_TETE_XML + f'<worksheet xmlns="{ESPACE_NOMS}"><sheetData>').encode('utf-8'))
+
+            en_tete = ''.join(
+                f'<c t="inlineStr" s="{STYLE_EN_TETE}"><is><t>{escape(str(colonne))}</t></is></c>'
+                for colonne in df.columns
+            )
+            feuille.write(f'<row r="1">{en_tete}</row>'.encode('utf-8'))
+
+            for debut in range(0, len(df), self.taille_lot):
+                lot = df.iloc[debut:debut + self.taille_lot]
+                lignes = _en_texte(np.arange(debut + 2, debut + 2 + len(lot)))
+                contenu = '<row r="' + lignes + '">'
+                for colonne in lot.columns:
+                    contenu = contenu + _cellules(lot[colonne]).array
+                contenu = contenu + '</row>'
+                feuille.write(''.join(contenu.tolist()).encode('utf-8'))
+
+                if progression is not None:
+                    progression(deja_ecrites + debut + len(lot), total)
+
+            feuille.write(b'</sheetData></worksheet>')
+
+    def fermer(self):
+        """
+        Écrit les parties communes du classeur (liste des feuilles, styles) et ferme l'archive
+        """
+        nombre = len(self.feuilles)
+        feuilles = ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, nombre + 1)
+        )
+        self._archive.writestr('[Content_Types].xml', EN_TETE_XML + (
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{feuilles}</Types>'
+        ))
+        self._archive.writestr('_rels/.rels', EN_TETE_XML + (
+            f'<Relationships xmlns="{RELATIONS_PAQUET}">'
+            f'<Relationship Id="rId1" Type="{RELATIONS}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ))
+        self._archive.writestr('xl/workbook.xml', EN_TETE_XML + (
+            f'<workbook xmlns="{ESPACE_NOMS}" xmlns:r="{RELATIONS}"><sheets>'
+            + ''.join(
+                f'<sheet name="{escape(nom, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+                for i, nom in enumerate(self.feuilles, start=1)
+            )
+            + '</sheets></workbook>'
+        ))
+        self._archive.writestr('xl/_rels/workbook.xml.rels', EN_TETE_XML + (
+            f'<Relationships xmlns="{RELATIONS_PAQUET}">'
+            + ''.join(
+                f'<Relationship Id="rId{i}" Type="{RELATIONS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                for i in range(1, nombre + 1)
+            )
+            + f'<Relationship Id="rId{nombre + 1}" Type="{RELATIONS}/styles" Target="styles.xml"/>'
+            '</Relationships>'
+        ))
+        self._archive.writestr('xl/styles.xml', STYLES)
+        self._archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_erreur, erreur, trace):
+        if type_erreur is None:
+            self.fermer()
+        else:
+            self._archive.close()
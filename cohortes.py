@@ -0,0 +1,211 @@
+import copy
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from modele import masque_actifs
+
+# Nombre de matrices gardées en cache (une par version des données)
+TAILLE_CACHE = 4
+
+_cache = OrderedDict()
+_verrou = threading.Lock()
+
+def _indices_mois(dates):
+    """
+    Indice de mois (année * 12 + mois - 1) de chaque date ; -1 si la date manque
+    """
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        valeurs = dates.to_numpy().astype('datetime64[M]')
+        indices = valeurs.astype(np.int64) + 1970 * 12
+        return np.where(np.isnat(valeurs), -1, indices)
+
+    # Dates texte 'AAAA-MM-JJ' : seuls les préfixes 'AAAA-MM' distincts sont convertis
+    codes, prefixes = pd.factorize(dates.astype('string').str.slice(0, 7))
+    valeurs = np.array([int(p[:4]) * 12 + int(p[5:7]) - 1 for p in prefixes] + [-1], dtype=np.int64)
+    return valeurs[codes]
+
+def _indice_mois(date):
+    date = pd.Timestamp(date)
+    return date.year * 12 + date.month - 1
+
+def _periode(indice):
+    return pd.Period(year=indice // 12, month=indice % 12 + 1, freq='M')
+
+class MatriceCohortes:
+    """
+    Matrice de rétention triangulaire : mois d'inscription x mois depuis l'inscription
+
+    Les clients sont résumés par cohorte en un histogramme de leur durée de
+    présence (en mois) ; la matrice est recalculée à partir de ces histogrammes
+    sans repasser sur les clients, par exemple au changement de mois
+    """
+
+    def __init__(self, df, mois_reference=None):
+        debut = _indices_mois(df['date_debut'])
+        fin = _indices_mois(df['date_fin'])
+        actifs = masque_actifs(df).to_numpy()
+
+        valides = debut >= 0
+        debut, fin, actifs = debut[valides], fin[valides], actifs[valides]
+
+        aujourd_hui = _indice_mois(pd.Timestamp.now())
+        self.premier_mois = int(debut.min()) if len(debut) else aujourd_hui
+        self.mois_reference = _indice_mois(mois_reference) if mois_reference is not None \
+            else max(aujourd_hui, int(debut.max(initial=aujourd_hui)))
+
+        nb_cohortes = self.mois_reference - self.premier_mois + 1
+        codes = debut - self.premier_mois
+
+        # Durée de présence en mois (au moins le mois d'inscription) ;
+        # les clients actifs ou sans date de fin sont toujours présents
+        toujours = actifs | (fin < 0)
+        duree = np.maximum(fin - debut, 1)
+        duree_max = int(duree[~toujours].max(initial=0))
+        largeur = max(duree_max, nb_cohortes) + 1
+
+        self.toujours_presents = np.bincount(codes[toujours], minlength=nb_cohortes)
+        self.histogramme = np.bincount(
+            codes[~toujours] * largeur + duree[~toujours],
+            minlength=nb_cohortes * largeur
+        ).reshape(nb_cohortes, largeur)
+        self.totaux = np.bincount(codes, minlength=nb_cohortes)
+        self.actifs = np.bincount(codes[actifs], minlength=nb_cohortes)
+
+        self._comptes = None
+
+    # ---------- Changement de mois ----------
+
+    def _agrandir(self, nb_cohortes=None, largeur=None):
+        """
+        Agrandit les tableaux (nouvelle cohorte ou durée plus longue)
+        """
+        nb_actuel, largeur_actuelle = self.histogramme.shape
+        nb_cohortes = max(nb_cohortes or nb_actuel, nb_actuel)
+        largeur = max(largeur or largeur_actuelle, largeur_actuelle, nb_cohortes + 1)
+
+        if (nb_cohortes, largeur) != (nb_actuel, largeur_actuelle):
+            histogramme = np.zeros((nb_cohortes, largeur), dtype=np.int64)
+            histogramme[:nb_actuel, :largeur_actuelle] = self.histogramme
+            self.histogramme = histogramme
+
+            ajout = nb_cohortes - nb_actuel
+            self.toujours_presents = np.concatenate([self.toujours_presents, np.zeros(ajout, dtype=np.int64)])
+            self.totaux = np.concatenate([self.totaux, np.zeros(ajout, dtype=np.int64)])
+            self.actifs = np.concatenate([self.actifs, np.zeros(ajout, dtype=np.int64)])
+
+        self._comptes = None
+
+    def cloturer_mois(self):
+        """
+        Passe au mois suivant : ajoute la nouvelle diagonale et la nouvelle cohorte
+        """
+        self.mois_reference += 1
+        self._agrandir(nb_cohortes=self.mois_reference - self.premier_mois + 1)
+
+    def avancee(self, mois):
+        """
+        Copie de la matrice avancée jusqu'au mois `mois` (indice de mois) ;
+        la matrice elle-même, peut-être lue par d'autres sessions, reste inchangée
+        """
+        matrice = copy.copy(self)
+        while matrice.mois_reference < mois:
+            # Chaque clôture remplace les tableaux au lieu de les modifier
+            matrice.cloturer_mois()
+        return matrice
+
+    # ---------- Lecture ----------
+
+    def comptes(self):
+        """
+        Nombre de clients présents par cohorte (lignes) et mois depuis l'inscription
+        (colonnes) ; les mois pas encore écoulés valent NaN
+        """
+        if self._comptes is None:
+            nb_cohortes = len(self.totaux)
+
+            # Clients présents au mois k = toujours présents + durée > k
+            suffixes = np.cumsum(self.histogramme[:, ::-1], axis=1)[:, ::-1]
+            comptes = self.toujours_presents[:, None] + suffixes[:, 1:nb_cohortes + 1]
+            comptes = comptes.astype(float)
+
+            # Partie triangulaire : une cohorte n'a que « âge + 1 » mois observés
+            mois = np.arange(nb_cohortes)
+            ages = self.mois_reference - self.premier_mois - mois
+            comptes[mois[None, :] > ages[:, None]] = np.nan
+
+            self._comptes = pd.DataFrame(
+                comptes,
+                index=self._index_cohortes(),
+                columns=pd.Index(np.arange(nb_cohortes), name='mois_depuis_inscription')
+            )
+
+        return self._comptes
+
+    def _index_cohortes(self):
+        return pd.PeriodIndex(
+            [_periode(self.premier_mois + c) for c in range(len(self.totaux))],
+            name='mois_cohorte'
+        )
+
+    def retention(self):
+        """
+        Matrice des taux de rétention (%) des cohortes non vides
+        """
+        comptes = self.comptes()
+        retention = (comptes.div(self.totaux, axis=0) * 100).round(2)
+        return retention[self.totaux > 0]
+
+    def tableau(self):
+        """
+        Total, actifs et taux de rétention par cohorte (format de analyser_cohortes)
+        """
+        cohortes = pd.DataFrame({
+            'total': self.totaux,
+            'actifs': self.actifs
+        }, index=self._index_cohortes())
+        cohortes = cohortes[cohortes['total'] > 0]
+
+        cohortes['taux_retention'] = round(
+            (cohortes['actifs'] / cohortes['total']) * 100, 2
+        )
+        return cohortes
+
+def matrice_retention(df, version=None):
+    """
+    Matrice de rétention, mise en cache par version des données
+    Si le mois courant a changé depuis la mise en cache, une copie avancée
+    mois par mois remplace la matrice en cache au lieu d'être reconstruite
+    """
+    if version is None:
+        return MatriceCohortes(df)
+
+    mois = _indice_mois(pd.Timestamp.now())
+    with _verrou:
+        matrice = _cache.get(version)
+        if matrice is not None:
+            _cache.move_to_end(version)
+            if matrice.mois_reference < mois:
+                matrice = _cache[version] = matrice.avancee(mois)
+            return matrice
+
+    # Construction hors du verrou ; si une autre session l'a faite entre-temps, sa matrice est gardée
+    matrice = MatriceCohortes(df)
+    with _verrou:
+        matrice = _cache.setdefault(version, matrice)
+        _cache.move_to_end(version)
+        while len(_cache) > TAILLE_CACHE:
+            _cache.popitem(last=False)
+    return matrice
+
+# Test
+if __name__ == "__main__":
+    from calculs import charger_donnees
+
+    df = charger_donnees()
+    if df is not None:
+        matrice = matrice_retention(df)
+        print("\n MATRICE DE RÉTENTION (%) :")
+        print(matrice.retention().iloc[-6:, :8])
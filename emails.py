@@ -1,20 +1,20 @@
+import gzip
+import json
 import pandas as pd
-from datetime import datetime, timedelta
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from datetime import datetime
+from string import Formatter
+from instrumentation import instrumenter
 
-def generer_email_relance(client):
-    """
-    Génère le contenu d'un email de relance
-    """
-    
-    sujet = f" {client['nom']}, votre abonnement nécessite votre attention"
-    
-    corps = f"""
-    Bonjour {client['nom']},
+# Taille des lots pour la génération en flux
+TAILLE_LOT = 50_000
+
+# Modèles des emails (champs remplis par str.format ou colonne par colonne)
+MODELE_SUJET_RELANCE = " {nom}, votre abonnement nécessite votre attention"
+
+MODELE_CORPS_RELANCE = """
+    Bonjour {nom},
     
-    Nous avons remarqué que votre abonnement {client['plan']} est actuellement inactif.
+    Nous avons remarqué que votre abonnement {plan} est actuellement inactif.
     
     Nous serions ravis de vous revoir parmi nos clients actifs !
     
@@ -26,11 +26,116 @@ def generer_email_relance(client):
     L'équipe Gestion Abonnements
     
     ---
-    Prix mensuel : {client['prix_mensuel']} MAD
+    Prix mensuel : {prix_mensuel} MAD
     """
+
+MODELE_SUJET_ALERTE = " ALERTE : {nom} présente un risque de churn élevé"
+
+MODELE_CORPS_ALERTE = """
+    ALERTE ÉQUIPE MARKETING
+    
+    Client à risque détecté :
+    
+    Nom : {nom}
+    Email : {email}
+    Plan : {plan}
+    Score de risque : {score_risque}/1.0
+    
+    Actions recommandées :
+    - Contacter le client sous 48h
+    - Proposer une offre personnalisée
+    - Demander un feedback
+    
+    Ce message est généré automatiquement par le système.
+    """
+
+# Modèles versionnés : en mode 'modele', chaque fichier de campagne ne stocke
+# que les paramètres de chaque destinataire ; l'identifiant du modèle et la
+# date, communs à tout le fichier, sont enregistrés une fois à côté de lui
+MODELE_RELANCE = 'relance_v1'
+MODELE_ALERTE = 'alerte_v1'
+
+MODELES = {
+    MODELE_RELANCE: {'sujet': MODELE_SUJET_RELANCE, 'corps': MODELE_CORPS_RELANCE},
+    MODELE_ALERTE: {'sujet': MODELE_SUJET_ALERTE, 'corps': MODELE_CORPS_ALERTE}
+}
+
+FICHIER_MODELES = 'modeles_emails.json'
+
+# Extension du fichier de description d'une campagne ('emails_relance_params.csv.json')
+EXTENSION_CAMPAGNE = '.json'
+
+def _remplir_modele(modele, valeurs):
+    """
+    Remplit un modèle colonne par colonne (une chaîne par client)
+
+    valeurs : dictionnaire {champ: Series de chaînes}, toutes de même index
+    """
+    morceaux = []
+    
+    for texte, champ, _, _ in Formatter().parse(modele):
+        if texte:
+            morceaux.append(texte)
+        if champ is not None:
+            morceaux.append(valeurs[champ])
+    
+    resultat = morceaux[0]
+    for morceau in morceaux[1:]:
+        resultat = resultat + morceau
+    
+    return resultat
+
+def generer_email_relance(client):
+    """
+    Génère le contenu d'un email de relance
+    """
+    
+    sujet = MODELE_SUJET_RELANCE.format(nom=client['nom'])
+    
+    corps = MODELE_CORPS_RELANCE.format(
+        nom=client['nom'],
+        plan=client['plan'],
+        prix_mensuel=client['prix_mensuel']
+    )
     
     return sujet, corps
 
+def generer_emails_relance_lot(clients):
+    """
+    Génère les emails de relance d'un lot de clients colonne par colonne
+    """
+    
+    valeurs = {
+        'nom': clients['nom'].astype(str),
+        'plan': clients['plan'].astype(str),
+        'prix_mensuel': clients['prix_mensuel'].astype(str)
+    }
+    
+    # Un seul horodatage pour tout le lot
+    date_envoi = datetime.now().strftime('%Y-%m-%d %H:%M')
+    
+    return pd.DataFrame({
+        'destinataire': clients['email'],
+        'nom': clients['nom'],
+        'sujet': _remplir_modele(MODELE_SUJET_RELANCE, valeurs),
+        'corps': _remplir_modele(MODELE_CORPS_RELANCE, valeurs),
+        'date_envoi': date_envoi
+    }, index=clients.index)
+
+def parametres_relance_lot(clients):
+    """
+    Paramètres des emails de relance d'un lot (sans le texte complet,
+    ni le modèle et la date, communs à la campagne)
+    """
+    
+    return pd.DataFrame({
+        'destinataire': clients['email'],
+        'nom': clients['nom'],
+        'plan': clients['plan'].astype('category'),
+        'prix_mensuel': clients['prix_mensuel']
+    }, index=clients.index)
+
+@instrumenter
 def simuler_envoi_emails(df):
     """
     Simule l'envoi d'emails aux clients inactifs
@@ -39,26 +144,12 @@ def simuler_envoi_emails(df):
     # Clients à relancer (annulés ou expirés)
     clients_relancer = df[df['statut'].isin(['annulé', 'expiré'])]
     
-    emails_generes = []
-    
-    for _, client in clients_relancer.iterrows():
-        sujet, corps = generer_email_relance(client)
-        
-        email_info = {
-            'destinataire': client['email'],
-            'nom': client['nom'],
-            'sujet': sujet,
-            'corps': corps,
-            'date_envoi': datetime.now().strftime('%Y-%m-%d %H:%M')
-        }
-        
-        emails_generes.append(email_info)
+    df_emails = generer_emails_relance_lot(clients_relancer).reset_index(drop=True)
     
     # Sauvegarder les emails générés
-    df_emails = pd.DataFrame(emails_generes)
     df_emails.to_csv('emails_relance.csv', index=False, encoding='utf-8')
     
-    print(f" {len(emails_generes)} emails de relance générés et sauvegardés")
+    print(f" {len(df_emails)} emails de relance générés et sauvegardés")
     return df_emails
 
 def generer_email_alerte_churn(client):
@@ -66,28 +157,59 @@ def generer_email_alerte_churn(client):
     Email d'alerte pour client à risque
     """
     
-    sujet = f" ALERTE : {client['nom']} présente un risque de churn élevé"
+    sujet = MODELE_SUJET_ALERTE.format(nom=client['nom'])
     
-    corps = f"""
-    ALERTE ÉQUIPE MARKETING
+    corps = MODELE_CORPS_ALERTE.format(
+        nom=client['nom'],
+        email=client['email'],
+        plan=client['plan'],
+        score_risque=round(float(client['score_risque']), 2)
+    )
     
-    Client à risque détecté :
+    return sujet, corps
+
+def generer_alertes_lot(clients):
+    """
+    Génère les alertes d'un lot de clients à risque colonne par colonne
+    """
     
-    Nom : {client['nom']}
-    Email : {client['email']}
-    Plan : {client['plan']}
-    Score de risque : {client['score_risque']}/1.0
+    score = clients['score_risque'].astype('float64').round(2)
     
-    Actions recommandées :
-    - Contacter le client sous 48h
-    - Proposer une offre personnalisée
-    - Demander un feedback
+    valeurs = {
+        'nom': clients['nom'].astype(str),
+        'email': clients['email'].astype(str),
+        'plan': clients['plan'].astype(str),
+        'score_risque': score.astype(str)
+    }
     
-    Ce message est généré automatiquement par le système.
+    # Un seul horodatage pour tout le lot
+    date_alerte = datetime.now().strftime('%Y-%m-%d %H:%M')
+    
+    return pd.DataFrame({
+        'client_id': clients['id'],
+        'nom': clients['nom'],
+        'email': clients['email'],
+        'score_risque': score,
+        'sujet': _remplir_modele(MODELE_SUJET_ALERTE, valeurs),
+        'corps': _remplir_modele(MODELE_CORPS_ALERTE, valeurs),
+        'date_alerte': date_alerte
+    }, index=clients.index)
+
+def parametres_alertes_lot(clients):
+    """
+    Paramètres des alertes churn d'un lot (sans le texte complet,
+    ni le modèle et la date, communs à la campagne)
     """
     
-    return sujet, corps
+    return pd.DataFrame({
+        'client_id': clients['id'],
+        'nom': clients['nom'],
+        'email': clients['email'],
+        'plan': clients['plan'].astype('category'),
+        'score_risque': clients['score_risque'].astype('float64').round(2)
+    }, index=clients.index)
 
+@instrumenter
 def generer_alertes_equipe(df, seuil=0.7):
     """
     Génère des alertes pour l'équipe marketing
@@ -98,29 +220,163 @@ def generer_alertes_equipe(df, seuil=0.7):
         (df['score_risque'] >= seuil)
     ]
     
-    alertes = []
-    
-    for _, client in clients_risque.iterrows():
-        sujet, corps = generer_email_alerte_churn(client)
-        
-        alerte = {
-            'client_id': client['id'],
-            'nom': client['nom'],
-            'email': client['email'],
-            'score_risque': client['score_risque'],
-            'sujet': sujet,
-            'corps': corps,
-            'date_alerte': datetime.now().strftime('%Y-%m-%d %H:%M')
-        }
-        
-        alertes.append(alerte)
-    
-    df_alertes = pd.DataFrame(alertes)
+    df_alertes = generer_alertes_lot(clients_risque).reset_index(drop=True)
     df_alertes.to_csv('alertes_churn.csv', index=False, encoding='utf-8')
     
-    print(f" {len(alertes)} alertes générées pour l'équipe")
+    print(f" {len(df_alertes)} alertes générées pour l'équipe")
     return df_alertes
 
+# ---------- Génération en flux (mémoire bornée) ----------
+
+def lire_clients_par_lots(source='clients_data.csv', taille_lot=TAILLE_LOT):
+    """
+    Générateur de lots de clients depuis un fichier CSV ou un DataFrame
+    """
+    if isinstance(source, pd.DataFrame):
+        for debut in range(0, len(source), taille_lot):
+            yield source.iloc[debut:debut + taille_lot]
+    else:
+        yield from pd.read_csv(source, chunksize=taille_lot)
+
+def emails_relance_par_lots(lots, mode='complet'):
+    """
+    Générateur des emails de relance, lot par lot
+    mode : 'complet' (texte rendu) ou 'modele' (identifiant de modèle + paramètres)
+    """
+    generer = parametres_relance_lot if mode == 'modele' else generer_emails_relance_lot
+    
+    for lot in lots:
+        clients_relancer = lot[lot['statut'].isin(['annulé', 'expiré'])]
+        yield generer(clients_relancer)
+
+def alertes_par_lots(lots, seuil=0.7, mode='complet'):
+    """
+    Générateur des alertes churn, lot par lot
+    mode : 'complet' (texte rendu) ou 'modele' (identifiant de modèle + paramètres)
+    """
+    generer = parametres_alertes_lot if mode == 'modele' else generer_alertes_lot
+    
+    for lot in lots:
+        clients_risque = lot[
+            (lot['statut'] == 'actif') & 
+            (lot['score_risque'] >= seuil)
+        ]
+        yield generer(clients_risque)
+
+def _ouvrir_sortie(chemin, compression=None):
+    """
+    Ouvre le fichier de sortie en texte, compressé ou non (gzip / zstd)
+    """
+    if compression is None:
+        return open(chemin, 'w', encoding='utf-8', newline='')
+    
+    if compression == 'gzip':
+        return gzip.open(chemin, 'wt', encoding='utf-8', newline='')
+    
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("La compression zstd nécessite le package 'zstandard'")
+        return zstandard.open(chemin, 'wt', encoding='utf-8', newline='')
+    
+    raise ValueError(f"Compression non supportée : {compression}")
+
+def ecrire_lots(lots, chemin, compression=None):
+    """
+    Ajoute chaque lot au fichier de sortie au fur et à mesure
+    Renvoie le nombre de lignes écrites
+    """
+    total = 0
+    
+    with _ouvrir_sortie(chemin, compression) as sortie:
+        for numero, lot in enumerate(lots):
+            lot.to_csv(sortie, index=False, header=(numero == 0))
+            total += len(lot)
+    
+    return total
+
+@instrumenter
+def envoyer_emails_en_flux(source='clients_data.csv', chemin='emails_relance.csv',
+                           taille_lot=TAILLE_LOT, compression=None, mode='complet'):
+    """
+    Génère les emails de relance par lots et les écrit au fil de l'eau
+    """
+    if mode == 'modele':
+        ecrire_modeles()
+        ecrire_campagne(chemin, MODELE_RELANCE, date_envoi=datetime.now().strftime('%Y-%m-%d %H:%M'))
+    
+    lots = lire_clients_par_lots(source, taille_lot)
+    total = ecrire_lots(emails_relance_par_lots(lots, mode), chemin, compression)
+    
+    print(f" {total} emails de relance générés et sauvegardés")
+    return total
+
+@instrumenter
+def generer_alertes_en_flux(source='clients_data.csv', chemin='alertes_churn.csv',
+                            seuil=0.7, taille_lot=TAILLE_LOT, compression=None, mode='complet'):
+    """
+    Génère les alertes churn par lots et les écrit au fil de l'eau
+    """
+    if mode == 'modele':
+        ecrire_modeles()
+        ecrire_campagne(chemin, MODELE_ALERTE, date_alerte=datetime.now().strftime('%Y-%m-%d %H:%M'))
+    
+    lots = lire_clients_par_lots(source, taille_lot)
+    total = ecrire_lots(alertes_par_lots(lots, seuil, mode), chemin, compression)
+    
+    print(f" {total} alertes générées pour l'équipe")
+    return total
+
+# ---------- Modèles dédupliqués ----------
+
+def ecrire_modeles(chemin=FICHIER_MODELES):
+    """
+    Enregistre une seule copie de chaque version de modèle
+    """
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(MODELES, f, ensure_ascii=False, indent=2)
+
+def charger_modeles(chemin=FICHIER_MODELES):
+    """
+    Relit les modèles enregistrés (modèles courants si le fichier est absent)
+    """
+    try:
+        with open(chemin, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return MODELES
+
+def ecrire_campagne(chemin, modele, **champs):
+    """
+    Enregistre à côté du fichier de paramètres ce qui est commun à toute la
+    campagne : identifiant du modèle et date (date_envoi ou date_alerte)
+    """
+    with open(chemin + EXTENSION_CAMPAGNE, 'w', encoding='utf-8') as f:
+        json.dump({'modele': modele, **champs}, f, ensure_ascii=False)
+
+def lire_campagne(chemin):
+    """
+    Description de la campagne d'un fichier de paramètres (None s'il n'en a pas)
+    """
+    try:
+        with open(chemin + EXTENSION_CAMPAGNE, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def rendre_email(parametres, modeles=None, campagne=None):
+    """
+    Rend à la demande le sujet et le corps d'un email à partir de ses paramètres
+    campagne : champs communs (voir lire_campagne) ; les anciens fichiers
+    portent l'identifiant du modèle sur chaque ligne
+    """
+    modeles = modeles or MODELES
+    champs = {**(campagne or {}), **dict(parametres)}
+    modele = modeles[champs['modele']]
+    
+    return modele['sujet'].format(**champs), modele['corps'].format(**champs)
+
 # Test
 if __name__ == "__main__":
     from calculs import charger_donnees
@@ -0,0 +1,306 @@
+import csv
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+import pandas as pd
+
+STATUT_ENVOYE = 'envoyé'
+STATUT_ECHEC = 'échec'
+
+COLONNES_STATUTS = ['destinataire', 'statut', 'tentatives', 'erreur', 'date']
+
+class PoolSMTP:
+    """
+    Pool de connexions SMTP réutilisées entre les threads d'envoi
+    """
+
+    def __init__(self, hote='localhost', port=25, taille=4, utilisateur=None,
+                 mot_de_passe=None, starttls=False, delai=30):
+        self.hote = hote
+        self.port = port
+        self.utilisateur = utilisateur
+        self.mot_de_passe = mot_de_passe
+        self.starttls = starttls
+        self.delai = delai
+        self.connexions_ouvertes = 0
+
+        # Connexions libres (la plus récente est réutilisée en premier)
+        self._libres = queue.LifoQueue()
+        self._places = threading.BoundedSemaphore(taille)
+        self._verrou = threading.Lock()
+
+    def _ouvrir(self):
+        connexion = smtplib.SMTP(self.hote, self.port, timeout=self.delai)
+        if self.starttls:
+            connexion.starttls()
+        if self.utilisateur:
+            connexion.login(self.utilisateur, self.mot_de_passe)
+
+        with self._verrou:
+            self.connexions_ouvertes += 1
+        return connexion
+
+    @staticmethod
+    def _fermer(connexion):
+        try:
+            connexion.quit()
+        except (smtplib.SMTPException, OSError):
+            connexion.close()
+
+    @contextmanager
+    def connexion(self):
+        """
+        Emprunte une connexion du pool (ouverte à la demande)
+        Une connexion coupée est fermée au lieu d'être rendue au pool
+        """
+        self._places.acquire()
+        try:
+            try:
+                connexion = self._libres.get_nowait()
+            except queue.Empty:
+                connexion = self._ouvrir()
+
+            try:
+                yield connexion
+            except smtplib.SMTPServerDisconnected:
+                connexion.close()
+                raise
+            except smtplib.SMTPException:
+                # Erreur liée au message : la connexion reste utilisable
+                self._libres.put(connexion)
+                raise
+            except OSError:
+                connexion.close()
+                raise
+            except Exception:
+                # Erreur inattendue : l'état de la connexion est inconnu
+                connexion.close()
+                raise
+            else:
+                self._libres.put(connexion)
+        finally:
+            self._places.release()
+
+    def fermer(self):
+        """
+        Ferme toutes les connexions libres
+        """
+        while True:
+            try:
+                self._fermer(self._libres.get_nowait())
+            except queue.Empty:
+                break
+
+class LimiteurDebit:
+    """
+    Limiteur de débit à seau de jetons, un seau par domaine destinataire
+    """
+
+    def __init__(self, debit, rafale=None):
+        self.debit = debit
+        self.rafale = rafale or debit
+        self._seaux = {}
+        self._verrou = threading.Lock()
+
+    def attendre(self, cle):
+        """
+        Bloque jusqu'à ce qu'un envoi soit autorisé pour cette clé
+        """
+        while True:
+            with self._verrou:
+                maintenant = time.monotonic()
+                jetons, dernier = self._seaux.get(cle, (self.rafale, maintenant))
+                jetons = min(self.rafale, jetons + (maintenant - dernier) * self.debit)
+
+                if jetons >= 1:
+                    self._seaux[cle] = (jetons - 1, maintenant)
+                    return
+
+                self._seaux[cle] = (jetons, maintenant)
+                attente = (1 - jetons) / self.debit
+
+            time.sleep(attente)
+
+def construire_message(expediteur, destinataire, sujet, corps):
+    """
+    Construit le message MIME d'un email
+    """
+    message = MIMEMultipart()
+    message['From'] = expediteur
+    message['To'] = destinataire
+    message['Subject'] = sujet.strip()
+    message.attach(MIMEText(corps, 'plain', 'utf-8'))
+    return message.as_string()
+
+def _erreur_definitive(erreur):
+    """
+    Indique si une erreur SMTP est permanente (code 5xx) et ne doit pas être retentée
+    """
+    if isinstance(erreur, smtplib.SMTPRecipientsRefused):
+        return all(500 <= code < 600 for code, _ in erreur.recipients.values())
+    if isinstance(erreur, smtplib.SMTPResponseException):
+        return 500 <= erreur.smtp_code < 600
+    return False
+
+def domaine(adresse):
+    """
+    Domaine d'une adresse email (clé de limitation de débit)
+    """
+    return adresse.rsplit('@', 1)[-1].lower()
+
+class MoteurEnvoi:
+    """
+    Envoi concurrent d'une campagne : plusieurs threads se partagent un pool
+    de connexions SMTP, avec limitation de débit, reprises et statut par message
+    """
+
+    def __init__(self, pool, expediteur, nb_threads=8, debit_par_domaine=None,
+                 tentatives_max=3, delai_reprise=1.0, taille_file=1000):
+        self.pool = pool
+        self.expediteur = expediteur
+        self.nb_threads = nb_threads
+        self.limiteur = LimiteurDebit(debit_par_domaine) if debit_par_domaine else None
+        self.tentatives_max = tentatives_max
+        self.delai_reprise = delai_reprise
+        self.taille_file = taille_file
+
+    def envoyer_un(self, message):
+        """
+        Envoie un message avec reprises (délai exponentiel) sur les erreurs temporaires
+        Renvoie (statut, tentatives, erreur) ; un message invalide (destinataire
+        ou sujet manquant...) est un échec sans tentative d'envoi
+        """
+        destinataire = message.get('destinataire')
+        try:
+            if not isinstance(destinataire, str) or '@' not in destinataire:
+                raise ValueError(f"destinataire invalide : {destinataire!r}")
+            contenu = construire_message(
+                self.expediteur, destinataire, message['sujet'], message['corps']
+            )
+        except Exception as erreur:
+            return STATUT_ECHEC, 0, f"Message invalide : {erreur}"
+
+        for tentative in range(1, self.tentatives_max + 1):
+            if self.limiteur:
+                self.limiteur.attendre(domaine(destinataire))
+
+            try:
+                with self.pool.connexion() as connexion:
+                    connexion.sendmail(self.expediteur, [destinataire], contenu)
+                return STATUT_ENVOYE, tentative, ''
+            except OSError as erreur:
+                if _erreur_definitive(erreur) or tentative == self.tentatives_max:
+                    return STATUT_ECHEC, tentative, str(erreur)
+                time.sleep(self.delai_reprise * 2 ** (tentative - 1))
+            except Exception as erreur:
+                # Erreur non liée au réseau : une nouvelle tentative échouerait de même
+                return STATUT_ECHEC, tentative, str(erreur)
+
+    def envoyer(self, messages, chemin_statuts='statuts_envoi.csv'):
+        """
+        Envoie tous les messages (itérable de dictionnaires destinataire / sujet / corps)
+        et écrit le statut de chaque message au fil de l'eau
+        Renvoie un résumé avec le débit en messages par seconde
+        """
+        file_messages = queue.Queue(maxsize=self.taille_file)
+        verrou = threading.Lock()
+        comptes = {STATUT_ENVOYE: 0, STATUT_ECHEC: 0}
+
+        with open(chemin_statuts, 'w', encoding='utf-8', newline='') as fichier:
+            ecrivain = csv.writer(fichier)
+            ecrivain.writerow(COLONNES_STATUTS)
+
+            def travailleur():
+                while True:
+                    message = file_messages.get()
+                    if message is None:
+                        break
+
+                    # Un message en erreur ne doit jamais arrêter le thread :
+                    # la file ne serait plus vidée et l'envoi resterait bloqué
+                    try:
+                        statut, tentatives, erreur = self.envoyer_un(message)
+                    except Exception as exception:
+                        statut, tentatives, erreur = STATUT_ECHEC, 0, str(exception)
+
+                    with verrou:
+                        comptes[statut] += 1
+                        ecrivain.writerow([
+                            message.get('destinataire'), statut, tentatives, erreur,
+                            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        ])
+
+            debut = time.perf_counter()
+
+            threads = [threading.Thread(target=travailleur) for _ in range(self.nb_threads)]
+            for thread in threads:
+                thread.start()
+
+            # La file bornée limite la mémoire quand la campagne est lue en flux
+            # Les threads sont arrêtés même si la lecture de la campagne échoue
+            try:
+                for message in messages:
+                    file_messages.put(message)
+            finally:
+                for _ in threads:
+                    file_messages.put(None)
+                for thread in threads:
+                    thread.join()
+
+            duree = time.perf_counter() - debut
+
+        self.pool.fermer()
+
+        total = comptes[STATUT_ENVOYE] + comptes[STATUT_ECHEC]
+        return {
+            'envoyes': comptes[STATUT_ENVOYE],
+            'echecs': comptes[STATUT_ECHEC],
+            'duree': round(duree, 2),
+            'messages_par_seconde': round(total / duree, 1) if duree else 0.0,
+            'connexions_ouvertes': self.pool.connexions_ouvertes
+        }
+
+def messages_campagne(chemin='emails_relance.csv', taille_lot=10_000):
+    """
+    Lit un fichier de campagne par lots (texte complet ou modèle + paramètres)
+    et produit les messages à envoyer
+    """
+    from emails import charger_modeles, lire_campagne, rendre_email
+
+    modeles = None
+    campagne = lire_campagne(chemin)
+
+    for lot in pd.read_csv(chemin, chunksize=taille_lot):
+        if campagne is not None or 'modele' in lot.columns:
+            modeles = modeles or charger_modeles()
+            for _, parametres in lot.iterrows():
+                sujet, corps = rendre_email(parametres, modeles, campagne)
+                yield {'destinataire': parametres['destinataire'], 'sujet': sujet, 'corps': corps}
+        else:
+            for destinataire, sujet, corps in zip(lot['destinataire'], lot['sujet'], lot['corps']):
+                yield {'destinataire': destinataire, 'sujet': sujet, 'corps': corps}
+
+# Test avec un serveur SMTP local (nécessite aiosmtpd)
+if __name__ == "__main__":
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.handlers import Sink
+
+    serveur = Controller(Sink(), hostname='127.0.0.1', port=8025)
+    serveur.start()
+
+    try:
+        pool = PoolSMTP('127.0.0.1', 8025, taille=4)
+        moteur = MoteurEnvoi(pool, 'equipe@gestion-abonnements.ma', nb_threads=4)
+        resume = moteur.envoyer(messages_campagne('emails_relance.csv'))
+
+        print("\n ENVOI DE LA CAMPAGNE :")
+        for key, value in resume.items():
+            print(f"  {key}: {value}")
+    finally:
+        serveur.stop()
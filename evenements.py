@@ -0,0 +1,274 @@
+import contextlib
+import csv
+import io
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from metriques_incrementales import SOUSCRIPTION, ANNULATION, EXPIRATION, CHANGEMENT_PLAN
+from modele import COLONNES_DERIVEES, ModeleClients, ajouter_lignes, colonnes_sources, preparer_modele
+from stockage import FICHIER_CSV, appliquer_schema, lire_csv
+
+FICHIER_EVENEMENTS = 'evenements_clients.csv'
+
+TYPES_EVENEMENTS = (SOUSCRIPTION, ANNULATION, EXPIRATION, CHANGEMENT_PLAN)
+
+COLONNES_EVENEMENTS = [
+    'type', 'date', 'id', 'nom', 'email', 'telephone',
+    'plan', 'prix_mensuel', 'ville', 'score_risque'
+]
+
+# Champs facultatifs d'une souscription (conservés s'ils ne sont pas fournis)
+CHAMPS_CLIENT = ['nom', 'email', 'telephone', 'ville', 'score_risque']
+
+# Nombre d'événements au-delà duquel le journal est fusionné dans le fichier clients
+SEUIL_COMPACTION = 10_000
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : seul le verrou entre threads d'un même processus s'applique
+    fcntl = None
+
+_verrou = threading.Lock()
+
+@contextlib.contextmanager
+def _verrouiller(chemin_evenements):
+    """
+    Verrou exclusif du journal, entre threads et entre processus
+    Le verrou (fcntl.flock) est pris sur un fichier à part : le journal
+    lui-même est remplacé par compacter
+    """
+    with _verrou:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{chemin_evenements}.verrou", 'a') as verrou:
+            fcntl.flock(verrou, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(verrou, fcntl.LOCK_UN)
+
+class JournalEvenements:
+    """
+    Journal des événements d'abonnement, en ajout seul (une ligne CSV par événement)
+    """
+
+    def __init__(self, chemin=FICHIER_EVENEMENTS):
+        self.chemin = chemin
+
+    def ajouter_lot(self, evenements):
+        """
+        Ajoute une liste d'événements {'type': ..., 'id': ..., 'date': ..., ...}
+        """
+        lignes = []
+        for evenement in evenements:
+            if evenement['type'] not in TYPES_EVENEMENTS:
+                raise ValueError(f"Type d'événement inconnu : {evenement['type']}")
+            date = pd.Timestamp(evenement.get('date') or datetime.now())
+            lignes.append({**evenement, 'date': date.strftime('%Y-%m-%d')})
+
+        with _verrouiller(self.chemin), open(self.chemin, 'a', newline='', encoding='utf-8') as fichier:
+            ecrivain = csv.DictWriter(fichier, COLONNES_EVENEMENTS)
+            if fichier.tell() == 0:
+                ecrivain.writeheader()
+            ecrivain.writerows(lignes)
+
+    def souscrire(self, id_client, plan, prix, date=None, **champs):
+        """
+        Nouveau client (ou réactivation) ; champs : nom, email, telephone, ville, score_risque
+        """
+        self.ajouter_lot([{
+            'type': SOUSCRIPTION, 'id': id_client, 'date': date,
+            'plan': plan, 'prix_mensuel': prix, **champs
+        }])
+
+    def annuler(self, id_client, date=None):
+        self.ajouter_lot([{'type': ANNULATION, 'id': id_client, 'date': date}])
+
+    def expirer(self, id_client, date=None):
+        self.ajouter_lot([{'type': EXPIRATION, 'id': id_client, 'date': date}])
+
+    def changer_plan(self, id_client, plan, prix, date=None):
+        self.ajouter_lot([{
+            'type': CHANGEMENT_PLAN, 'id': id_client, 'date': date,
+            'plan': plan, 'prix_mensuel': prix
+        }])
+
+def lire_evenements(chemin=FICHIER_EVENEMENTS, depuis=0):
+    """
+    Lit les événements à partir de la position `depuis` (en octets)
+    Renvoie (événements, position de fin) ; une dernière ligne incomplète
+    (écriture en cours) est laissée pour la lecture suivante
+    """
+    try:
+        with open(chemin, 'rb') as fichier:
+            entete = fichier.readline()
+            fichier.seek(max(depuis, len(entete)))
+            contenu = fichier.read()
+    except FileNotFoundError:
+        return pd.DataFrame(columns=COLONNES_EVENEMENTS), 0
+
+    fin = contenu.rfind(b'\n') + 1
+    position = max(depuis, len(entete)) + fin
+    if fin == 0:
+        return pd.DataFrame(columns=COLONNES_EVENEMENTS), position
+
+    evenements = pd.read_csv(
+        io.BytesIO(entete + contenu[:fin]),
+        dtype={'id': 'string', 'nom': 'string', 'email': 'string', 'telephone': 'string',
+               'plan': 'string', 'ville': 'string', 'type': 'string'},
+        parse_dates=['date']
+    )
+    return evenements, position
+
+def appliquer_evenements(df, evenements, index_ids=None):
+    """
+    Applique des événements au DataFrame clients (sans le modifier)
+    Seuls les clients concernés sont traités : les événements sont réduits
+    à l'état final de chaque client, puis écrits en une fois par colonne
+    Réappliquer les mêmes événements donne le même résultat
+
+    index_ids : pd.Index des identifiants de df, s'il est déjà construit
+    """
+    if len(evenements) == 0:
+        return df
+
+    # État final de chaque client touché, événement par événement
+    etats = {}
+    for evenement in evenements.itertuples(index=False):
+        maj = etats.setdefault(evenement.id, {})
+        if evenement.type == SOUSCRIPTION:
+            maj.update(
+                statut='actif', date_debut=evenement.date, date_fin=pd.NaT,
+                plan=evenement.plan, prix_mensuel=int(evenement.prix_mensuel), souscription=True
+            )
+            for champ in CHAMPS_CLIENT:
+                valeur = getattr(evenement, champ)
+                if not pd.isna(valeur):
+                    maj[champ] = valeur
+        elif evenement.type == ANNULATION:
+            maj.update(statut='annulé', date_fin=evenement.date)
+        elif evenement.type == EXPIRATION:
+            maj.update(statut='expiré', date_fin=evenement.date)
+        elif evenement.type == CHANGEMENT_PLAN:
+            maj.update(plan=evenement.plan, prix_mensuel=int(evenement.prix_mensuel))
+        else:
+            raise ValueError(f"Type d'événement inconnu : {evenement.type}")
+
+    if index_ids is None:
+        index_ids = pd.Index(df['id'])
+    ids = list(etats)
+    positions = index_ids.get_indexer(ids)
+
+    sources = [c for c in df.columns if c not in COLONNES_DERIVEES]
+    derivees = [c for c in df.columns if c in COLONNES_DERIVEES]
+
+    # Clients existants : une écriture par colonne modifiée
+    existants = [(p, etats[i]) for p, i in zip(positions, ids) if p >= 0]
+    colonnes = {}
+    for colonne in sources:
+        maj = [(p, etat[colonne]) for p, etat in existants if colonne in etat]
+        if not maj:
+            continue
+        lignes, valeurs = zip(*maj)
+        serie = df[colonne].copy()
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            nouvelles = set(valeurs) - set(serie.cat.categories)
+            if nouvelles:
+                serie = serie.cat.set_categories(sorted(set(serie.cat.categories) | nouvelles))
+        serie.iloc[list(lignes)] = pd.array(list(valeurs), dtype=serie.dtype)
+        colonnes[colonne] = serie
+
+    resultat = pd.DataFrame(df).assign(**colonnes)
+
+    # Colonnes dérivées recalculées pour les seules lignes modifiées
+    if derivees and existants:
+        lignes = [p for p, _ in existants]
+        recalcul = preparer_modele(resultat.iloc[lignes][sources])
+        resultat = resultat.assign(**{
+            colonne: _remplacer(resultat[colonne], lignes, recalcul[colonne])
+            for colonne in derivees
+        })
+
+    # Nouveaux clients
+    nouveaux = [(i, etats[i]) for p, i in zip(positions, ids) if p < 0]
+    if nouveaux:
+        inconnus = [i for i, etat in nouveaux if not etat.get('souscription')]
+        if inconnus:
+            raise ValueError(f"Événements sur des clients inconnus : {inconnus[:5]}")
+
+        lignes = appliquer_schema(pd.DataFrame(
+            [{'id': i, **{c: etat.get(c) for c in sources if c != 'id'}} for i, etat in nouveaux],
+            columns=sources
+        ))
+        if derivees:
+            lignes = preparer_modele(lignes)
+        resultat = ajouter_lignes(resultat, lignes)
+
+    return ModeleClients(resultat) if isinstance(df, ModeleClients) else pd.DataFrame(resultat)
+
+def _remplacer(serie, positions, valeurs):
+    serie = serie.copy()
+    serie.iloc[positions] = valeurs.to_numpy()
+    return serie
+
+def journal_existe(chemin=FICHIER_EVENEMENTS):
+    return os.path.exists(chemin)
+
+def compacter(chemin_csv=FICHIER_CSV, chemin_evenements=FICHIER_EVENEMENTS):
+    """
+    Fusionne le journal dans le fichier clients puis vide le journal
+    (les événements arrivés pendant la fusion sont conservés)
+    Le fichier clients est remplacé en premier : en cas d'interruption,
+    les événements sont simplement réappliqués au chargement suivant
+    Les écritures du journal (JournalEvenements.ajouter_lot, y compris depuis
+    d'autres processus) attendent la fin de la fusion
+    Renvoie le nombre d'événements fusionnés
+    """
+    with _verrouiller(chemin_evenements):
+        evenements, position = lire_evenements(chemin_evenements)
+        if len(evenements) == 0:
+            return 0
+
+        df = appliquer_evenements(lire_csv(chemin_csv), evenements)
+        temporaire = f"{chemin_csv}.tmp"
+        colonnes_sources(df).to_csv(temporaire, index=False, encoding='utf-8', date_format='%Y-%m-%d')
+        os.replace(temporaire, chemin_csv)
+
+        with open(chemin_evenements, 'rb') as fichier:
+            entete = fichier.readline()
+            fichier.seek(position)
+            reste = fichier.read()
+        with open(f"{chemin_evenements}.tmp", 'wb') as fichier:
+            fichier.write(entete + reste)
+        os.replace(f"{chemin_evenements}.tmp", chemin_evenements)
+
+    print(f" {len(evenements)} événements fusionnés dans '{chemin_csv}'")
+    return len(evenements)
+
+def compacter_si_necessaire(seuil=SEUIL_COMPACTION, chemin_csv=FICHIER_CSV,
+                            chemin_evenements=FICHIER_EVENEMENTS):
+    """
+    Compaction périodique : fusionne le journal s'il dépasse le seuil
+    """
+    try:
+        with open(chemin_evenements, 'rb') as fichier:
+            nombre = sum(bloc.count(b'\n') for bloc in iter(lambda: fichier.read(1 << 20), b'')) - 1
+    except FileNotFoundError:
+        return 0
+    if nombre < seuil:
+        return 0
+    return compacter(chemin_csv, chemin_evenements)
+
+# Compaction manuelle : python evenements.py [seuil]
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        compacter_si_necessaire(int(sys.argv[1]))
+    else:
+        compacter()
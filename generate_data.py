@@ -1,5 +1,12 @@
+import argparse
+import hashlib
+import os
+from multiprocessing import Pool
+
+import numpy as np
 import pandas as pd
 from faker import Faker
+from stockage import CLE_EMPREINTE, CLE_SIGNATURE, appliquer_schema, signature_fichier
 import random
 from datetime import datetime, timedelta
 
@@ -63,7 +70,188 @@ def generer_donnees_clients(nombre=100):
     print(f"✅ {nombre} clients générés et sauvegardés dans 'clients_data.csv'")
     return df
 
+# ---------- Génération vectorisée (tests de montée en charge) ----------
+
+PLANS = np.array(['Basic', 'Pro', 'Premium'])
+PRIX = np.array([99, 199, 299], dtype=np.int32)
+STATUTS = np.array(['actif', 'annulé', 'expiré'])
+POIDS_STATUTS = [0.7, 0.2, 0.1]
+
+# Taille des réserves de valeurs Faker tirées par indice
+TAILLE_RESERVE = 10_000
+TAILLE_RESERVE_VILLES = 1_000
+
+# Nombre de clients par lot : chaque lot a sa propre graine, le résultat
+# ne dépend donc pas du nombre de processus
+TAILLE_LOT = 500_000
+
+COLONNES = [
+    'id', 'nom', 'email', 'telephone', 'plan', 'prix_mensuel',
+    'date_debut', 'date_fin', 'statut', 'ville', 'score_risque'
+]
+
+def creer_reserves(graine=42, taille=TAILLE_RESERVE, taille_villes=TAILLE_RESERVE_VILLES):
+    """
+    Précalcule des réserves de noms, emails, téléphones et villes Faker
+    """
+    faker = Faker('fr_FR')
+    faker.seed_instance(graine)
+
+    return {
+        'nom': np.array([faker.name() for _ in range(taille)], dtype=object),
+        'email': np.array([faker.email() for _ in range(taille)], dtype=object),
+        'telephone': np.array([faker.phone_number() for _ in range(taille)], dtype=object),
+        'ville': np.array(sorted({faker.city() for _ in range(taille_villes)}), dtype=object)
+    }
+
+def generer_lot(numero, debut, nombre, reserves, graine=42, aujourd_hui=None):
+    """
+    Génère un lot de clients (identifiants debut + 1 à debut + nombre)
+    avec les mêmes distributions que generer_donnees_clients
+    """
+    rng = np.random.default_rng([graine, numero])
+    if aujourd_hui is None:
+        aujourd_hui = np.datetime64(datetime.now().date(), 'D')
+
+    code_plan = rng.integers(0, 3, nombre)
+    code_statut = rng.choice(3, nombre, p=POIDS_STATUTS)
+
+    # Début dans les 2 dernières années ; fin 30 à 365 jours plus tard si non actif
+    date_debut = aujourd_hui - rng.integers(30, 731, nombre)
+    date_fin = date_debut + rng.integers(30, 366, nombre)
+    date_fin[code_statut == 0] = np.datetime64('NaT')
+
+    ids = np.arange(debut + 1, debut + nombre + 1).astype(str)
+    villes = reserves['ville']
+
+    return pd.DataFrame({
+        'id': np.char.add('CLI', np.char.zfill(ids, 4)),
+        'nom': reserves['nom'][rng.integers(0, len(reserves['nom']), nombre)],
+        'email': reserves['email'][rng.integers(0, len(reserves['email']), nombre)],
+        'telephone': reserves['telephone'][rng.integers(0, len(reserves['telephone']), nombre)],
+        'plan': pd.Categorical.from_codes(code_plan, categories=PLANS),
+        'prix_mensuel': PRIX[code_plan],
+        'date_debut': date_debut.astype('datetime64[ns]'),
+        'date_fin': date_fin.astype('datetime64[ns]'),
+        'statut': pd.Categorical.from_codes(code_statut, categories=STATUTS),
+        'ville': pd.Categorical.from_codes(rng.integers(0, len(villes), nombre), categories=villes),
+        'score_risque': rng.uniform(0, 1, nombre).round(2)
+    }, columns=COLONNES)
+
+# Paramètres partagés par les processus de génération
+_contexte = {}
+
+def _initialiser(reserves, graine, aujourd_hui, format):
+    _contexte.update(reserves=reserves, graine=graine, aujourd_hui=aujourd_hui, format=format)
+
+def _produire_lot(tache):
+    """
+    Génère un lot et le sérialise dans le processus de travail
+    (texte CSV ou DataFrame typé pour Parquet)
+    """
+    numero, debut, nombre = tache
+    lot = generer_lot(
+        numero, debut, nombre, _contexte['reserves'],
+        graine=_contexte['graine'], aujourd_hui=_contexte['aujourd_hui']
+    )
+    texte = lot.to_csv(index=False, header=False, date_format='%Y-%m-%d', lineterminator='\n')
+    if _contexte['format'] == 'csv':
+        return texte, None
+    return texte, appliquer_schema(lot)
+
+def generer_donnees_rapide(nombre, chemin='clients_data.csv', format=None, graine=42,
+                           processus=None, taille_lot=TAILLE_LOT):
+    """
+    Génère un grand nombre de clients par lots, répartis sur plusieurs
+    processus, et écrit les lots au fil de l'eau (CSV ou Parquet)
+
+    En Parquet, le CSV source (même nom, extension .csv) est écrit dans le
+    même passage : le Parquet porte sa signature et son empreinte, comme
+    après convertir_csv_en_parquet, et n'est donc pas reconverti au chargement
+    """
+    if format is None:
+        format = 'parquet' if chemin.endswith('.parquet') else 'csv'
+    chemin_csv = chemin if format == 'csv' else os.path.splitext(chemin)[0] + '.csv'
+    if processus is None:
+        processus = os.cpu_count() or 1
+
+    reserves = creer_reserves(graine)
+    aujourd_hui = np.datetime64(datetime.now().date(), 'D')
+    taches = [
+        (numero, debut, min(taille_lot, nombre - debut))
+        for numero, debut in enumerate(range(0, nombre, taille_lot))
+    ]
+    contexte = (reserves, graine, aujourd_hui, format)
+
+    if processus > 1 and len(taches) > 1:
+        pool = Pool(processus, initializer=_initialiser, initargs=contexte)
+        lots = pool.imap(_produire_lot, taches)
+    else:
+        pool = None
+        _initialiser(*contexte)
+        lots = map(_produire_lot, taches)
+
+    ecrivain = None
+    try:
+        # Empreinte du CSV calculée sur les octets écrits (même calcul que stockage.empreinte_fichier)
+        hacheur = hashlib.blake2b(digest_size=16)
+        with open(chemin_csv, 'wb') as sortie:
+            entete = (','.join(COLONNES) + '\n').encode('utf-8')
+            hacheur.update(entete)
+            sortie.write(entete)
+            for texte, lot in lots:
+                octets = texte.encode('utf-8')
+                hacheur.update(octets)
+                sortie.write(octets)
+
+                if lot is not None:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+
+                    table = pa.Table.from_pandas(lot, preserve_index=False)
+                    if ecrivain is None:
+                        ecrivain = pq.ParquetWriter(f"{chemin}.tmp", table.schema)
+                    ecrivain.write_table(table.cast(ecrivain.schema))
+
+        if ecrivain is not None:
+            # Provenance lue par stockage.parquet_a_jour, une fois le CSV complet
+            ecrivain.add_key_value_metadata({
+                CLE_SIGNATURE: signature_fichier(chemin_csv),
+                CLE_EMPREINTE: hacheur.hexdigest()
+            })
+            ecrivain.close()
+            ecrivain = None
+            os.replace(f"{chemin}.tmp", chemin)
+    finally:
+        if ecrivain is not None:
+            ecrivain.close()
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if format == 'csv':
+        print(f"✅ {nombre} clients générés et sauvegardés dans '{chemin}'")
+    else:
+        print(f"✅ {nombre} clients générés et sauvegardés dans '{chemin_csv}' et '{chemin}'")
+    return chemin
+
 # Générer les données
 if __name__ == "__main__":
-    df = generer_donnees_clients(150)
-    print(df.head())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Génération de données clients de test")
+    parser.add_argument('nombre', type=int, nargs='?', default=150)
+    parser.add_argument('--rapide', action='store_true',
+                        help="générateur vectorisé pour les gros volumes")
+    parser.add_argument('--sortie', default='clients_data.csv',
+                        help="fichier de sortie (.csv ou .parquet) du générateur rapide")
+    parser.add_argument('--processus', type=int, default=None)
+    parser.add_argument('--graine', type=int, default=42)
+    arguments = parser.parse_args()
+
+    if arguments.rapide:
+        generer_donnees_rapide(
+            arguments.nombre, chemin=arguments.sortie,
+            graine=arguments.graine, processus=arguments.processus
+        )
+    else:
+        df = generer_donnees_clients(arguments.nombre)
+        print(df.head())
\ No newline at end of file
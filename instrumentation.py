@@ -0,0 +1,172 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows : pas de mesure mémoire
+    resource = None
+
+# Nombre d'exécutions (reruns Streamlit) gardées en mémoire
+NB_EXECUTIONS = 50
+
+# Fichiers d'export optionnels (désactivés si la variable n'est pas définie)
+FICHIER_JOURNAL = os.environ.get('PERFORMANCE_JOURNAL')
+FICHIER_OPENMETRICS = os.environ.get('PERFORMANCE_OPENMETRICS')
+
+METRIQUE = 'abonnements_section_duree_seconds'
+
+_verrou = threading.Lock()
+_executions = deque(maxlen=NB_EXECUTIONS)
+_totaux = defaultdict(lambda: [0, 0.0])  # section -> [nombre d'appels, durée totale]
+_local = threading.local()
+
+def _pic_memoire_ko():
+    """
+    Pic de mémoire résidente du processus (Ko), None si indisponible
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+@contextmanager
+def mesure(section):
+    """
+    Mesure la durée d'un bloc et la hausse du pic mémoire du processus
+    """
+    memoire = _pic_memoire_ko()
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        duree = time.perf_counter() - debut
+        hausse = None if memoire is None else _pic_memoire_ko() - memoire
+        _enregistrer(section, duree, hausse)
+
+def _enregistrer(section, duree, hausse_memoire):
+    with _verrou:
+        total = _totaux[section]
+        total[0] += 1
+        total[1] += duree
+
+    # Rattachement à l'exécution en cours dans ce fil (une session Streamlit)
+    execution = getattr(_local, 'execution', None)
+    if execution is not None:
+        execution['sections'].append({
+            'section': section,
+            'duree_ms': round(duree * 1000, 3),
+            'hausse_memoire_ko': hausse_memoire
+        })
+
+def instrumenter(fonction=None, section=None):
+    """
+    Décorateur : mesure chaque appel de la fonction
+    (section par défaut : module.fonction)
+    """
+    def decorer(f):
+        nom = section or f"{f.__module__}.{f.__name__}"
+
+        @functools.wraps(f)
+        def enveloppe(*args, **kwargs):
+            with mesure(nom):
+                return f(*args, **kwargs)
+
+        return enveloppe
+
+    return decorer(fonction) if fonction is not None else decorer
+
+# ---------- Exécutions (reruns) ----------
+
+def demarrer_execution(page=None):
+    """
+    Commence l'enregistrement d'une exécution ; termine la précédente
+    si elle a été interrompue (st.stop, exception)
+    """
+    terminer_execution()
+    _local.execution = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'page': page,
+        'sections': [],
+        '_debut': time.perf_counter()
+    }
+    return _local.execution
+
+def terminer_execution():
+    """
+    Clôt l'exécution en cours et l'exporte (journal, OpenMetrics) si demandé
+    """
+    execution = getattr(_local, 'execution', None)
+    if execution is None:
+        return None
+    _local.execution = None
+
+    execution['total_ms'] = round((time.perf_counter() - execution.pop('_debut')) * 1000, 3)
+    with _verrou:
+        _executions.append(execution)
+
+    if FICHIER_JOURNAL:
+        with open(FICHIER_JOURNAL, 'a', encoding='utf-8') as journal:
+            journal.write(json.dumps(execution, ensure_ascii=False) + '\n')
+    if FICHIER_OPENMETRICS:
+        ecrire_openmetrics(FICHIER_OPENMETRICS)
+
+    return execution
+
+def dernieres_executions(nombre=NB_EXECUTIONS):
+    """
+    Dernières exécutions terminées, de la plus ancienne à la plus récente
+    """
+    with _verrou:
+        return list(_executions)[-nombre:]
+
+def latences_par_section(executions):
+    """
+    Tableau exécutions x sections : durée cumulée (ms) de chaque section
+    """
+    lignes = []
+    for execution in executions:
+        ligne = {'date': execution['date'], 'page': execution['page'], 'total_ms': execution['total_ms']}
+        for mesure_section in execution['sections']:
+            section = mesure_section['section']
+            ligne[section] = ligne.get(section, 0) + mesure_section['duree_ms']
+        lignes.append(ligne)
+    return pd.DataFrame(lignes)
+
+# ---------- Export ----------
+
+def exporter_openmetrics():
+    """
+    Durées cumulées par section au format texte OpenMetrics
+    """
+    with _verrou:
+        totaux = sorted((section, nombre, total) for section, (nombre, total) in _totaux.items())
+
+    lignes = [
+        f"# TYPE {METRIQUE} summary",
+        f"# UNIT {METRIQUE} seconds",
+        f"# HELP {METRIQUE} Durée des sections instrumentées."
+    ]
+    for section, nombre, total in totaux:
+        etiquette = section.replace('\\', '\\\\').replace('"', '\\"')
+        lignes.append(f'{METRIQUE}_count{{section="{etiquette}"}} {nombre}')
+        lignes.append(f'{METRIQUE}_sum{{section="{etiquette}"}} {total:.6f}')
+    lignes.append("# EOF")
+
+    return '\n'.join(lignes) + '\n'
+
+def ecrire_openmetrics(chemin):
+    """
+    Écrit l'export OpenMetrics (remplacement atomique, pour un collecteur
+    de fichiers texte Prometheus)
+    """
+    temporaire = f"{chemin}.tmp"
+    with open(temporaire, 'w', encoding='utf-8') as sortie:
+        sortie.write(exporter_openmetrics())
+    os.replace(temporaire, chemin)
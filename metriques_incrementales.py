@@ -0,0 +1,255 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# Types d'événements d'abonnement
+SOUSCRIPTION = 'souscription'
+ANNULATION = 'annulation'
+EXPIRATION = 'expiration'
+CHANGEMENT_PLAN = 'changement_plan'
+
+class MetriquesIncrementales:
+    """
+    Maintient les métriques (MRR, churn, rétention, ARPU, LTV) et l'analyse
+    par plan à jour en O(1) par événement, sans recalcul sur tout le DataFrame
+    """
+
+    def __init__(self, intervalle_instantanes=None):
+        # id -> (statut, plan, prix_mensuel)
+        self.clients = {}
+        self.comptes_statut = {}
+        self.mrr = 0
+        # plan -> [nombre_clients, revenu_total, clients_actifs]
+        self.plans = {}
+        self.nb_evenements = 0
+        self.intervalle_instantanes = intervalle_instantanes
+        self.instantanes = []
+
+    @classmethod
+    def depuis_dataframe(cls, df, intervalle_instantanes=None):
+        """
+        Initialise les compteurs à partir du DataFrame clients
+        (comptes calculés par colonne, sans boucle sur les lignes)
+        """
+        suivi = cls(intervalle_instantanes)
+        statuts = df['statut'].astype(object)
+        plans = df['plan'].astype(object)
+        prix = df['prix_mensuel'].astype('int64')
+        actifs = (statuts == 'actif').to_numpy()
+
+        suivi.clients = dict(zip(df['id'].tolist(), zip(statuts.tolist(), plans.tolist(), prix.tolist())))
+        suivi.comptes_statut = {statut: int(n) for statut, n in statuts.value_counts().items()}
+        suivi.mrr = int(prix[actifs].sum())
+
+        comptes = pd.DataFrame({'plan': plans, 'prix': prix, 'actif': actifs}).groupby('plan').agg(
+            nombre=('prix', 'size'), revenu=('prix', 'sum'), actifs=('actif', 'sum')
+        )
+        suivi.plans = {
+            plan: [int(nombre), int(revenu), int(actifs)]
+            for plan, nombre, revenu, actifs in comptes.itertuples()
+        }
+        return suivi
+
+    def ajouter_clients(self, df):
+        """
+        Ajoute les clients d'un DataFrame (lignes ajoutées au fichier clients) ;
+        un client déjà suivi est remplacé
+        """
+        for id_client, statut, plan, prix in zip(
+            df['id'], df['statut'].astype(object), df['plan'].astype(object), df['prix_mensuel']
+        ):
+            if id_client in self.clients:
+                self._retirer(id_client)
+            self._ajouter(id_client, statut, plan, int(prix))
+
+    def appliquer_lot(self, evenements):
+        """
+        Applique, dans l'ordre, les événements d'un DataFrame lu dans le journal
+        (colonnes type, id, plan, prix_mensuel)
+        """
+        for evenement in evenements[['type', 'id', 'plan', 'prix_mensuel']].itertuples(index=False):
+            self.appliquer(evenement._asdict())
+
+    # ---------- Mise à jour des compteurs ----------
+
+    def _ajouter(self, id_client, statut, plan, prix):
+        self.clients[id_client] = (statut, plan, prix)
+        self.comptes_statut[statut] = self.comptes_statut.get(statut, 0) + 1
+
+        compteurs = self.plans.setdefault(plan, [0, 0, 0])
+        compteurs[0] += 1
+        compteurs[1] += prix
+
+        if statut == 'actif':
+            self.mrr += prix
+            compteurs[2] += 1
+
+    def _retirer(self, id_client):
+        if id_client not in self.clients:
+            raise ValueError(f"Événement sur un client inconnu : {id_client}")
+        statut, plan, prix = self.clients.pop(id_client)
+        self.comptes_statut[statut] -= 1
+
+        compteurs = self.plans[plan]
+        compteurs[0] -= 1
+        compteurs[1] -= prix
+
+        if statut == 'actif':
+            self.mrr -= prix
+            compteurs[2] -= 1
+
+        return statut, plan, prix
+
+    def _evenement_traite(self):
+        self.nb_evenements += 1
+        if self.intervalle_instantanes and self.nb_evenements % self.intervalle_instantanes == 0:
+            self.prendre_instantane()
+
+    # ---------- Événements d'abonnement ----------
+
+    def souscrire(self, id_client, plan, prix):
+        """
+        Nouvelle souscription (ou réactivation d'un client existant)
+        """
+        if id_client in self.clients:
+            self._retirer(id_client)
+        self._ajouter(id_client, 'actif', plan, int(prix))
+        self._evenement_traite()
+
+    def annuler(self, id_client):
+        """
+        Annulation d'un abonnement
+        """
+        _, plan, prix = self._retirer(id_client)
+        self._ajouter(id_client, 'annulé', plan, prix)
+        self._evenement_traite()
+
+    def expirer(self, id_client):
+        """
+        Expiration d'un abonnement
+        """
+        _, plan, prix = self._retirer(id_client)
+        self._ajouter(id_client, 'expiré', plan, prix)
+        self._evenement_traite()
+
+    def changer_plan(self, id_client, plan, prix):
+        """
+        Changement de plan d'un client (le statut est conservé)
+        """
+        statut, _, _ = self._retirer(id_client)
+        self._ajouter(id_client, statut, plan, int(prix))
+        self._evenement_traite()
+
+    def appliquer(self, evenement):
+        """
+        Applique un événement sous forme de dictionnaire
+        {'type': ..., 'id': ..., 'plan': ..., 'prix_mensuel': ...}
+        """
+        type_evenement = evenement['type']
+
+        if type_evenement == SOUSCRIPTION:
+            self.souscrire(evenement['id'], evenement['plan'], evenement['prix_mensuel'])
+        elif type_evenement == ANNULATION:
+            self.annuler(evenement['id'])
+        elif type_evenement == EXPIRATION:
+            self.expirer(evenement['id'])
+        elif type_evenement == CHANGEMENT_PLAN:
+            self.changer_plan(evenement['id'], evenement['plan'], evenement['prix_mensuel'])
+        else:
+            raise ValueError(f"Type d'événement inconnu : {type_evenement}")
+
+    # ---------- Lecture ----------
+
+    def metriques(self):
+        """
+        Renvoie les métriques au même format que calculs.calculer_metriques
+        """
+        total = len(self.clients)
+        actifs = self.comptes_statut.get('actif', 0)
+        annules = self.comptes_statut.get('annulé', 0)
+        arpu = round(self.mrr / actifs, 2) if actifs else np.nan
+
+        return {
+            'total_clients': total,
+            'clients_actifs': actifs,
+            'clients_annules': annules,
+            'taux_churn': round((annules / total) * 100, 2),
+            'taux_retention': round((actifs / total) * 100, 2),
+            'mrr': self.mrr,
+            'arpu': arpu,
+            'ltv_moyen': round(arpu * 12, 2)
+        }
+
+    def par_plan(self):
+        """
+        Renvoie l'analyse par plan au même format que calculs.analyser_par_plan
+        """
+        plans = sorted(p for p, compteurs in self.plans.items() if compteurs[0] > 0)
+        analyse = pd.DataFrame(
+            [self.plans[p] for p in plans],
+            index=pd.Index(plans, name='plan'),
+            columns=['nombre_clients', 'revenu_total', 'clients_actifs']
+        )
+        return analyse
+
+    def prendre_instantane(self, date=None):
+        """
+        Enregistre un instantané horodaté des métriques courantes
+        """
+        instantane = {'date': date or datetime.now(), **self.metriques()}
+        self.instantanes.append(instantane)
+        return instantane
+
+    def historique(self):
+        """
+        Renvoie les instantanés sous forme de DataFrame
+        """
+        return pd.DataFrame(self.instantanes)
+
+def verifier_coherence(suivi, df):
+    """
+    Compare les métriques incrémentales à un recalcul complet de calculer_metriques
+    Renvoie la liste des métriques divergentes (vide si tout est cohérent)
+    """
+    from calculs import calculer_metriques, analyser_par_plan
+
+    attendu = calculer_metriques(df)
+    obtenu = suivi.metriques()
+
+    ecarts = [
+        cle for cle, valeur in attendu.items()
+        if not np.isclose(valeur, obtenu[cle], equal_nan=True)
+    ]
+
+    plans_attendus = analyser_par_plan(df)
+    plans_obtenus = suivi.par_plan()
+    if not np.array_equal(
+        plans_attendus.to_numpy(), plans_obtenus.loc[plans_attendus.index].to_numpy()
+    ):
+        ecarts.append('par_plan')
+
+    return ecarts
+
+# Test
+if __name__ == "__main__":
+    from calculs import charger_donnees
+
+    df = charger_donnees()
+    if df is not None:
+        suivi = MetriquesIncrementales.depuis_dataframe(df)
+
+        # Quelques événements, répercutés aussi sur le DataFrame de contrôle
+        id_client = df['id'].iloc[0]
+        suivi.annuler(id_client)
+        df = df.assign(statut=df['statut'].where(df['id'] != id_client, 'annulé'))
+
+        suivi.souscrire('CLI9999', 'Pro', 199)
+        nouveau = df.iloc[[0]].assign(id='CLI9999', plan='Pro', prix_mensuel=199, statut='actif')
+        df = pd.concat([df, nouveau], ignore_index=True)
+
+        print("\n MÉTRIQUES INCRÉMENTALES :")
+        for key, value in suivi.metriques().items():
+            print(f"  {key}: {value}")
+
+        ecarts = verifier_coherence(suivi, df)
+        print("\n Cohérence :", "OK" if not ecarts else f"écarts sur {ecarts}")
@@ -0,0 +1,199 @@
+import pandas as pd
+
+from stockage import COLONNES_DATES, SCHEMA
+
+# Colonnes dérivées calculées une seule fois au chargement
+COLONNES_DERIVEES = ['mois_cohorte', 'anciennete_jours', 'est_actif']
+
+# Colonnes texte volumineuses, absentes du modèle compact et chargées à la demande
+COLONNES_TEXTE = ['nom', 'email', 'telephone']
+
+# Format des identifiants clients : 'CLI0001', 'CLI0002'...
+PREFIXE_ID = 'CLI'
+
+class ModeleClients(pd.DataFrame):
+    """
+    Table clients chargée, en lecture seule : les colonnes ne peuvent être ni
+    ajoutées, ni remplacées, ni supprimées. Les opérations (filtres, sélections,
+    copy, assign) renvoient des DataFrame ordinaires, modifiables
+    """
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    def _lecture_seule(self, *args, **kwargs):
+        raise TypeError(
+            "Le modèle clients est en lecture seule : utilisez .copy() ou .assign()"
+        )
+
+    __setitem__ = _lecture_seule
+    __delitem__ = _lecture_seule
+    insert = _lecture_seule
+    pop = _lecture_seule
+
+def preparer_modele(df, date_reference=None):
+    """
+    Convertit les dates une seule fois et ajoute les colonnes dérivées
+    (mois de cohorte, ancienneté en jours, client actif)
+    """
+    reference = pd.Timestamp(date_reference or pd.Timestamp.now()).normalize()
+
+    dates = {
+        colonne: pd.to_datetime(df[colonne])
+        for colonne in COLONNES_DATES
+        if not pd.api.types.is_datetime64_any_dtype(df[colonne])
+    }
+    df = df.assign(**dates)
+
+    # Ancienneté : jusqu'à la date de fin, ou jusqu'à aujourd'hui si l'abonnement court
+    fin = df['date_fin'].fillna(reference)
+
+    df = df.assign(
+        mois_cohorte=df['date_debut'].dt.to_period('M'),
+        anciennete_jours=(fin - df['date_debut']).dt.days,
+        est_actif=df['statut'] == 'actif'
+    )
+
+    return ModeleClients(df)
+
+def charger_modele(format='auto', colonnes=None, evenements=True, compact=False):
+    """
+    Charge les données clients sous forme de modèle en lecture seule
+    compact : disposition compacte, sans les colonnes texte (voir modele_compact)
+    """
+    from calculs import charger_donnees
+
+    if compact and colonnes is None:
+        colonnes = [c for c in SCHEMA if c not in COLONNES_TEXTE]
+    df = charger_donnees(format=format, colonnes=colonnes, evenements=evenements)
+    if df is None:
+        return None
+    modele = preparer_modele(df)
+    return modele_compact(modele) if compact else modele
+
+# ---------- Disposition compacte ----------
+
+def encoder_ids(ids):
+    """
+    Numéros entiers (int32) des identifiants 'CLI0001'... ;
+    None si un identifiant ne suit pas ce format
+    """
+    ids = pd.Series(ids, dtype='string')
+    if ids.isna().any() or not ids.str.fullmatch(PREFIXE_ID + r'\d{4,9}').all():
+        return None
+    numeros = ids.str.slice(len(PREFIXE_ID)).astype('int32')
+    # Les zéros superflus ('CLI00001') ne se retrouveraient pas au décodage
+    if not decoder_ids(numeros).equals(ids.reset_index(drop=True)):
+        return None
+    return numeros.to_numpy()
+
+def decoder_ids(numeros):
+    """
+    Identifiants 'CLI0001'... à partir de leurs numéros
+    """
+    return PREFIXE_ID + pd.Series(numeros).astype('string').str.zfill(4)
+
+def modele_compact(modele):
+    """
+    Modèle en disposition compacte : identifiants entiers (si tous suivent
+    le format CLI0001), colonnes peu variées en catégories, entiers réduits
+    au plus petit type suffisant, colonnes texte retirées (voir ajouter_textes)
+    """
+    df = pd.DataFrame(modele).drop(columns=[c for c in COLONNES_TEXTE if c in modele.columns])
+    colonnes = {}
+
+    if 'id' in df.columns and not pd.api.types.is_integer_dtype(df['id']):
+        numeros = encoder_ids(df['id'])
+        if numeros is not None:
+            colonnes['id'] = numeros
+    for colonne in ['prix_mensuel', 'anciennete_jours']:
+        if colonne in df.columns:
+            colonnes[colonne] = pd.to_numeric(df[colonne], downcast='integer')
+    for colonne in ['plan', 'statut', 'ville', 'mois_cohorte']:
+        if colonne in df.columns and not isinstance(df[colonne].dtype, pd.CategoricalDtype):
+            colonnes[colonne] = df[colonne].astype('category')
+    if 'score_risque' in df.columns:
+        colonnes['score_risque'] = df['score_risque'].astype('float32')
+
+    return ModeleClients(df.assign(**colonnes))
+
+def ajouter_textes(modele, format='auto', evenements=True):
+    """
+    Modèle complété des colonnes texte (nom, email, telephone), lues à la
+    demande pour les pages qui les affichent (seules ces colonnes sont lues
+    depuis le fichier Parquet)
+    """
+    from calculs import charger_donnees
+
+    textes = charger_donnees(format=format, colonnes=['id'] + COLONNES_TEXTE, evenements=evenements)
+    if len(textes) != len(modele) or not identifiants(textes).equals(identifiants(modele)):
+        raise ValueError("Le fichier clients a changé depuis le chargement du modèle : rechargez-le")
+
+    return pd.DataFrame(modele).assign(**{
+        colonne: textes[colonne].set_axis(modele.index) for colonne in COLONNES_TEXTE
+    })
+
+def octets_par_client(df):
+    """
+    Mémoire occupée par client (octets), au total et par colonne
+    """
+    octets = df.memory_usage(deep=True, index=False) / max(len(df), 1)
+    return float(octets.sum()), octets.round(1)
+
+def ajouter_lignes(modele, lignes):
+    """
+    Modèle étendu avec de nouvelles lignes déjà préparées
+    (les catégories des deux parties sont réunies)
+    """
+    modele, lignes = pd.DataFrame(modele), pd.DataFrame(lignes)
+
+    for colonne in modele.columns:
+        if isinstance(modele[colonne].dtype, pd.CategoricalDtype):
+            categories = sorted(
+                set(modele[colonne].cat.categories) | set(lignes[colonne].dropna().unique())
+            )
+            modele = modele.assign(**{colonne: modele[colonne].cat.set_categories(categories)})
+            lignes = lignes.assign(**{colonne: pd.Categorical(lignes[colonne], categories=categories)})
+
+    return ModeleClients(pd.concat([modele, lignes[modele.columns]], ignore_index=True))
+
+def colonnes_sources(df):
+    """
+    Données sans les colonnes dérivées (pour les exports)
+    """
+    return df.drop(columns=[c for c in COLONNES_DERIVEES if c in df.columns])
+
+# ---------- Accès aux colonnes dérivées (avec repli sur un DataFrame brut) ----------
+
+def masque_actifs(df):
+    """
+    Masque des clients actifs
+    """
+    if 'est_actif' in df.columns:
+        return df['est_actif']
+    return df['statut'] == 'actif'
+
+def dates_debut(df):
+    """
+    Dates de début au format datetime
+    """
+    if pd.api.types.is_datetime64_any_dtype(df['date_debut']):
+        return df['date_debut']
+    return pd.to_datetime(df['date_debut'])
+
+def identifiants(df):
+    """
+    Identifiants 'CLI0001'... des clients (décodés dans le modèle compact)
+    """
+    if pd.api.types.is_integer_dtype(df['id']):
+        return decoder_ids(df['id'].to_numpy())
+    return df['id'].astype('string').reset_index(drop=True)
+
+def mois_cohorte(df):
+    """
+    Mois d'inscription (période mensuelle) de chaque client
+    """
+    if 'mois_cohorte' in df.columns:
+        return df['mois_cohorte']
+    return dates_debut(df).dt.to_period('M')
@@ -0,0 +1,60 @@
+import numpy as np
+
+TAILLE_PAGE = 50
+
+# Colonnes dont l'ordre de tri est précalculé au chargement
+COLONNES_ORDRE = ('score_risque',)
+
+def calculer_ordres(df, colonnes=COLONNES_ORDRE):
+    """
+    Précalcule les ordres de tri (croissant et décroissant) de certaines colonnes
+    Renvoie {(colonne, ascendant): positions triées}
+    """
+    ordres = {}
+    for colonne in colonnes:
+        valeurs = df[colonne].to_numpy()
+        ordres[(colonne, True)] = np.argsort(valeurs, kind='stable')
+        ordres[(colonne, False)] = np.argsort(-valeurs, kind='stable')
+    return ordres
+
+def nombre_pages(total, taille_page=TAILLE_PAGE):
+    """
+    Nombre de pages nécessaires (au moins une)
+    """
+    return max(1, -(-total // taille_page))
+
+def ordonner(df, positions, tri=None, ascendant=True, ordres=None):
+    """
+    Trie les positions filtrées selon une colonne, en réutilisant
+    l'ordre précalculé quand il existe
+    """
+    if tri is None:
+        return positions
+
+    if ordres and (tri, ascendant) in ordres:
+        # Parcours de l'ordre global en ne gardant que les lignes filtrées
+        ordre = ordres[(tri, ascendant)]
+        if len(positions) == len(df):
+            return ordre
+        garde = np.zeros(len(df), dtype=bool)
+        garde[positions] = True
+        return ordre[garde[ordre]]
+
+    # Sinon, seul le sous-ensemble filtré est trié
+    valeurs = df[tri].iloc[positions].reset_index(drop=True)
+    rangs = valeurs.sort_values(ascending=ascendant, kind='stable').index.to_numpy()
+    return positions[rangs]
+
+def paginer(df, positions=None, page=1, taille_page=TAILLE_PAGE, tri=None,
+            ascendant=True, ordres=None, colonnes=None):
+    """
+    Renvoie uniquement les lignes de la page demandée (numérotée à partir de 1)
+    """
+    if positions is None:
+        positions = np.arange(len(df))
+
+    positions = ordonner(df, positions, tri, ascendant, ordres)
+    debut = (page - 1) * taille_page
+    page_df = df.iloc[positions[debut:debut + taille_page]]
+
+    return page_df if colonnes is None else page_df[colonnes]
@@ -0,0 +1,256 @@
+import io
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from calculs import calculer_tableau_de_bord
+from classeur import LIGNES_MAX, ClasseurFlux, decouper
+from instrumentation import instrumenter
+from modele import colonnes_sources
+
+TYPES_RAPPORT = ["Rapport Complet", "Rapport Financier", "Rapport Clients", "Rapport Churn"]
+
+# Format d'export -> (extension, type MIME, libellé du téléchargement)
+FORMATS = {
+    'CSV': ('csv', 'text/csv', 'CSV'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'Excel'),
+    'Texte': ('txt', 'text/plain', 'TXT')
+}
+
+# Lignes écrites entre deux mises à jour de la progression
+TAILLE_LOT = 50_000
+
+# Nombre de rapports terminés gardés en cache
+TAILLE_CACHE = 8
+
+# Nombre de rapports générés en même temps
+NB_TRAVAILLEURS = 2
+
+# Nombre de clients à partir duquel les agrégats d'un rapport sont calculés
+# sur plusieurs processus (si le générateur en a reçu le nombre)
+LIGNES_PARALLELE = 1_000_000
+
+def nom_fichier(type_rapport, format_export):
+    return f"rapport_{type_rapport.replace(' ', '_').lower()}.{FORMATS[format_export][0]}"
+
+def _sans_progression(fraction, message):
+    pass
+
+def _lots(nombre):
+    """
+    Débuts des lots de lignes (au moins un, pour écrire l'en-tête d'une table vide)
+    """
+    return range(0, nombre, TAILLE_LOT) if nombre else [0]
+
+# ---------- Contenu des rapports ----------
+
+@instrumenter
+def rapport_csv(df, progression=_sans_progression):
+    """
+    Données clients au format CSV, écrites par lots
+    """
+    donnees = colonnes_sources(df)
+    sortie = io.StringIO()
+    for debut in _lots(len(donnees)):
+        donnees.iloc[debut:debut + TAILLE_LOT].to_csv(sortie, index=False, header=debut == 0)
+        ecrites = min(debut + TAILLE_LOT, len(donnees))
+        progression(ecrites / max(len(donnees), 1), f"Export CSV : {ecrites} / {len(donnees)} lignes")
+    return sortie.getvalue().encode('utf-8')
+
+@instrumenter
+def rapport_excel(df, progression=_sans_progression, moteur='flux', lignes_max=LIGNES_MAX, processus=None):
+    """
+    Classeur Excel : données, analyse par plan et clients à risque
+    Les tables plus longues que la limite d'Excel sont réparties sur plusieurs feuilles
+
+    moteur : 'flux' (classeur.ClasseurFlux, mémoire bornée) ou 'openpyxl'
+    (cellules construites en mémoire, lent au-delà de quelques centaines de milliers de lignes)
+    processus : nombre de processus des agrégats (voir calculer_tableau_de_bord)
+    """
+    donnees = colonnes_sources(df)
+    # Analyse par plan et clients à risque calculés en une seule passe
+    tableau = calculer_tableau_de_bord(df, processus=processus)
+    sortie = io.BytesIO()
+
+    if moteur == 'flux':
+        with ClasseurFlux(sortie) as classeur:
+            classeur.ajouter(
+                'Données', donnees, lignes_max=lignes_max,
+                progression=lambda ecrites, total: progression(
+                    0.9 * ecrites / max(total, 1), f"Feuille Données : {ecrites} / {total} lignes"
+                )
+            )
+            classeur.ajouter('Par Plan', tableau.par_plan, index=True, lignes_max=lignes_max)
+            progression(0.92, "Feuille Clients à Risque")
+            classeur.ajouter('Clients à Risque', tableau.clients_risque, lignes_max=lignes_max)
+            progression(0.98, "Enregistrement du classeur")
+        return sortie.getvalue()
+
+    if moteur != 'openpyxl':
+        raise ValueError(f"Moteur Excel inconnu : {moteur}")
+
+    # Nécessite openpyxl
+    with pd.ExcelWriter(sortie, engine='openpyxl') as writer:
+        ecrites = 0
+        for nom, morceau in decouper('Données', donnees, lignes_max):
+            for debut in _lots(len(morceau)):
+                lot = morceau.iloc[debut:debut + TAILLE_LOT]
+                lot.to_excel(
+                    writer, sheet_name=nom, index=False,
+                    header=debut == 0, startrow=debut + 1 if debut else 0
+                )
+                ecrites += len(lot)
+                progression(0.5 * ecrites / max(len(donnees), 1), f"Feuille {nom} : {ecrites} / {len(donnees)} lignes")
+
+        for nom, morceau in decouper('Par Plan', tableau.par_plan, lignes_max):
+            morceau.to_excel(writer, sheet_name=nom)
+        progression(0.52, "Feuille Clients à Risque")
+        for nom, morceau in decouper('Clients à Risque', tableau.clients_risque, lignes_max):
+            morceau.to_excel(writer, sheet_name=nom, index=False)
+        progression(0.55, "Enregistrement du classeur")
+    return sortie.getvalue()
+
+@instrumenter
+def rapport_texte(df, progression=_sans_progression, processus=None):
+    """
+    Résumé texte des métriques principales
+    processus : nombre de processus des agrégats (voir calculer_tableau_de_bord)
+    """
+    tableau = calculer_tableau_de_bord(df, processus=processus)
+    metriques = tableau.metriques
+    texte = f"""
+===========================================
+RAPPORT DE GESTION DES ABONNEMENTS
+===========================================
+
+Date de génération : {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}
+
+MÉTRIQUES PRINCIPALES
+---------------------
+Total Clients : {metriques['total_clients']}
+Clients Actifs : {metriques['clients_actifs']}
+Clients Annulés : {metriques['clients_annules']}
+Taux de Churn : {metriques['taux_churn']}%
+Taux de Rétention : {metriques['taux_retention']}%
+
+FINANCES
+--------
+MRR : {metriques['mrr']:,.0f} MAD
+ARPU : {metriques['arpu']:.0f} MAD
+LTV Moyen : {metriques['ltv_moyen']:,.0f} MAD
+
+CLIENTS À RISQUE
+----------------
+Nombre : {len(tableau.clients_risque)}
+
+===========================================
+            """
+    return texte.encode('utf-8')
+
+GENERATEURS = {
+    'CSV': rapport_csv,
+    'Excel': rapport_excel,
+    'Texte': rapport_texte
+}
+
+# Formats dont le contenu inclut les agrégats (paramètre processus)
+FORMATS_AGREGES = ('Excel', 'Texte')
+
+# ---------- Génération en arrière-plan ----------
+
+class TravailRapport:
+    """
+    Génération d'un rapport : progression (0 à 1), message, puis contenu ou erreur
+    """
+
+    def __init__(self, cle):
+        self.cle = cle
+        self.progression = 0.0
+        self.message = "En attente"
+        self.contenu = None
+        self.erreur = None
+        self.duree = None
+        self._termine = threading.Event()
+
+    @property
+    def termine(self):
+        return self._termine.is_set()
+
+    def attendre(self, delai=None):
+        """
+        Attend la fin de la génération (au plus `delai` secondes) ; indique si elle est terminée
+        """
+        return self._termine.wait(delai)
+
+    def _avancer(self, fraction, message):
+        self.progression = min(max(fraction, 0.0), 1.0)
+        self.message = message
+
+class GenerateurRapports:
+    """
+    Génère les rapports dans un pool de threads, sans bloquer l'interface
+
+    Les rapports sont identifiés par (type, format, version des données) :
+    une demande déjà en cours ou terminée renvoie le même travail, si bien
+    qu'un second clic ou un second utilisateur télécharge immédiatement
+
+    processus : si fourni, les agrégats des rapports d'au moins
+    LIGNES_PARALLELE clients sont calculés sur ce nombre de processus
+    """
+
+    def __init__(self, nb_travailleurs=NB_TRAVAILLEURS, taille_cache=TAILLE_CACHE, processus=None):
+        self.taille_cache = taille_cache
+        self.processus = processus
+        self._pool = ThreadPoolExecutor(max_workers=nb_travailleurs, thread_name_prefix='rapport')
+        self._travaux = OrderedDict()  # clé -> TravailRapport (en cours ou terminé)
+        self._verrou = threading.Lock()
+
+    def demander(self, type_rapport, format_export, df, version, relancer=False):
+        """
+        Travail du rapport demandé, lancé s'il n'existe pas encore
+        relancer : relance un rapport dont la génération a échoué
+        """
+        if format_export not in GENERATEURS:
+            raise ValueError(f"Format d'export inconnu : {format_export}")
+
+        cle = (type_rapport, format_export, version)
+        with self._verrou:
+            travail = self._travaux.get(cle)
+            if travail is not None and not (relancer and travail.erreur is not None):
+                self._travaux.move_to_end(cle)
+                return travail
+
+            travail = TravailRapport(cle)
+            self._travaux[cle] = travail
+            self._evincer()
+
+        self._pool.submit(self._executer, travail, df)
+        return travail
+
+    def _executer(self, travail, df):
+        debut = time.perf_counter()
+        travail._avancer(0.0, "Génération en cours")
+        try:
+            options = {}
+            if self.processus and travail.cle[1] in FORMATS_AGREGES and len(df) >= LIGNES_PARALLELE:
+                options['processus'] = self.processus
+            travail.contenu = GENERATEURS[travail.cle[1]](df, travail._avancer, **options)
+            travail._avancer(1.0, "Rapport prêt")
+        except Exception as erreur:
+            travail.erreur = erreur
+            travail.message = "Échec de la génération"
+        finally:
+            travail.duree = time.perf_counter() - debut
+            travail._termine.set()
+
+    def _evincer(self):
+        # Seuls les rapports terminés sont retirés, les plus anciens d'abord
+        termines = [cle for cle, travail in self._travaux.items() if travail.termine]
+        while len(self._travaux) > self.taille_cache and termines:
+            del self._travaux[termines.pop(0)]
+
+    def fermer(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
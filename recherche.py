@@ -0,0 +1,509 @@
+import copy
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+TAILLE_NGRAMME = 3
+RATIO_INTERSECTION = 32
+
+# Au-delà de 1/RATIO_PARCOURS des lignes, les lignes trouvées sont relevées
+# par un parcours des codes plutôt que dans les listes de lignes par valeur
+RATIO_PARCOURS = 16
+
+# Jusqu'à ce nombre de valeurs retenues, un masque de filtre est calculé
+# par comparaisons des codes plutôt que par table de correspondance
+NB_COMPARAISONS = 4
+
+# Lignes modifiées ou valeurs ajoutées (en proportion du total) avant la
+# reconstruction des listes de lignes par valeur ou des trigrammes
+RATIO_RECONSTRUCTION = 0.01
+
+# Au-delà de ce nombre de candidats, la vérification exacte est vectorisée
+SEUIL_VERIFICATION = 512
+
+# Valeurs converties à la fois en matrice de caractères (construction des trigrammes)
+TAILLE_BLOC = 100_000
+
+# Un trigramme est codé par un entier : 21 bits par caractère (points de code Unicode)
+BITS_CARACTERE = 21
+MASQUE_CARACTERE = (1 << BITS_CARACTERE) - 1
+
+class _Pliage(dict):
+    """
+    Table de str.translate remplie à la demande : chaque caractère est
+    décomposé (NFKD) et privé de ses caractères combinants (accents)
+    """
+
+    def __missing__(self, code):
+        decompose = unicodedata.normalize('NFKD', chr(code))
+        pli = self[code] = ''.join(c for c in decompose if not unicodedata.combining(c))
+        return pli
+
+_pliage = _Pliage()
+
+def normaliser(texte, plier_accents=True):
+    """
+    Met un texte en minuscules et retire les accents (é -> e)
+    Seule règle de normalisation de l'index : valeurs indexées et requêtes
+    """
+    texte = texte.lower()
+    if plier_accents and not texte.isascii():
+        texte = texte.translate(_pliage)
+    return texte
+
+def _ngrammes(texte):
+    return {texte[i:i + TAILLE_NGRAMME] for i in range(len(texte) - TAILLE_NGRAMME + 1)}
+
+def _cle(trigramme):
+    premier, second, troisieme = map(ord, trigramme)
+    return (premier << 2 * BITS_CARACTERE) | (second << BITS_CARACTERE) | troisieme
+
+def _indexer_trigrammes(textes):
+    """
+    Numéros des textes contenant chaque trigramme, au format compact :
+    (clés triées des trigrammes, début de la liste de chaque clé, numéros)
+
+    Les textes sont convertis par blocs en matrices de points de code,
+    d'où les clés de tous les trigrammes sont tirées par décalage
+    """
+    cles, numeros = [], []
+    for debut in range(0, len(textes), TAILLE_BLOC):
+        bloc = np.array(textes[debut:debut + TAILLE_BLOC], dtype=str)
+        largeur = bloc.dtype.itemsize // 4
+        if largeur < TAILLE_NGRAMME:
+            continue
+
+        points = bloc.view(np.uint32).reshape(len(bloc), largeur).astype(np.uint64)
+        cles_bloc = (
+            (points[:, :-2] << np.uint64(2 * BITS_CARACTERE))
+            | (points[:, 1:-1] << np.uint64(BITS_CARACTERE))
+            | points[:, 2:]
+        )
+        # Les textes plus courts que la matrice sont complétés par des zéros
+        complets = points[:, 2:] != 0
+        lignes = np.broadcast_to(
+            np.arange(debut, debut + len(bloc), dtype=np.uint64)[:, None], cles_bloc.shape
+        )
+        cles.append(cles_bloc[complets])
+        numeros.append(lignes[complets])
+
+    if not cles:
+        return np.empty(0, dtype=np.uint64), np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32)
+
+    # Rang de chaque trigramme, puis un seul tri des clés composées (rang, numéro)
+    rangs, uniques = pd.factorize(np.concatenate(cles))
+    ordre = np.argsort(uniques)
+    rangs_tries = np.empty(len(uniques), dtype=np.uint64)
+    rangs_tries[ordre] = np.arange(len(uniques), dtype=np.uint64)
+    composees = (rangs_tries[rangs] << np.uint64(32)) | np.concatenate(numeros)
+    composees.sort()
+
+    # Un trigramme répété dans un même texte n'y est compté qu'une fois
+    composees = composees[np.r_[True, composees[1:] != composees[:-1]]]
+    debuts = np.searchsorted(composees >> np.uint64(32), np.arange(len(uniques) + 1, dtype=np.uint64))
+    numeros = (composees & np.uint64(0xFFFFFFFF)).astype(np.int32)
+    return uniques[ordre].astype(np.uint64), debuts, numeros
+
+def _rassembler(ordre, debuts, fins):
+    """
+    Concatène les tranches ordre[debuts[i]:fins[i]] sans boucle Python
+    """
+    effectifs = fins - debuts
+    decalages = np.repeat(debuts - np.cumsum(effectifs) + effectifs, effectifs)
+    return ordre[decalages + np.arange(effectifs.sum())]
+
+class _ColonneTexte:
+    """
+    Colonne texte de l'index : valeurs distinctes normalisées une seule fois,
+    trigrammes des valeurs distinctes, code de valeur de chaque ligne et
+    lignes de chaque valeur (tri des lignes par code)
+
+    Les lignes modifiées ou ajoutées depuis le dernier tri sont gardées à
+    part (delta) et vérifiées à chaque recherche ; les valeurs nouvelles
+    sont indexées à part jusqu'à la reconstruction suivante
+
+    Une colonne n'est plus modifiée une fois construite : mis_a_jour en
+    renvoie une copie, qui partage les tableaux inchangés
+    """
+
+    def __init__(self, serie):
+        codes, valeurs = pd.factorize(serie.fillna('').astype(str), use_na_sentinel=False)
+        self.codes = codes.astype(np.int32)
+        self._indexer(pd.Series(valeurs, dtype='string'))
+        self._trier()
+
+    def _indexer(self, valeurs):
+        """
+        Index des valeurs distinctes (à la construction, puis à chaque reconstruction)
+        """
+        self.numeros = dict(zip(valeurs.tolist(), range(len(valeurs))))
+        self._indexees = len(valeurs)
+        plies = [valeur.lower() for valeur in valeurs.tolist()]
+        self._minuscules = pd.Series(plies, dtype='string')
+
+        # Seules les valeurs non ASCII passent par le retrait des accents
+        for i in np.flatnonzero(~self._minuscules.str.isascii().to_numpy(dtype=bool)):
+            plies[i] = normaliser(plies[i])
+        self._plies = pd.Series(plies, dtype='string')
+        self._cles, self._debuts, self._listes = _indexer_trigrammes(plies)
+        self._courtes = np.flatnonzero(self._plies.str.len().to_numpy() < TAILLE_NGRAMME)
+
+        # Valeurs nouvelles depuis la construction : numéros, textes et trigrammes
+        self._numeros_ajoutes = {}
+        self._minuscules_ajoutees, self._plies_ajoutees = [], []
+        self._trigrammes_ajoutes = {}
+
+    def _trier(self):
+        self.ordre = np.argsort(self.codes, kind='stable').astype(np.int32)
+        self.bornes = np.searchsorted(self.codes[self.ordre], np.arange(self.nombre_valeurs + 1))
+        self.delta = np.empty(0, dtype=np.int64)
+
+    @property
+    def nombre_valeurs(self):
+        return self._indexees + len(self._numeros_ajoutes)
+
+    # ---------- Mise à jour (copie) ----------
+
+    def _numeros(self, valeurs):
+        """
+        Numéros des valeurs ; les valeurs nouvelles sont ajoutées avec leurs trigrammes
+        """
+        numeros = np.empty(len(valeurs), dtype=np.int32)
+        for i, valeur in enumerate(valeurs):
+            numero = self.numeros.get(valeur)
+            if numero is None:
+                numero = self._numeros_ajoutes.get(valeur)
+            if numero is None:
+                numero = self._numeros_ajoutes[valeur] = self.nombre_valeurs
+                self._minuscules_ajoutees.append(valeur.lower())
+                self._plies_ajoutees.append(normaliser(valeur))
+                for trigramme in _ngrammes(self._plies_ajoutees[-1]):
+                    self._trigrammes_ajoutes.setdefault(_cle(trigramme), []).append(numero)
+            numeros[i] = numero
+        return numeros
+
+    def mis_a_jour(self, positions, valeurs, taille):
+        """
+        Copie de la colonne avec les nouvelles valeurs des lignes `positions`
+        taille : nouveau nombre de lignes (ajout en fin)
+        """
+        colonne = copy.copy(self)
+        colonne._numeros_ajoutes = dict(self._numeros_ajoutes)
+        colonne._minuscules_ajoutees = list(self._minuscules_ajoutees)
+        colonne._plies_ajoutees = list(self._plies_ajoutees)
+        colonne._trigrammes_ajoutes = {cle: list(n) for cle, n in self._trigrammes_ajoutes.items()}
+        colonne._mettre_a_jour(positions, valeurs, taille)
+        return colonne
+
+    def _mettre_a_jour(self, positions, valeurs, taille):
+        codes = self._numeros(valeurs.fillna('').astype(str).tolist())
+        self.codes = np.concatenate([self.codes, np.zeros(max(taille - len(self.codes), 0), dtype=np.int32)])
+        self.codes[positions] = codes
+
+        if len(self._numeros_ajoutes) > RATIO_RECONSTRUCTION * self._indexees:
+            # Valeurs nouvelles indexées avec les autres (les numéros sont conservés)
+            self._indexer(pd.Series(list(self.numeros) + list(self._numeros_ajoutes), dtype='string'))
+            self._trier()
+            return
+
+        self.delta = np.union1d(self.delta, positions)
+        if len(self.delta) > RATIO_RECONSTRUCTION * len(self.codes):
+            self._trier()
+
+    # ---------- Recherche ----------
+
+    def _liste(self, cle):
+        """
+        Numéros (triés) des valeurs qui contiennent le trigramme de clé `cle`
+        """
+        i = np.searchsorted(self._cles, np.uint64(cle))
+        liste = np.empty(0, dtype=np.int32)
+        if i < len(self._cles) and self._cles[i] == cle:
+            liste = self._listes[self._debuts[i]:self._debuts[i + 1]]
+
+        ajoutes = self._trigrammes_ajoutes.get(cle)
+        if ajoutes is not None:
+            # Les valeurs ajoutées ont les plus grands numéros : la liste reste triée
+            liste = np.concatenate([liste, np.array(ajoutes, dtype=np.int32)])
+        return liste
+
+    def _candidats(self, requete_pliee):
+        """
+        Numéros des valeurs contenant tous les trigrammes de la requête
+        """
+        listes = sorted((self._liste(_cle(t)) for t in _ngrammes(requete_pliee)), key=len)
+
+        # On part de la liste la plus courte ; les listes beaucoup plus longues
+        # que les candidats restants sont laissées à la vérification finale
+        candidats = listes[0]
+        for liste in listes[1:]:
+            if len(candidats) == 0 or len(liste) > RATIO_INTERSECTION * len(candidats):
+                break
+            candidats = candidats[self._trouves(liste).take(candidats)]
+        return candidats
+
+    def _candidats_courts(self, requete_pliee):
+        """
+        Requête plus courte qu'un trigramme : une valeur qui la contient est
+        courte, ou contient un trigramme qui la contient
+        """
+        caracteres = [
+            (self._cles >> np.uint64(decalage)) & np.uint64(MASQUE_CARACTERE)
+            for decalage in (2 * BITS_CARACTERE, BITS_CARACTERE, 0)
+        ]
+        points = [np.uint64(ord(c)) for c in requete_pliee]
+        retenues = np.zeros(len(self._cles), dtype=bool)
+        for debut in range(TAILLE_NGRAMME - len(points) + 1):
+            egales = np.ones(len(self._cles), dtype=bool)
+            for rang, point in enumerate(points):
+                egales &= caracteres[debut + rang] == point
+            retenues |= egales
+
+        rangs = np.flatnonzero(retenues)
+        trouves = np.zeros(self.nombre_valeurs, dtype=bool)
+        trouves[_rassembler(self._listes, self._debuts[rangs], self._debuts[rangs + 1])] = True
+        trouves[self._courtes] = True
+        trouves[self._indexees:] = True
+        return np.flatnonzero(trouves)
+
+    def valeurs(self, requete_pliee, cible, plier_accents):
+        """
+        Numéros des valeurs distinctes qui contiennent la requête
+        """
+        if len(requete_pliee) >= TAILLE_NGRAMME:
+            candidats = self._candidats(requete_pliee)
+        else:
+            candidats = self._candidats_courts(requete_pliee)
+
+        # Vérification exacte (les trigrammes peuvent être non contigus)
+        textes, ajoutes = (self._plies, self._plies_ajoutees) if plier_accents \
+            else (self._minuscules, self._minuscules_ajoutees)
+        nombre = self._indexees
+        anciens, nouveaux = candidats[candidats < nombre], candidats[candidats >= nombre]
+
+        if len(anciens) > SEUIL_VERIFICATION:
+            verifies = textes.take(anciens).str.contains(cible, regex=False).to_numpy(dtype=bool)
+        else:
+            verifies = np.array([cible in texte for texte in textes.take(anciens).tolist()], dtype=bool)
+        nouveaux = [numero for numero in nouveaux.tolist() if cible in ajoutes[numero - nombre]]
+        return np.concatenate([anciens[verifies], np.array(nouveaux, dtype=anciens.dtype)])
+
+    def _trouves(self, numeros):
+        trouves = np.zeros(self.nombre_valeurs, dtype=bool)
+        trouves[numeros] = True
+        return trouves
+
+    def _tries(self, numeros):
+        # Valeurs ajoutées depuis le dernier tri : leurs lignes sont toutes dans le delta
+        return numeros[numeros < len(self.bornes) - 1]
+
+    def nombre_lignes(self, numeros):
+        """
+        Nombre de lignes des valeurs `numeros` lors du dernier tri (ordre de grandeur du résultat)
+        """
+        tries = self._tries(numeros)
+        return int((self.bornes[tries + 1] - self.bornes[tries]).sum())
+
+    def masque(self, numeros):
+        """
+        Masque booléen des lignes dont la valeur est l'un des numéros (parcours des codes)
+        """
+        return self._trouves(numeros).take(self.codes)
+
+    def lignes(self, numeros):
+        """
+        Positions (triées) des lignes dont la valeur est l'un des numéros,
+        relevées d'un bloc par valeur dans le tri par code
+        """
+        tries = self._tries(numeros)
+        lignes = _rassembler(self.ordre, self.bornes[tries], self.bornes[tries + 1])
+
+        # Lignes modifiées ou ajoutées depuis le tri : vérifiées sur leur code actuel
+        if len(self.delta):
+            lignes = lignes[~np.isin(lignes, self.delta)]
+            lignes = np.concatenate([lignes, self.delta[self._trouves(numeros).take(self.codes[self.delta])]])
+        return np.sort(lignes)
+
+class _ColonneFiltre:
+    """
+    Colonne de filtre de l'index : code de la valeur de chaque ligne
+    """
+
+    def __init__(self, serie):
+        codes, valeurs = pd.factorize(serie)
+        self.numeros = {valeur: numero for numero, valeur in enumerate(valeurs)}
+        self.codes = codes.astype(np.int32)
+
+    def mis_a_jour(self, positions, valeurs, taille):
+        """
+        Copie de la colonne avec les nouvelles valeurs des lignes `positions`
+        """
+        colonne = copy.copy(self)
+        colonne.numeros = dict(self.numeros)
+        codes = np.array(
+            [-1 if pd.isna(v) else colonne.numeros.setdefault(v, len(colonne.numeros)) for v in valeurs],
+            dtype=np.int32
+        )
+        colonne.codes = np.concatenate([self.codes, np.full(max(taille - len(self.codes), 0), -1, dtype=np.int32)])
+        colonne.codes[positions] = codes
+        return colonne
+
+    def autorises(self, valeurs):
+        """
+        Table code -> valeur retenue (la dernière case correspond aux valeurs manquantes)
+        """
+        table = np.zeros(len(self.numeros) + 1, dtype=bool)
+        table[[self.numeros[v] for v in valeurs if v in self.numeros]] = True
+        return table
+
+    def masque(self, valeurs):
+        """
+        Masque booléen des lignes dont la valeur est l'une des valeurs
+        """
+        numeros = [self.numeros[v] for v in valeurs if v in self.numeros]
+        if len(numeros) > NB_COMPARAISONS:
+            return self.autorises(valeurs).take(self.codes)
+
+        masque = np.zeros(len(self.codes), dtype=bool)
+        for numero in numeros:
+            masque |= self.codes == numero
+        return masque
+
+    def filtrer(self, positions, valeurs):
+        """
+        Positions dont la valeur est l'une des valeurs
+        """
+        return positions[self.autorises(valeurs).take(self.codes.take(positions))]
+
+class IndexRecherche:
+    """
+    Index de recherche des clients : trigrammes sur nom/email (minuscules,
+    sans accents) et codes des colonnes de filtre (statut, plan)
+
+    Chaque colonne texte est indexée par valeurs distinctes. Un index n'est
+    jamais modifié une fois construit : il peut être interrogé par plusieurs
+    sessions à la fois, et mis_a_jour en renvoie une copie pour les lignes
+    modifiées ou ajoutées
+    """
+
+    def __init__(self, df, colonnes_texte=('nom', 'email'), colonnes_filtre=('statut', 'plan'),
+                 plier_accents=False):
+        self.taille = len(df)
+        self.plier_accents = plier_accents
+
+        # Un client est trouvé si l'un des champs contient la requête
+        # (une recherche ne peut pas chevaucher deux champs)
+        self._textes = {colonne: _ColonneTexte(df[colonne]) for colonne in colonnes_texte}
+        self._filtres = {colonne: _ColonneFiltre(df[colonne]) for colonne in colonnes_filtre}
+
+    def mis_a_jour(self, df, positions=()):
+        """
+        Index de df, obtenu en réindexant les lignes `positions`, modifiées,
+        et les lignes ajoutées à la fin de df depuis cet index (inchangé)
+        """
+        positions = np.union1d(np.asarray(positions, dtype=np.int64), np.arange(self.taille, len(df)))
+        if len(positions) == 0:
+            return self
+        lignes = df.iloc[positions]
+
+        index = copy.copy(self)
+        index._textes = {
+            colonne: texte.mis_a_jour(positions, lignes[colonne], len(df))
+            for colonne, texte in self._textes.items()
+        }
+        index._filtres = {
+            colonne: filtre.mis_a_jour(positions, lignes[colonne], len(df))
+            for colonne, filtre in self._filtres.items()
+        }
+        index.taille = len(df)
+        return index
+
+    def _trouver(self, requete):
+        """
+        Clients dont le nom ou l'email contient la requête : (masque, None) si
+        le résultat est étendu, (None, positions triées) sinon
+        """
+        cible = normaliser(requete, plier_accents=self.plier_accents)
+        requete_pliee = normaliser(cible)
+
+        masques, listes = [], []
+        for index in self._textes.values():
+            numeros = index.valeurs(requete_pliee, cible, self.plier_accents)
+            if index.nombre_lignes(numeros) > self.taille // RATIO_PARCOURS:
+                masques.append(index.masque(numeros))
+            else:
+                listes.append(index.lignes(numeros))
+
+        if masques:
+            union = masques[0]
+            for autre in masques[1:]:
+                union |= autre
+            for lignes in listes:
+                union[lignes] = True
+            return union, None
+
+        # Union des positions (tri puis suppression des doublons)
+        positions = np.sort(np.concatenate(listes))
+        if len(positions):
+            positions = positions[np.r_[True, positions[1:] != positions[:-1]]]
+        return None, positions
+
+    def rechercher_texte(self, requete, masque=None):
+        """
+        Positions des clients dont le nom ou l'email contient la requête
+        (insensible à la casse, et aux accents si plier_accents=True),
+        restreintes au masque de filtres s'il est fourni
+        """
+        union, positions = self._trouver(requete)
+        if union is not None:
+            return np.flatnonzero(union if masque is None else union & masque)
+        return positions if masque is None else positions[masque.take(positions)]
+
+    def masque(self, colonne, valeurs):
+        """
+        Masque booléen des clients dont la colonne prend l'une des valeurs
+        """
+        return self._filtres[colonne].masque(valeurs)
+
+    def rechercher(self, requete='', statuts=None, plans=None):
+        """
+        Positions (triées) des clients correspondant à la recherche et aux filtres
+        """
+        filtres = [
+            (self._filtres[colonne], valeurs)
+            for colonne, valeurs in (('statut', statuts), ('plan', plans)) if valeurs is not None
+        ]
+
+        if not requete:
+            if not filtres:
+                return np.arange(self.taille)
+            masque = filtres[0][0].masque(filtres[0][1])
+            for index, valeurs in filtres[1:]:
+                masque &= index.masque(valeurs)
+            return np.flatnonzero(masque)
+
+        # Filtres sur toutes les lignes pour un résultat étendu, sur les seules positions trouvées sinon
+        union, positions = self._trouver(requete)
+        if union is not None:
+            for index, valeurs in filtres:
+                union &= index.masque(valeurs)
+            return np.flatnonzero(union)
+        for index, valeurs in filtres:
+            positions = index.filtrer(positions, valeurs)
+        return positions
+
+# Test
+if __name__ == "__main__":
+    import time
+    from calculs import charger_donnees
+
+    df = charger_donnees()
+    if df is not None:
+        index = IndexRecherche(df)
+
+        for requete in ['mar', 'example.org', 'Du', 'ç']:
+            debut = time.perf_counter()
+            positions = index.rechercher(requete)
+            duree = (time.perf_counter() - debut) * 1000
+            print(f" '{requete}' : {len(positions)} clients en {duree:.3f} ms")
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import pandas as pd
+
+FICHIER_CSV = 'clients_data.csv'
+FICHIER_PARQUET = 'clients_data.parquet'
+
+# Métadonnées du Parquet : CSV d'origine (date de modification et taille, empreinte du contenu)
+CLE_SIGNATURE = 'signature_csv'
+CLE_EMPREINTE = 'empreinte_csv'
+
+# Taille des blocs lus pour calculer l'empreinte d'un fichier
+TAILLE_BLOC = 1 << 20
+
+# Nombre de lignes par lot en lecture par lots (mode flux)
+TAILLE_LOT = 500_000
+
+# Schéma typé de la table clients
+COLONNES_CATEGORIELLES = ['plan', 'statut', 'ville']
+COLONNES_DATES = ['date_debut', 'date_fin']
+
+SCHEMA = {
+    'id': 'string',
+    'nom': 'string',
+    'email': 'string',
+    'telephone': 'string',
+    'plan': 'category',
+    'prix_mensuel': 'int32',
+    'date_debut': 'datetime64[ns]',
+    'date_fin': 'datetime64[ns]',
+    'statut': 'category',
+    'ville': 'category',
+    'score_risque': 'float32'
+}
+
+def appliquer_schema(df):
+    """
+    Convertit un DataFrame brut (lu depuis le CSV) vers le schéma typé
+    """
+    df = df.copy()
+
+    for colonne, dtype in SCHEMA.items():
+        if colonne not in df.columns:
+            continue
+        if colonne in COLONNES_DATES:
+            df[colonne] = pd.to_datetime(df[colonne])
+        else:
+            df[colonne] = df[colonne].astype(dtype)
+
+    return df
+
+def convertir_csv_en_parquet(chemin_csv=FICHIER_CSV, chemin_parquet=FICHIER_PARQUET):
+    """
+    Convertit une seule fois le fichier CSV en fichier Parquet typé
+    La signature et l'empreinte du CSV converti sont gardées dans les
+    métadonnées du Parquet (voir parquet_a_jour)
+    """
+    # Nécessite pyarrow
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Relevées avant la lecture : un CSV modifié pendant la conversion ne paraîtra pas converti
+    sources = {
+        CLE_SIGNATURE: signature_fichier(chemin_csv),
+        CLE_EMPREINTE: empreinte_fichier(chemin_csv)
+    }
+    df = pd.read_csv(chemin_csv)
+    df = appliquer_schema(df)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **table.schema.metadata,
+        **{cle.encode('utf-8'): valeur.encode('utf-8') for cle, valeur in sources.items()}
+    })
+
+    # Écriture dans un fichier temporaire puis remplacement : une conversion
+    # interrompue ne laisse pas de Parquet tronqué
+    temporaire = f"{chemin_parquet}.tmp"
+    pq.write_table(table, temporaire)
+    os.replace(temporaire, chemin_parquet)
+
+    print(f" {len(df)} clients convertis de '{chemin_csv}' vers '{chemin_parquet}'")
+    return df
+
+def lire_parquet(chemin_parquet=FICHIER_PARQUET, colonnes=None):
+    """
+    Lit le fichier Parquet en ne chargeant que les colonnes demandées
+    """
+    return pd.read_parquet(chemin_parquet, columns=colonnes)
+
+def _types_csv(colonnes=None):
+    """
+    Types des colonnes non-dates et colonnes de dates à analyser à la lecture du CSV
+    """
+    dtypes = {
+        colonne: dtype for colonne, dtype in SCHEMA.items()
+        if colonne not in COLONNES_DATES and (colonnes is None or colonne in colonnes)
+    }
+    dates = [c for c in COLONNES_DATES if colonnes is None or c in colonnes]
+    return dtypes, dates
+
+def lire_csv(chemin_csv=FICHIER_CSV, colonnes=None):
+    """
+    Lit le fichier CSV avec le schéma typé
+    """
+    dtypes, dates = _types_csv(colonnes)
+    return pd.read_csv(chemin_csv, usecols=colonnes, dtype=dtypes, parse_dates=dates)
+
+def lire_csv_par_lots(chemin_csv=FICHIER_CSV, colonnes=None, taille_lot=TAILLE_LOT):
+    """
+    Lit le fichier CSV par lots typés de taille_lot lignes, sans le charger en entier
+    """
+    dtypes, dates = _types_csv(colonnes)
+    with pd.read_csv(chemin_csv, usecols=colonnes, dtype=dtypes, parse_dates=dates,
+                     chunksize=taille_lot) as lots:
+        yield from lots
+
+def lire_parquet_par_lots(chemin_parquet=FICHIER_PARQUET, colonnes=None, taille_lot=TAILLE_LOT):
+    """
+    Lit le fichier Parquet par lots (batches Arrow), convertis au schéma typé
+    """
+    # Nécessite pyarrow
+    import pyarrow.parquet as pq
+
+    fichier = pq.ParquetFile(chemin_parquet)
+    for lot in fichier.iter_batches(batch_size=taille_lot, columns=colonnes):
+        yield appliquer_schema(lot.to_pandas())
+
+def sources_parquet(chemin_parquet=FICHIER_PARQUET):
+    """
+    Signature et empreinte du CSV d'où provient le fichier Parquet
+    (None si elles n'ont pas été enregistrées)
+    """
+    # Nécessite pyarrow ; seul le pied de page du fichier est lu
+    import pyarrow.parquet as pq
+
+    metadonnees = {
+        cle.decode('utf-8'): valeur.decode('utf-8')
+        for cle, valeur in (pq.read_metadata(chemin_parquet).metadata or {}).items()
+    }
+    return {cle: metadonnees.get(cle) for cle in (CLE_SIGNATURE, CLE_EMPREINTE)}
+
+def parquet_a_jour(chemin_csv=FICHIER_CSV, chemin_parquet=FICHIER_PARQUET, empreinte=None):
+    """
+    Vérifie que le fichier Parquet existe et a été converti depuis le CSV actuel
+    (même date de modification et même taille, ou même empreinte si elle est donnée)
+    La date du Parquet n'est pas comparée à celle du CSV : un CSV remplacé
+    ou restauré avec une date plus ancienne est bien détecté
+    """
+    if not os.path.exists(chemin_parquet):
+        return False
+    if not os.path.exists(chemin_csv):
+        return True
+    try:
+        sources = sources_parquet(chemin_parquet)
+    except (OSError, ValueError):
+        # Fichier illisible : il sera reconverti
+        return False
+    if empreinte is not None:
+        return sources[CLE_EMPREINTE] == empreinte
+    return sources[CLE_SIGNATURE] == signature_fichier(chemin_csv)
+
+def signature_fichier(chemin=FICHIER_CSV):
+    """
+    Version d'un fichier de données (date de modification et taille),
+    utilisée comme clé des caches dérivés
+    """
+    try:
+        infos = os.stat(chemin)
+    except FileNotFoundError:
+        return None
+    return f"{infos.st_mtime_ns}-{infos.st_size}"
+
+def empreinte_fichier(chemin=FICHIER_CSV):
+    """
+    Empreinte du contenu d'un fichier (blake2b, lu par blocs)
+    """
+    hacheur = hashlib.blake2b(digest_size=16)
+    with open(chemin, 'rb') as fichier:
+        for bloc in iter(lambda: fichier.read(TAILLE_BLOC), b''):
+            hacheur.update(bloc)
+    return hacheur.hexdigest()
+
+def pyarrow_disponible():
+    """
+    Indique si pyarrow est installé (nécessaire pour le format Parquet)
+    """
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+# Conversion manuelle
+if __name__ == "__main__":
+    df = convertir_csv_en_parquet()
+    print(df.dtypes)
@@ -0,0 +1,130 @@
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from base_sql import BaseClients
+from calculs import (
+    analyser_cohortes, analyser_par_plan, calculer_metriques, calculer_tableau_de_bord, charger_donnees,
+    identifier_clients_risque
+)
+from evenements import JournalEvenements
+from stockage import FICHIER_CSV
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEUILS = (0.0, 0.5, 0.7, 0.9)
+
+@pytest.fixture
+def dossier(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(RACINE, FICHIER_CSV), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def _ecrire_evenements():
+    """
+    Un événement de chaque type, dont une nouvelle souscription et une réactivation
+    """
+    journal = JournalEvenements()
+    journal.souscrire('CLI9001', 'Pro', 199, date='2026-10-01', nom='Jean Neuf',
+                      email='jn@example.org', telephone='01', ville='Rabat', score_risque=0.91)
+    journal.annuler('CLI0001', date='2026-10-02')
+    journal.changer_plan('CLI0002', 'Enterprise', 499)
+    journal.expirer('CLI0003')
+    journal.souscrire('CLI0004', 'Basic', 99)
+
+@pytest.fixture(params=['instantane', 'evenements'])
+def donnees(request, dossier):
+    """
+    (DataFrame pandas, base SQLite) sur le fichier clients seul, puis avec le journal
+    """
+    base = BaseClients().actualiser()
+    if request.param == 'evenements':
+        # Base déjà construite : seuls les nouveaux événements lui sont appliqués
+        _ecrire_evenements()
+        base.actualiser()
+    return charger_donnees(format='csv'), base
+
+def test_calculer_metriques(donnees):
+    df, base = donnees
+    attendu, obtenu = calculer_metriques(df), base.calculer_metriques()
+
+    assert attendu.keys() == obtenu.keys()
+    for cle, valeur in attendu.items():
+        assert np.isclose(valeur, obtenu[cle], equal_nan=True), cle
+
+def test_analyser_par_plan(donnees):
+    df, base = donnees
+    attendu, obtenu = analyser_par_plan(df), base.analyser_par_plan()
+
+    # Les plans sans client (catégories vides) n'apparaissent pas en SQL
+    attendu = attendu[attendu['nombre_clients'] > 0]
+    assert list(attendu.index.astype(str)) == list(obtenu.index)
+    assert list(attendu.columns) == list(obtenu.columns)
+    assert np.array_equal(attendu.to_numpy(), obtenu.to_numpy())
+
+def test_analyser_cohortes(donnees):
+    df, base = donnees
+    attendu, obtenu = analyser_cohortes(df), base.analyser_cohortes()
+
+    assert attendu.index.equals(obtenu.index)
+    assert list(attendu.columns) == list(obtenu.columns)
+    assert np.allclose(attendu.to_numpy(dtype=float), obtenu.to_numpy(dtype=float))
+
+@pytest.mark.parametrize('seuil', SEUILS)
+def test_identifier_clients_risque(donnees, seuil):
+    df, base = donnees
+    attendu, obtenu = identifier_clients_risque(df, seuil), base.identifier_clients_risque(seuil)
+
+    # Ordre des scores égaux non garanti côté pandas : comparaison triée par identifiant
+    attendu, obtenu = (r.sort_values('id').reset_index(drop=True) for r in (attendu, obtenu))
+    assert list(attendu['id']) == list(obtenu['id'])
+    assert np.allclose(attendu['score_risque'].to_numpy(), obtenu['score_risque'].to_numpy())
+
+def test_calculer_tableau_de_bord(donnees):
+    df, base = donnees
+    attendu, obtenu = calculer_tableau_de_bord(df), calculer_tableau_de_bord(base)
+
+    assert attendu['metriques'] == attendu.metriques
+    for cle, valeur in attendu.metriques.items():
+        assert np.isclose(valeur, obtenu.metriques[cle], equal_nan=True), cle
+    assert np.array_equal(attendu.par_plan.to_numpy(), obtenu.par_plan.to_numpy())
+    assert np.allclose(attendu.cohortes.to_numpy(dtype=float), obtenu.cohortes.to_numpy(dtype=float))
+    assert sorted(attendu.clients_risque['id']) == sorted(obtenu.clients_risque['id'])
+
+def test_evenements_appliques(dossier):
+    base = BaseClients().actualiser()
+    _ecrire_evenements()
+    base.actualiser()
+
+    clients = base.requete("SELECT id, statut, plan FROM clients").set_index('id')
+    assert clients.loc['CLI9001'].tolist() == ['actif', 'Pro']
+    assert clients.loc['CLI0001', 'statut'] == 'annulé'
+    assert clients.loc['CLI0002', 'plan'] == 'Enterprise'
+    assert clients.loc['CLI0003', 'statut'] == 'expiré'
+    assert clients.loc['CLI0004', 'statut'] == 'actif'
+
+def test_actualisations_simultanees(dossier):
+    erreurs = []
+
+    def actualiser():
+        try:
+            BaseClients().actualiser()
+        except Exception as erreur:
+            erreurs.append(erreur)
+
+    _ecrire_evenements()
+    fils = [threading.Thread(target=actualiser) for _ in range(4)]
+    for fil in fils:
+        fil.start()
+    for fil in fils:
+        fil.join()
+
+    assert erreurs == []
+    # Chaque événement n'est appliqué qu'une fois
+    assert BaseClients().requete("SELECT COUNT(*) AS n FROM clients").loc[0, 'n'] == \
+        len(pd.read_csv(FICHIER_CSV)) + 1
+    assert [f for f in os.listdir(dossier) if f.endswith('.tmp')] == []
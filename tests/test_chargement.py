@@ -0,0 +1,88 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import chargement
+from chargement import ChargeurDonnees
+from calculs import calculer_metriques
+from evenements import JournalEvenements
+from stockage import FICHIER_CSV, convertir_csv_en_parquet
+
+pytest.importorskip('pyarrow')
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def dossier(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(RACINE, FICHIER_CSV), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def test_parquet_perime_ignore(dossier):
+    convertir_csv_en_parquet()
+
+    # Même taille et même date de modification : seule l'empreinte du contenu diffère
+    infos = os.stat(FICHIER_CSV)
+    with open(FICHIER_CSV, 'rb') as fichier:
+        contenu = fichier.read()
+    with open(FICHIER_CSV, 'wb') as fichier:
+        fichier.write(contenu.replace(b'CLI0001,', b'CLI9991,', 1))
+    os.utime(FICHIER_CSV, ns=(infos.st_atime_ns, infos.st_mtime_ns))
+
+    modele = ChargeurDonnees().actualiser().modele
+
+    assert modele['id'].iloc[0] == 'CLI9991'
+
+def test_parquet_a_jour_utilise(dossier, monkeypatch):
+    convertir_csv_en_parquet()
+    monkeypatch.setattr(chargement, 'lire_csv', lambda *args, **kwargs: pytest.fail("CSV relu"))
+
+    modele = ChargeurDonnees().actualiser().modele
+
+    assert modele['id'].iloc[0] == 'CLI0001'
+
+def _attendu(modele, requete, statuts):
+    """
+    Positions attendues d'une recherche, par parcours complet du modèle
+    """
+    masque = modele['statut'].isin(statuts).to_numpy()
+    trouves = modele['nom'].str.lower().str.contains(requete, regex=False).to_numpy(dtype=bool)
+    trouves |= modele['email'].str.lower().str.contains(requete, regex=False).to_numpy(dtype=bool)
+    return np.flatnonzero(trouves & masque)
+
+def test_instantane_garde_son_index(dossier):
+    chargeur = ChargeurDonnees()
+    ancien = chargeur.actualiser()
+    index_ancien = ancien.index_recherche()
+    attendu = _attendu(ancien.modele, 'a', ['actif'])
+
+    journal = JournalEvenements()
+    journal.souscrire('CLI9001', 'Pro', 199, date='2026-10-01', nom='Zoé Nouvelle',
+                      email='zn@example.org', telephone='01', ville='Rabat', score_risque=0.5)
+    journal.annuler(ancien.modele['id'].iloc[np.flatnonzero(ancien.modele['statut'] == 'actif')[0]])
+    nouveau = chargeur.actualiser()
+
+    # L'index du nouvel instantané est dérivé de l'ancien, qui reste celui de son modèle
+    assert nouveau.index_recherche() is not index_ancien
+    assert np.array_equal(index_ancien.rechercher('a', statuts=['actif']), attendu)
+    assert np.array_equal(nouveau.index_recherche().rechercher('a', statuts=['actif']),
+                          _attendu(nouveau.modele, 'a', ['actif']))
+    assert list(nouveau.index_recherche().rechercher('zn@example')) == [len(ancien.modele)]
+    assert len(index_ancien.rechercher('zn@example')) == 0
+
+    # Sans changement, le même instantané est renvoyé
+    assert chargeur.actualiser() is nouveau
+
+def test_instantane_garde_ses_metriques(dossier):
+    chargeur = ChargeurDonnees()
+    ancien = chargeur.actualiser()
+    metriques = dict(ancien.metriques)
+
+    JournalEvenements().annuler(ancien.modele['id'].iloc[np.flatnonzero(ancien.modele['statut'] == 'actif')[0]])
+    nouveau = chargeur.actualiser()
+
+    assert ancien.metriques == metriques == calculer_metriques(ancien.modele)
+    assert nouveau.metriques == calculer_metriques(nouveau.modele)
+    assert nouveau.metriques['clients_annules'] == metriques['clients_annules'] + 1
@@ -0,0 +1,24 @@
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from classeur import ClasseurFlux
+
+def test_valeurs_non_finies_en_cellules_vides():
+    df = pd.DataFrame({
+        'score': [0.5, np.inf, -np.inf, np.nan],
+        'montant': pd.array([1, None, 3, 4], dtype='Int64')
+    })
+    sortie = io.BytesIO()
+    with ClasseurFlux(sortie) as classeur:
+        classeur.ajouter('Données', df)
+
+    with zipfile.ZipFile(sortie) as archive:
+        feuille = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+
+    # Excel refuse les valeurs 'inf' ou 'nan' : cellules vides à la place
+    assert 'inf' not in feuille and 'nan' not in feuille
+    assert feuille.count('<c/>') == 4
+    assert '<c><v>0.5</v></c>' in feuille
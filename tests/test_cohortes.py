@@ -0,0 +1,30 @@
+import os
+import shutil
+
+import numpy as np
+
+import cohortes
+from calculs import charger_donnees
+from cohortes import matrice_retention
+from stockage import FICHIER_CSV
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_changement_de_mois_sur_une_copie(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(RACINE, FICHIER_CSV), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cohortes, '_cache', cohortes.OrderedDict())
+    df = charger_donnees(format='csv')
+    matrice = matrice_retention(df, version='v1')
+    attendu = matrice.retention()
+
+    # Matrice en cache d'un mois plus ancien : une copie avancée la remplace
+    matrice.mois_reference -= 2
+    matrice._comptes = None
+    histogramme = matrice.histogramme
+    avancee = matrice_retention(df, version='v1')
+
+    assert avancee is not matrice
+    assert matrice.histogramme is histogramme
+    assert np.array_equal(avancee.retention().to_numpy(), attendu.to_numpy(), equal_nan=True)
+    assert matrice_retention(df, version='v1') is avancee
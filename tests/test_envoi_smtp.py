@@ -0,0 +1,99 @@
+import socket
+import threading
+
+import pandas as pd
+import pytest
+
+from envoi_smtp import STATUT_ECHEC, STATUT_ENVOYE, MoteurEnvoi, PoolSMTP
+
+aiosmtpd = pytest.importorskip('aiosmtpd.controller')
+
+class Gestionnaire:
+    """
+    Serveur de test : refuse définitivement (550) les adresses 'refuse@...',
+    temporairement (451) les deux premiers envois vers 'temporaire@...'
+    """
+
+    def __init__(self):
+        self.recus = []
+        self.tentatives = {}
+
+    async def handle_DATA(self, serveur, session, enveloppe):
+        destinataire = enveloppe.rcpt_tos[0]
+        self.tentatives[destinataire] = self.tentatives.get(destinataire, 0) + 1
+
+        if destinataire.startswith('refuse@'):
+            return '550 Boîte inexistante'
+        if destinataire.startswith('temporaire@') and self.tentatives[destinataire] <= 2:
+            return '451 Réessayez plus tard'
+
+        self.recus.append(destinataire)
+        return '250 OK'
+
+def _port_libre():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def serveur():
+    gestionnaire = Gestionnaire()
+    controleur = aiosmtpd.Controller(gestionnaire, hostname='127.0.0.1', port=_port_libre())
+    controleur.start()
+    yield controleur, gestionnaire
+    controleur.stop()
+
+def _envoyer(controleur, messages, chemin_statuts, nb_threads=2, taille_file=2):
+    """
+    Lance l'envoi dans un thread : le test échoue au lieu de bloquer si l'envoi ne se termine pas
+    """
+    pool = PoolSMTP(controleur.hostname, controleur.port, taille=nb_threads)
+    moteur = MoteurEnvoi(pool, 'equipe@gestion-abonnements.ma', nb_threads=nb_threads,
+                         delai_reprise=0.01, taille_file=taille_file)
+    resultat = {}
+    thread = threading.Thread(
+        target=lambda: resultat.update(moteur.envoyer(messages, chemin_statuts=chemin_statuts)),
+        daemon=True
+    )
+    thread.start()
+    thread.join(timeout=20)
+    assert not thread.is_alive(), "l'envoi ne s'est pas terminé"
+    return resultat, pd.read_csv(chemin_statuts).set_index('destinataire')
+
+def _message(destinataire, sujet="Votre abonnement"):
+    return {'destinataire': destinataire, 'sujet': sujet, 'corps': "Bonjour"}
+
+def test_reprises_et_echec_definitif(serveur, tmp_path):
+    controleur, gestionnaire = serveur
+    messages = [
+        _message('client@example.org'),
+        _message('temporaire@example.org'),
+        _message('refuse@example.org')
+    ]
+
+    resume, statuts = _envoyer(controleur, messages, tmp_path / 'statuts.csv')
+
+    assert resume['envoyes'] == 2 and resume['echecs'] == 1
+    assert statuts.loc['client@example.org', 'tentatives'] == 1
+    # Erreur temporaire (451) : réessayée jusqu'au succès
+    assert statuts.loc['temporaire@example.org', 'statut'] == STATUT_ENVOYE
+    assert statuts.loc['temporaire@example.org', 'tentatives'] == 3
+    # Erreur définitive (5xx) : pas de nouvelle tentative
+    assert statuts.loc['refuse@example.org', 'statut'] == STATUT_ECHEC
+    assert statuts.loc['refuse@example.org', 'tentatives'] == 1
+    assert gestionnaire.tentatives['refuse@example.org'] == 1
+    assert sorted(gestionnaire.recus) == ['client@example.org', 'temporaire@example.org']
+
+def test_lignes_invalides_sans_blocage(serveur, tmp_path):
+    controleur, gestionnaire = serveur
+    # Sujets manquants (NaN lus par pd.read_csv) : plus de messages que de threads et de places dans la file
+    messages = [_message(f'client{i}@example.org', sujet=float('nan')) for i in range(10)]
+    messages += [_message(float('nan')), _message('valide@example.org')]
+
+    resume, statuts = _envoyer(controleur, messages, tmp_path / 'statuts.csv')
+
+    assert resume['echecs'] == 11 and resume['envoyes'] == 1
+    assert statuts.loc['client0@example.org', 'tentatives'] == 0
+    assert statuts.loc['client0@example.org', 'erreur'].startswith('Message invalide')
+    assert statuts.loc['valide@example.org', 'statut'] == STATUT_ENVOYE
+    assert gestionnaire.recus == ['valide@example.org']
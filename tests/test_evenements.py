@@ -0,0 +1,43 @@
+import multiprocessing
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from evenements import JournalEvenements, compacter
+from stockage import FICHIER_CSV
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+NB_ECRIVAINS = 2
+NB_EVENEMENTS = 1000
+
+def _ecrire(dossier, numero):
+    """
+    Écrivain d'un autre processus : une souscription par nouveau client
+    """
+    os.chdir(dossier)
+    journal = JournalEvenements()
+    for i in range(NB_EVENEMENTS):
+        journal.souscrire(f"CLI{numero}{i:05d}", 'Basic', 99, date='2026-01-01')
+
+@pytest.mark.skipif(os.name != 'posix', reason="verrou entre processus (fcntl) indisponible")
+def test_compaction_avec_ecrivains_externes(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(RACINE, FICHIER_CSV), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    initiaux = len(pd.read_csv(FICHIER_CSV))
+
+    contexte = multiprocessing.get_context('spawn')
+    ecrivains = [contexte.Process(target=_ecrire, args=(str(tmp_path), n)) for n in range(1, NB_ECRIVAINS + 1)]
+    for ecrivain in ecrivains:
+        ecrivain.start()
+    while any(ecrivain.is_alive() for ecrivain in ecrivains):
+        compacter()
+    for ecrivain in ecrivains:
+        ecrivain.join()
+        assert ecrivain.exitcode == 0
+    compacter()
+
+    # Aucun événement perdu : chaque souscription a créé son client
+    assert len(pd.read_csv(FICHIER_CSV)) == initiaux + NB_ECRIVAINS * NB_EVENEMENTS
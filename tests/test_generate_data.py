@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+from calculs import charger_donnees
+from chargement import ChargeurDonnees
+from generate_data import generer_donnees_rapide
+from stockage import COLONNES_DATES, FICHIER_PARQUET, convertir_csv_en_parquet, lire_parquet, parquet_a_jour
+
+pytest.importorskip('pyarrow')
+
+def test_parquet_genere_utilisable(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generer_donnees_rapide(2000, chemin=FICHIER_PARQUET, processus=1, taille_lot=700)
+
+    # Le CSV source est écrit avec le Parquet, qui n'est pas reconverti au chargement
+    assert parquet_a_jour()
+    assert len(charger_donnees()) == 2000
+    assert len(lire_parquet()) == 2000
+    assert len(ChargeurDonnees().actualiser().modele) == 2000
+    # Mêmes valeurs qu'une conversion du CSV généré (à l'unité des dates près)
+    convertir_csv_en_parquet(chemin_parquet='converti.parquet')
+    genere, converti = (
+        lire_parquet(chemin).astype({c: 'datetime64[ns]' for c in COLONNES_DATES})
+        for chemin in (FICHIER_PARQUET, 'converti.parquet')
+    )
+    pd.testing.assert_frame_equal(genere, converti, check_categorical=False)
@@ -0,0 +1,18 @@
+import pytest
+
+from metriques_incrementales import MetriquesIncrementales
+
+@pytest.mark.parametrize('evenement', [
+    {'type': 'annulation', 'id': 'CLI9999', 'plan': None, 'prix_mensuel': None},
+    {'type': 'expiration', 'id': 'CLI9999', 'plan': None, 'prix_mensuel': None},
+    {'type': 'changement_plan', 'id': 'CLI9999', 'plan': 'Pro', 'prix_mensuel': 199},
+])
+def test_client_inconnu(evenement):
+    suivi = MetriquesIncrementales()
+    suivi.souscrire('CLI0001', 'Basic', 99)
+
+    with pytest.raises(ValueError, match='CLI9999'):
+        suivi.appliquer(evenement)
+    # Compteurs inchangés
+    assert suivi.metriques()['total_clients'] == 1
+    assert suivi.metriques()['mrr'] == 99
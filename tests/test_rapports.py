@@ -0,0 +1,35 @@
+import os
+import shutil
+
+import numpy as np
+
+import rapports
+from calculs import calculer_tableau_de_bord, charger_donnees
+from rapports import GenerateurRapports
+from stockage import FICHIER_CSV
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _sans_date(contenu):
+    return [ligne for ligne in contenu.decode('utf-8').splitlines() if not ligne.startswith('Date')]
+
+def test_agregats_en_parallele(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(RACINE, FICHIER_CSV), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    df = charger_donnees(format='csv')
+
+    attendu, obtenu = calculer_tableau_de_bord(df), calculer_tableau_de_bord(df, processus=2)
+    assert attendu.metriques == obtenu.metriques
+    assert np.array_equal(attendu.par_plan.to_numpy(), obtenu.par_plan.to_numpy())
+    assert np.array_equal(attendu.cohortes.to_numpy(), obtenu.cohortes.to_numpy())
+    assert attendu.clients_risque.equals(obtenu.clients_risque)
+
+    # Le générateur passe le nombre de processus aux rapports assez gros
+    monkeypatch.setattr(rapports, 'LIGNES_PARALLELE', 0)
+    generateur = GenerateurRapports(processus=2)
+    try:
+        travail = generateur.demander('Rapport Complet', 'Texte', df, 'v1')
+        assert travail.attendre(60) and travail.erreur is None
+    finally:
+        generateur.fermer()
+    assert _sans_date(travail.contenu) == _sans_date(rapports.rapport_texte(df))
@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pytest
+
+from modele import preparer_modele
+from recherche import IndexRecherche
+from stockage import FICHIER_CSV, lire_csv
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope='module')
+def clients():
+    return preparer_modele(lire_csv(os.path.join(RACINE, FICHIER_CSV)))
+
+def _contient(df, requete, regex):
+    """
+    Recherche de l'application avant l'index : str.contains sur le nom ou l'email
+    """
+    return np.flatnonzero(
+        (df['nom'].str.contains(requete, case=False, regex=regex)
+         | df['email'].str.contains(requete, case=False, regex=regex)).to_numpy(dtype=bool)
+    )
+
+@pytest.mark.parametrize('requete', ['mar', 'MAR', 'example.org', 'e.n', 'a+', '(', 'du', 'zzz'])
+def test_recherche_litterale(clients, requete):
+    index = IndexRecherche(clients)
+
+    assert np.array_equal(index.rechercher(requete), _contient(clients, requete, regex=False))
+
+@pytest.mark.parametrize('requete', ['e.n', 'a+'])
+def test_difference_avec_les_expressions_regulieres(clients, requete):
+    # Changement voulu : la saisie est cherchée telle quelle, '.' ou '+' ne sont plus
+    # des métacaractères (et une saisie comme '(' n'est plus une erreur)
+    index = IndexRecherche(clients)
+
+    trouves = index.rechercher(requete)
+    assert set(trouves) < set(_contient(clients, requete, regex=True))
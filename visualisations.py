@@ -1,18 +1,143 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from cohortes import matrice_retention
+from modele import masque_actifs, mois_cohorte
+from instrumentation import instrumenter
+
+# Nombre d'entrées gardées en cache (données agrégées et figures)
+TAILLE_CACHE = 16
+
+# Nombre de classes de l'histogramme du score de risque
+NB_CLASSES_RISQUE = 20
+
+# Caches partagés entre les sessions (un thread par session) : lus et
+# modifiés sous verrou, les entrées sont construites hors du verrou
+_donnees = OrderedDict()
+_figures = OrderedDict()
+_verrou = threading.Lock()
 
-def graphique_evolution_clients(df):
+def _en_cache(cache, cle, construire):
     """
-    Graphique d'évolution du nombre de clients par mois
+    Entrée `cle` du cache LRU, construite si absente ; si une autre session
+    l'a construite entre-temps, la sienne est gardée
+    """
+    with _verrou:
+        valeur = cache.get(cle)
+        if valeur is not None:
+            cache.move_to_end(cle)
+            return valeur
+
+    valeur = construire()
+    with _verrou:
+        valeur = cache.setdefault(cle, valeur)
+        cache.move_to_end(cle)
+        while len(cache) > TAILLE_CACHE:
+            cache.popitem(last=False)
+    return valeur
+
+# ---------- Données agrégées des graphiques ----------
+
+def evolution_mensuelle(df):
+    """
+    Nombre de clients inscrits par mois
+    """
+    mois = mois_cohorte(df)
+    evolution = mois.groupby(mois).size().reset_index(name='nombre_clients')
+    evolution.columns = ['mois', 'nombre_clients']
+    evolution['mois'] = evolution['mois'].astype(str)
+    return evolution
+
+def repartition_plans(df):
+    """
+    Nombre de clients par plan
+    """
+    repartition = df['plan'].value_counts().reset_index()
+    repartition.columns = ['plan', 'nombre']
+    return repartition
+
+def repartition_statuts(df):
+    """
+    Nombre de clients par statut
+    """
+    statuts = df['statut'].value_counts().reset_index()
+    statuts.columns = ['statut', 'nombre']
+    return statuts
+
+def revenu_par_plan(df):
+    """
+    Revenu mensuel des clients actifs par plan
+    """
+    clients_actifs = df[masque_actifs(df)]
+    
+    revenu = clients_actifs.groupby('plan')['prix_mensuel'].sum().reset_index()
+    revenu.columns = ['plan', 'revenu']
+    return revenu
+
+def histogramme_risque(df, nb_classes=NB_CLASSES_RISQUE):
+    """
+    Histogramme du score de risque des clients actifs (classes de même largeur)
+    """
+    scores = df.loc[masque_actifs(df), 'score_risque'].dropna().to_numpy()
+    borne_min = min(0.0, float(scores.min(initial=0.0)))
+    borne_max = max(1.0, float(scores.max(initial=1.0)))
+    
+    nombres, bornes = np.histogram(scores, bins=nb_classes, range=(borne_min, borne_max))
+    return pd.DataFrame({
+        'debut': bornes[:-1],
+        'fin': bornes[1:],
+        'nombre': nombres
+    })
+
+class DonneesGraphiques:
+    """
+    Séries pré-agrégées utilisées par les graphiques : quelques lignes
+    par graphique, quel que soit le nombre de clients
+    """
+    
+    def __init__(self, df, nb_classes=NB_CLASSES_RISQUE):
+        self.evolution = evolution_mensuelle(df)
+        self.plans = repartition_plans(df)
+        self.statuts = repartition_statuts(df)
+        self.revenu = revenu_par_plan(df)
+        self.risque = histogramme_risque(df, nb_classes)
+    
+    @classmethod
+    def depuis_agregats(cls, agregats, nb_classes=NB_CLASSES_RISQUE):
+        """
+        Mêmes séries à partir d'agrégats fusionnés (agregats.AgregatsPartiels)
+        """
+        donnees = cls.__new__(cls)
+        donnees.evolution = agregats.evolution_mensuelle()
+        donnees.plans = agregats.repartition_plans()
+        donnees.statuts = agregats.repartition_statuts()
+        donnees.revenu = agregats.revenu_par_plan()
+        donnees.risque = agregats.histogramme_risque(nb_classes)
+        return donnees
+
+@instrumenter
+def donnees_graphiques(df, version=None):
     """
+    Données agrégées des graphiques, mises en cache par version des données
+    """
+    if version is None:
+        return DonneesGraphiques(df)
     
-    df['date_debut'] = pd.to_datetime(df['date_debut'])
-    df['mois'] = df['date_debut'].dt.to_period('M').astype(str)
+    return _en_cache(_donnees, version, lambda: DonneesGraphiques(df))
+
+# ---------- Graphiques ----------
+
+@instrumenter
+def graphique_evolution_clients(df, donnees=None):
+    """
+    Graphique d'évolution du nombre de clients par mois
+    """
     
-    # Compter les clients par mois
-    evolution = df.groupby('mois').size().reset_index(name='nombre_clients')
+    # Compter les clients par mois (sans modifier le DataFrame partagé)
+    evolution = donnees.evolution if donnees is not None else evolution_mensuelle(df)
     
     fig = px.line(
         evolution, 
@@ -30,13 +155,13 @@ def graphique_evolution_clients(df):
     
     return fig
 
-def graphique_repartition_plans(df):
+@instrumenter
+def graphique_repartition_plans(df, donnees=None):
     """
     Camembert de répartition des clients par plan
     """
     
-    repartition = df['plan'].value_counts().reset_index()
-    repartition.columns = ['plan', 'nombre']
+    repartition = donnees.plans if donnees is not None else repartition_plans(df)
     
     fig = px.pie(
         repartition,
@@ -51,13 +176,13 @@ def graphique_repartition_plans(df):
     
     return fig
 
-def graphique_statuts(df):
+@instrumenter
+def graphique_statuts(df, donnees=None):
     """
     Graphique en barres des statuts clients
     """
     
-    statuts = df['statut'].value_counts().reset_index()
-    statuts.columns = ['statut', 'nombre']
+    statuts = donnees.statuts if donnees is not None else repartition_statuts(df)
     
     couleurs = {
         'actif': '#2ecc71',
@@ -65,7 +190,7 @@ def graphique_statuts(df):
         'expiré': '#f39c12'
     }
     
-    statuts['couleur'] = statuts['statut'].map(couleurs)
+    statuts = statuts.assign(couleur=statuts['statut'].map(couleurs))
     
     fig = px.bar(
         statuts,
@@ -82,15 +207,13 @@ def graphique_statuts(df):
     
     return fig
 
-def graphique_revenu_par_plan(df):
+@instrumenter
+def graphique_revenu_par_plan(df, donnees=None):
     """
     Revenu mensuel par plan d'abonnement
     """
     
-    clients_actifs = df[df['statut'] == 'actif']
-    
-    revenu = clients_actifs.groupby('plan')['prix_mensuel'].sum().reset_index()
-    revenu.columns = ['plan', 'revenu']
+    revenu = donnees.revenu if donnees is not None else revenu_par_plan(df)
     
     fig = px.bar(
         revenu,
@@ -107,55 +230,92 @@ def graphique_revenu_par_plan(df):
     
     return fig
 
-def graphique_cohorte_retention(df):
+@instrumenter
+def graphique_cohorte_retention(df, matrice=None):
     """
-    Heatmap d'analyse de cohorte
+    Heatmap de rétention : mois d'inscription x mois depuis l'inscription
     """
     
-    df['date_debut'] = pd.to_datetime(df['date_debut'])
-    df['mois_cohorte'] = df['date_debut'].dt.to_period('M').astype(str)
-    
-    cohorte = df.groupby('mois_cohorte').agg({
-        'id': 'count',
-        'statut': lambda x: (x == 'actif').sum()
-    })
+    if matrice is None:
+        matrice = matrice_retention(df)
     
-    cohorte['taux_retention'] = (cohorte['statut'] / cohorte['id'] * 100).round(2)
+    retention = matrice.retention()
     
-    fig = px.bar(
-        cohorte.reset_index(),
-        x='mois_cohorte',
-        y='taux_retention',
+    fig = px.imshow(
+        retention.to_numpy(),
+        x=[f"M+{mois}" for mois in retention.columns],
+        y=retention.index.astype(str),
         title=' Taux de Rétention par Cohorte',
-        labels={'mois_cohorte': 'Mois de Cohorte', 'taux_retention': 'Taux de Rétention (%)'},
-        color='taux_retention',
-        color_continuous_scale='RdYlGn'
+        labels={'x': 'Mois depuis l\'inscription', 'y': 'Mois de Cohorte', 'color': 'Rétention (%)'},
+        color_continuous_scale='RdYlGn',
+        zmin=0,
+        zmax=100,
+        aspect='auto'
     )
     
     return fig
 
-def graphique_risque_churn(df):
+@instrumenter
+def graphique_risque_churn(df, donnees=None, seuil=0.7):
     """
     Distribution du score de risque de churn
     """
     
-    clients_actifs = df[df['statut'] == 'actif']
+    # Histogramme pré-calculé : une barre par classe, pas une valeur par client
+    classes = donnees.risque if donnees is not None else histogramme_risque(df)
+    classes = classes.assign(
+        score_risque=(classes['debut'] + classes['fin']) / 2,
+        largeur=classes['fin'] - classes['debut']
+    )
     
-    fig = px.histogram(
-        clients_actifs,
+    fig = px.bar(
+        classes,
         x='score_risque',
-        nbins=20,
+        y='nombre',
         title=' Distribution du Score de Risque de Churn (Clients Actifs)',
-        labels={'score_risque': 'Score de Risque', 'count': 'Nombre de Clients'},
+        labels={'score_risque': 'Score de Risque', 'nombre': 'Nombre de Clients'},
+        hover_data={'debut': ':.2f', 'fin': ':.2f', 'largeur': False},
         color_discrete_sequence=['#e74c3c']
     )
     
-    # Ajouter une ligne verticale au seuil de risque (0.7)
-    fig.add_vline(x=0.7, line_dash="dash", line_color="red", 
+    fig.update_traces(width=classes['largeur'])
+    fig.update_layout(bargap=0)
+    
+    # Ajouter une ligne verticale au seuil de risque
+    fig.add_vline(x=seuil, line_dash="dash", line_color="red", 
                   annotation_text="Seuil de risque élevé")
     
     return fig
 
+GRAPHIQUES = {
+    'evolution_clients': graphique_evolution_clients,
+    'repartition_plans': graphique_repartition_plans,
+    'statuts': graphique_statuts,
+    'revenu_par_plan': graphique_revenu_par_plan,
+    'risque_churn': graphique_risque_churn
+}
+
+@instrumenter
+def figure_en_cache(nom, df, version=None, **parametres):
+    """
+    Figure mise en cache par (graphique, version des données, paramètres)
+    La heatmap des cohortes dépend aussi du mois de référence de la matrice
+    """
+    if nom == 'cohorte_retention':
+        matrice = matrice_retention(df, version=version)
+        cle = (nom, version, matrice.mois_reference)
+        construire = lambda: graphique_cohorte_retention(df, matrice)
+    else:
+        cle = (nom, version, tuple(sorted(parametres.items())))
+        construire = lambda: GRAPHIQUES[nom](
+            df, donnees=donnees_graphiques(df, version), **parametres
+        )
+    
+    if version is None:
+        return construire()
+    
+    return _en_cache(_figures, cle, construire)
+
 # Test
 if __name__ == "__main__":
     from calculs import charger_donnees